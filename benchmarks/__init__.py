@@ -0,0 +1,11 @@
+# coding: utf-8
+"""
+仿真性能基准测试。
+
+在内存数据库（mongomock）中生成与 NetworkDB 存储格式一致的合成网络，
+直接调用仿真流程并统计各阶段耗时和内存峰值，用于发现性能回退以及评估 GNPY 升级前的硬件需求。
+
+运行方式（在仓库根目录）::
+
+    python -m benchmarks.simulation --topology linear ring --sizes 5 10 20 --channels 40 96
+"""
@@ -0,0 +1,102 @@
+# coding: utf-8
+"""基准测试使用的器件库及网络的 SI、Span、仿真参数"""
+import json
+from copy import deepcopy
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+_EQUIPMENT_FILE = Path(__file__).parent / 'data' / 'equipment.json'
+
+TRANSCEIVER_TYPE = 'bench_trx'
+FIBER_TYPE = 'SSMF'
+EDFA_TYPE = 'std_medium_gain'
+# 光纤损耗系数 (dB/km)
+FIBER_LOSS_COEF = 0.2
+
+SPAN = {
+    "power_mode": True,
+    "delta_power_range_db": [-2, 3, 0.5],
+    "max_fiber_lineic_loss_for_raman": 0.25,
+    "target_extended_gain": 2.5,
+    "max_length": 150,
+    "length_units": "km",
+    "max_loss": 28,
+    "padding": 10,
+    "EOL": 0,
+    "con_in": 0,
+    "con_out": 0
+}
+
+
+def library_document(user_id, library_name='benchmark'):
+    """与 EquipmentLibraryDB 存储格式一致的器件库文档"""
+    with open(_EQUIPMENT_FILE, encoding='utf-8') as f:
+        equipments = json.load(f)
+    now = datetime.utcnow()
+    return {
+        "user_id": ObjectId(user_id),
+        "library_name": library_name,
+        "created_at": now,
+        "updated_at": now,
+        "equipments": equipments
+    }
+
+
+def spectrum_information(channels, spacing=50e9, f_min=191.3e12, baud_rate=32e9):
+    """
+    网络的 SI 配置。
+
+    :param channels: 通道数量，f_max 按通道间隔由 f_min 推算（与 GNPY 的 automatic_fmax 相同），
+                     GNPY 在 [f_min, f_max) 内恰好生成 channels 个通道
+    """
+    return {
+        "f_min": f_min,
+        "baud_rate": baud_rate,
+        "f_max": f_min + channels * spacing,
+        "spacing": spacing,
+        "power_dbm": 0,
+        "power_range_db": [0, 0, 1],
+        "roll_off": 0.15,
+        "tx_osnr": 40,
+        "sys_margins": 2
+    }
+
+
+def span_parameters():
+    return deepcopy(SPAN)
+
+
+def computed_channels(channels, count):
+    """在 1..channels 中均匀选取 count 个通道用于 NLI 计算，count 为 0 时返回 None（计算全部通道）"""
+    if not count or count >= channels:
+        return None
+    if count == 1:
+        return [(channels + 1) // 2]
+    return sorted({round(1 + i * (channels - 1) / (count - 1)) for i in range(count)})
+
+
+def simulation_config(channels, nli_channels=0):
+    """
+    网络的仿真参数（simulation_config）。
+
+    :param channels: 通道数量
+    :param nli_channels: 参与 NLI 计算的通道数，0 表示全部通道
+    """
+    nli_params = {
+        "method": "ggn_spectrally_separated",
+        "dispersion_tolerance": 1,
+        "phase_shift_tolerance": 0.1
+    }
+    selected = computed_channels(channels, nli_channels)
+    if selected:
+        nli_params["computed_channels"] = selected
+    return {
+        "raman_params": {
+            "flag": False,
+            "result_spatial_resolution": 10e3,
+            "solver_spatial_resolution": 50
+        },
+        "nli_params": nli_params
+    }
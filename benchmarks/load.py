@@ -0,0 +1,384 @@
+# coding: utf-8
+"""
+REST 接口压测。
+
+通过 Flask 测试客户端驱动完整的应用（含 JWT 鉴权、请求钩子和所有已注册的接口），数据库使用内存数据库，
+按设定的比例混合拓扑编辑、查询和仿真请求，按路由统计延迟的 p50/p95/p99 和吞吐量。
+仿真在请求线程中直接执行（SIMULATION_WORKERS=0），与服务进程共享内存数据库。
+任一路由出现非 2xx 响应时，在标准错误中列出该路由和一条示例响应并以状态码 1 退出，
+失败请求的延迟不代表正常处理的耗时，此时的统计结果不可用于比较。
+
+运行方式（在仓库根目录）::
+
+    python -m benchmarks.load --mix editing --requests 2000
+"""
+import os
+
+# 需在导入应用配置之前设置
+os.environ.setdefault('SIMULATION_WORKERS', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import argparse
+import json
+import random
+import sys
+from collections import defaultdict
+from time import perf_counter
+
+# Project imports
+from benchmarks.equipment import library_document, simulation_config, spectrum_information
+from benchmarks.mongo import use_in_memory_database
+from benchmarks.simulation import format_table
+from benchmarks.topologies import linear_network
+from src.optinetsim_backend.app.database.models import UserDB
+
+USERNAME = 'load-test'
+PASSWORD = 'load-test-password'
+
+# 各场景中每种操作的权重
+MIXES = {
+    # 前端编辑拓扑时的典型请求
+    'editing': {
+        'list_networks': 5,
+        'get_network': 25,
+        'add_element': 15,
+        'update_element': 15,
+        'delete_element': 5,
+        'add_connection': 10,
+        'update_connection': 5,
+        'delete_connection': 3,
+        'update_span': 2,
+        'list_equipment': 5,
+    },
+    # 编辑为主，夹杂少量仿真
+    'mixed': {
+        'list_networks': 5,
+        'get_network': 25,
+        'add_element': 12,
+        'update_element': 12,
+        'delete_element': 4,
+        'add_connection': 8,
+        'update_connection': 4,
+        'delete_connection': 2,
+        'update_span': 2,
+        'list_equipment': 5,
+        'single_link': 4,
+        'single_link_cached': 6,
+    },
+    # 仿真为主
+    'simulation': {
+        'get_network': 10,
+        'single_link': 10,
+        'single_link_cached': 20,
+        'batch': 2,
+        'job_status': 5,
+    },
+}
+
+
+class LoadState:
+    """压测过程中创建的资源，供后续的修改和删除请求使用"""
+
+    def __init__(self, client, token, library_id, scratch_networks, simulation_networks, rng):
+        self.client = client
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.library_id = library_id
+        # 供拓扑编辑使用的网络，不参与仿真
+        self.scratch_networks = scratch_networks
+        # 供仿真使用的网络 (network_id, source_uid, destination_uid)
+        self.simulation_networks = simulation_networks
+        self.rng = rng
+        self.elements = defaultdict(list)
+        self.connections = defaultdict(list)
+        self.jobs = []
+        self.counter = 0
+
+    def request(self, method, url, json_body=None):
+        return self.client.open(url, method=method, json=json_body, headers=self.headers)
+
+    def scratch_network(self):
+        return self.rng.choice(self.scratch_networks)
+
+    def next_name(self, prefix):
+        self.counter += 1
+        return f'{prefix}-{self.counter}'
+
+
+def _edfa(state):
+    return {
+        "name": state.next_name('edfa'),
+        "type": "Edfa",
+        "library_id": state.library_id,
+        "type_variety": "std_medium_gain",
+        "operational": {"gain_target": 16.0, "tilt_target": 0.0, "out_voa": 0.0},
+        "metadata": {"location": {"latitude": state.rng.uniform(40, 50), "longitude": state.rng.uniform(0, 10),
+                                  "city": "", "region": ""}}
+    }
+
+
+# 每个操作返回 (路由模板, HTTP 方法, 响应)，操作无法执行时（如没有可删除的元素）退回到其他操作
+
+def list_networks(state):
+    return '/api/networks', 'GET', state.request('GET', '/api/networks')
+
+
+def get_network(state):
+    network_id = state.scratch_network()
+    return '/api/networks/<string:network_id>', 'GET', state.request('GET', f'/api/networks/{network_id}')
+
+
+def add_element(state):
+    network_id = state.scratch_network()
+    response = state.request('POST', f'/api/networks/{network_id}/elements', _edfa(state))
+    if response.status_code == 201:
+        state.elements[network_id].append(response.get_json()['element_id'])
+    return '/api/networks/<string:network_id>/elements', 'POST', response
+
+
+def update_element(state):
+    network_id = state.scratch_network()
+    if not state.elements[network_id]:
+        return add_element(state)
+    element_id = state.rng.choice(state.elements[network_id])
+    response = state.request('PUT', f'/api/networks/{network_id}/elements/{element_id}', _edfa(state))
+    return '/api/networks/<string:network_id>/elements/<string:element_id>', 'PUT', response
+
+
+def delete_element(state):
+    network_id = state.scratch_network()
+    if not state.elements[network_id]:
+        return add_element(state)
+    element_id = state.elements[network_id].pop(state.rng.randrange(len(state.elements[network_id])))
+    # 与该元素相关的连接会一起删除
+    state.connections[network_id] = [c for c in state.connections[network_id] if element_id not in c[1:]]
+    response = state.request('DELETE', f'/api/networks/{network_id}/elements/{element_id}')
+    return '/api/networks/<string:network_id>/elements/<string:element_id>', 'DELETE', response
+
+
+def add_connection(state):
+    network_id = state.scratch_network()
+    if len(state.elements[network_id]) < 2:
+        return add_element(state)
+    from_node, to_node = state.rng.sample(state.elements[network_id], 2)
+    response = state.request('POST', f'/api/networks/{network_id}/connections',
+                             {"from_node": from_node, "to_node": to_node})
+    if response.status_code == 201:
+        state.connections[network_id].append((response.get_json()['connection_id'], from_node, to_node))
+    return '/api/networks/<string:network_id>/connections', 'POST', response
+
+
+def update_connection(state):
+    network_id = state.scratch_network()
+    if not state.connections[network_id] or len(state.elements[network_id]) < 2:
+        return add_connection(state)
+    index = state.rng.randrange(len(state.connections[network_id]))
+    connection_id = state.connections[network_id][index][0]
+    from_node, to_node = state.rng.sample(state.elements[network_id], 2)
+    state.connections[network_id][index] = (connection_id, from_node, to_node)
+    response = state.request('PUT', f'/api/networks/{network_id}/connections/{connection_id}',
+                             {"from_node": from_node, "to_node": to_node})
+    return '/api/networks/<string:network_id>/connections/<string:connection_id>', 'PUT', response
+
+
+def delete_connection(state):
+    network_id = state.scratch_network()
+    if not state.connections[network_id]:
+        return add_connection(state)
+    connection_id = state.connections[network_id].pop(state.rng.randrange(len(state.connections[network_id])))[0]
+    response = state.request('DELETE', f'/api/networks/{network_id}/connections/{connection_id}')
+    return '/api/networks/<string:network_id>/connections/<string:connection_id>', 'DELETE', response
+
+
+def update_span(state):
+    network_id = state.scratch_network()
+    span = {
+        "power_mode": True,
+        "delta_power_range_db": [-2, 3, 0.5],
+        "max_fiber_lineic_loss_for_raman": 0.25,
+        "target_extended_gain": 2.5,
+        "max_length": state.rng.choice([120, 150]),
+        "length_units": "km",
+        "max_loss": 28,
+        "padding": 10,
+        "EOL": 0,
+        "con_in": 0,
+        "con_out": 0
+    }
+    response = state.request('PUT', f'/api/networks/{network_id}/span-parameters', span)
+    return '/api/networks/<string:network_id>/span-parameters', 'PUT', response
+
+
+def list_equipment(state):
+    response = state.request('GET', f'/api/equipment-libraries/{state.library_id}/equipment')
+    return '/api/equipment-libraries/<string:library_id>/equipment', 'GET', response
+
+
+def _single_link(state, power):
+    network_id, source_uid, destination_uid = state.rng.choice(state.simulation_networks)
+    response = state.request('POST', '/api/simulation/single-link', {
+        "network_id": network_id, "source_uid": source_uid, "destination_uid": destination_uid, "power": power
+    })
+    return '/api/simulation/single-link', 'POST', response
+
+
+def single_link(state):
+    # 每次使用不同的功率，不命中结果缓存
+    return _single_link(state, round(state.rng.uniform(-2, 2), 3))
+
+
+def single_link_cached(state):
+    # 固定参数，除第一次外都命中结果缓存
+    return _single_link(state, 0)
+
+
+def batch(state):
+    network_id, source_uid, destination_uid = state.rng.choice(state.simulation_networks)
+    response = state.request('POST', '/api/simulation/batch', {
+        "network_id": network_id,
+        "pairs": [{"source_uid": source_uid, "destination_uid": destination_uid},
+                  {"source_uid": destination_uid, "destination_uid": source_uid}]
+    })
+    return '/api/simulation/batch', 'POST', response
+
+
+def job_status(state):
+    if not state.jobs:
+        network_id, source_uid, destination_uid = state.rng.choice(state.simulation_networks)
+        response = state.request('POST', '/api/simulation/jobs', {
+            "network_id": network_id, "source_uid": source_uid, "destination_uid": destination_uid
+        })
+        if response.status_code == 202:
+            state.jobs.append(response.get_json()['job_id'])
+        return '/api/simulation/jobs', 'POST', response
+    job_id = state.rng.choice(state.jobs)
+    return '/api/simulation/jobs/<string:job_id>', 'GET', state.request('GET', f'/api/simulation/jobs/{job_id}')
+
+
+OPERATIONS = {fn.__name__: fn for fn in (
+    list_networks, get_network, add_element, update_element, delete_element, add_connection, update_connection,
+    delete_connection, update_span, list_equipment, single_link, single_link_cached, batch, job_status
+)}
+
+
+def setup(app, db, rng, scratch_networks=5, simulation_networks=2, spans=5, channels=40):
+    """注册压测用户并准备器件库和网络，返回 LoadState"""
+    client = app.test_client()
+    client.post('/api/auth/register', json={'username': USERNAME, 'password': PASSWORD, 'email': 'load@test'})
+    token = client.post('/api/auth/login', json={'username': USERNAME, 'password': PASSWORD}).get_json()['access_token']
+    user_id = UserDB.find_by_username(USERNAME)['_id']
+
+    library_id = str(db.equipment_libraries.insert_one(library_document(user_id)).inserted_id)
+    scratch, simulation = [], []
+    for index in range(scratch_networks + simulation_networks):
+        builder = linear_network(user_id, library_id, spans)
+        builder.document['network_name'] = f'load-{index}'
+        builder.document['SI'] = spectrum_information(channels)
+        builder.document['simulation_config'] = simulation_config(channels)
+        network_id = str(db.networks.insert_one(builder.document).inserted_id)
+        if index < scratch_networks:
+            scratch.append(network_id)
+        else:
+            simulation.append((network_id, builder.transceivers[0], builder.transceivers[-1]))
+    return LoadState(client, token, library_id, scratch, simulation, rng)
+
+
+def percentile(sorted_values, q):
+    """最近秩法计算百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _failure(response):
+    """非 2xx 响应的示例：状态码和响应中的 message"""
+    body = response.get_json(silent=True)
+    message = body.get('message') if isinstance(body, dict) else None
+    return f'{response.status_code} {message or response.get_data(as_text=True)[:200]}'
+
+
+def run(state, mix, requests, warmup=0):
+    """
+    按权重随机执行 requests 次请求，预热请求不计入统计，但其非 2xx 响应同样记录在 failures 中。
+
+    :return: (每个路由的统计列表, 总耗时秒, 出现非 2xx 响应的路由 {(方法, 路由): 第一条失败响应})
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    failures = {}
+    for _ in range(warmup):
+        route, method, response = OPERATIONS[state.rng.choices(names, weights)[0]](state)
+        if not 200 <= response.status_code < 300:
+            failures.setdefault((method, route), _failure(response))
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    started = perf_counter()
+    for _ in range(requests):
+        operation = OPERATIONS[state.rng.choices(names, weights)[0]]
+        start = perf_counter()
+        route, method, response = operation(state)
+        latencies[(method, route)].append(perf_counter() - start)
+        if not 200 <= response.status_code < 300:
+            errors[(method, route)] += 1
+            failures.setdefault((method, route), _failure(response))
+    elapsed = perf_counter() - started
+
+    stats = []
+    for (method, route), values in sorted(latencies.items(), key=lambda item: item[0][1]):
+        values.sort()
+        stats.append({
+            'method': method,
+            'route': route,
+            'count': len(values),
+            'errors': errors[(method, route)],
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'rps': round(len(values) / elapsed, 1),
+        })
+    return stats, elapsed, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='REST 接口压测')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='mixed')
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--networks', type=int, default=5, help='供拓扑编辑使用的网络数')
+    parser.add_argument('--spans', type=int, default=5, help='仿真网络的光纤段数')
+    parser.add_argument('--channels', type=int, default=40, help='仿真网络的通道数')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', dest='json_path', help='将结果写入 JSON 文件，便于比较不同版本')
+    args = parser.parse_args(argv)
+
+    db = use_in_memory_database()
+    from src.optinetsim_backend.app import create_app
+    app = create_app()
+
+    rng = random.Random(args.seed)
+    state = setup(app, db, rng, scratch_networks=args.networks, spans=args.spans, channels=args.channels)
+    stats, elapsed, failures = run(state, MIXES[args.mix], args.requests, warmup=args.warmup)
+
+    # 本次压测未覆盖的接口
+    exercised = {stat['route'] for stat in stats}
+    registered = sorted({rule.rule for rule in app.url_map.iter_rules() if rule.rule.startswith('/api/')})
+    not_exercised = [route for route in registered if route not in exercised]
+
+    print(format_table(stats))
+    print(f'\n{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s), mix={args.mix}')
+    if not_exercised:
+        print('not exercised: ' + ', '.join(not_exercised), file=sys.stderr)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'mix': args.mix, 'requests': args.requests, 'elapsed_s': elapsed, 'routes': stats,
+                       'failures': [{'method': method, 'route': route, 'example': example}
+                                    for (method, route), example in sorted(failures.items())]}, f, indent=2)
+    if failures:
+        for (method, route), example in sorted(failures.items(), key=lambda item: item[0][1]):
+            print(f'FAILED {method} {route}: {example}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
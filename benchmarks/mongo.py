@@ -0,0 +1,17 @@
+# coding: utf-8
+from src.optinetsim_backend.app.database import models
+
+
+def use_in_memory_database():
+    """
+    将 models 使用的数据库替换为 mongomock 内存数据库并返回。
+
+    models 中的各数据库类在每次调用时读取模块级的 db，因此替换对之后的所有查询生效。
+    仿真工作进程不会继承这一替换，需要在本进程内执行仿真。
+    """
+    try:
+        import mongomock
+    except ImportError as e:
+        raise SystemExit('基准测试需要 mongomock，请先执行 pdm install -G bench') from e
+    models.db = mongomock.MongoClient().optinetsim
+    return models.db
@@ -0,0 +1,135 @@
+# coding: utf-8
+"""
+单链路仿真基准测试。
+
+每个用例在内存数据库中写入一个合成网络，清空进程内缓存后调用与单链路仿真接口相同的 run_single_link，
+统计各阶段（load、equipment、network、design、propagate、results）耗时的中位数，
+并单独执行一次开启 tracemalloc 的仿真记录内存峰值。
+"""
+import argparse
+import json
+import statistics
+import sys
+import tracemalloc
+from time import perf_counter
+
+from bson import ObjectId
+
+# Project imports
+from benchmarks.equipment import library_document, simulation_config, spectrum_information
+from benchmarks.mongo import use_in_memory_database
+from benchmarks.topologies import TOPOLOGIES
+from src.optinetsim_backend.app.cache import design_cache, equipment_cache
+from src.optinetsim_backend.app.metrics import collect_stages
+from src.optinetsim_backend.app.simulation.tasks import run_single_link
+
+STAGES = ('load', 'equipment', 'network', 'design', 'propagate', 'results')
+
+
+def _run_once(user_id, network_id, source, destination):
+    # 每次都从冷缓存开始，保证各阶段都被执行
+    equipment_cache.invalidate()
+    design_cache.invalidate()
+    start = perf_counter()
+    with collect_stages() as timings:
+        run_single_link(user_id, network_id, source, destination)
+    durations = {'total': perf_counter() - start}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0) + seconds
+    return durations
+
+
+def run_case(db, topology, size, channels, nli_channels, repeat=3, spans_per_link=3, span_length=80, seed=0):
+    """
+    执行一个基准用例。
+
+    :param db: 内存数据库
+    :param topology: linear、ring 或 mesh
+    :param size: linear 为光纤段数，ring 和 mesh 为站点数
+    :param channels: 通道数量
+    :param nli_channels: 参与 NLI 计算的通道数，0 表示全部通道
+    :return: 用例参数、各阶段耗时中位数 (ms) 和内存峰值 (MiB)
+    """
+    user_id = ObjectId()
+    library_id = db.equipment_libraries.insert_one(library_document(user_id)).inserted_id
+    if topology == 'linear':
+        builder = TOPOLOGIES[topology](user_id, library_id, size, span_length=span_length)
+    elif topology == 'mesh':
+        builder = TOPOLOGIES[topology](user_id, library_id, size, spans_per_link, span_length, seed=seed)
+    else:
+        builder = TOPOLOGIES[topology](user_id, library_id, size, spans_per_link, span_length)
+    network = builder.document
+    network['SI'] = spectrum_information(channels)
+    network['simulation_config'] = simulation_config(channels, nli_channels)
+    network_id = str(db.networks.insert_one(network).inserted_id)
+    source, destination = builder.transceivers[0], builder.transceivers[-1]
+
+    runs = [_run_once(str(user_id), network_id, source, destination) for _ in range(repeat)]
+
+    tracemalloc.start()
+    try:
+        _run_once(str(user_id), network_id, source, destination)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    record = {
+        'topology': topology,
+        'size': size,
+        'fibers': builder.fiber_count,
+        'elements': len(network['elements']),
+        'channels': channels,
+        'nli_channels': nli_channels or channels,
+    }
+    for name in STAGES + ('total',):
+        record[f'{name}_ms'] = round(statistics.median(run.get(name, 0) for run in runs) * 1000, 2)
+    record['peak_mib'] = round(peak / 2 ** 20, 2)
+    return record
+
+
+def format_table(records):
+    columns = list(records[0])
+    widths = [max(len(column), *(len(str(record[column])) for record in records)) for column in columns]
+    lines = ['  '.join(column.rjust(width) for column, width in zip(columns, widths))]
+    lines.extend('  '.join(str(record[column]).rjust(width) for column, width in zip(columns, widths))
+                 for record in records)
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='单链路仿真基准测试')
+    parser.add_argument('--topology', nargs='+', choices=sorted(TOPOLOGIES), default=['linear'])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[5, 10, 20],
+                        help='linear 为光纤段数，ring 和 mesh 为站点数')
+    parser.add_argument('--channels', nargs='+', type=int, default=[40, 96])
+    parser.add_argument('--nli-channels', nargs='+', type=int, default=[0],
+                        help='参与 NLI 计算的通道数（nli_params.computed_channels），0 表示全部通道')
+    parser.add_argument('--spans-per-link', type=int, default=3)
+    parser.add_argument('--span-length', type=float, default=80, help='单段光纤长度 (km)')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0, help='mesh 拓扑的随机数种子')
+    parser.add_argument('--json', dest='json_path', help='将结果写入 JSON 文件，便于比较不同版本')
+    args = parser.parse_args(argv)
+
+    db = use_in_memory_database()
+    records = []
+    for topology in args.topology:
+        for size in args.sizes:
+            for channels in args.channels:
+                for nli_channels in args.nli_channels:
+                    record = run_case(db, topology, size, channels, nli_channels,
+                                      repeat=args.repeat,
+                                      spans_per_link=args.spans_per_link,
+                                      span_length=args.span_length,
+                                      seed=args.seed)
+                    records.append(record)
+                    print(json.dumps(record), file=sys.stderr)
+
+    print(format_table(records))
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(records, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# coding: utf-8
+"""
+合成网络拓扑。
+
+生成的文档与 NetworkDB 存储的网络文档格式一致：元素带有 element_id、name、library_id，
+连接带有 connection_id。每个站点由一个 Transceiver 和一个 Roadm 组成，站点之间的链路在两个方向上
+分别由若干段光纤及段间的线路放大器（Edfa）构成，ROADM 两侧的放大器由网络设计自动补全。
+"""
+import math
+import random
+from datetime import datetime
+
+from bson import ObjectId
+
+# Project imports
+from benchmarks.equipment import EDFA_TYPE, FIBER_LOSS_COEF, FIBER_TYPE, TRANSCEIVER_TYPE, span_parameters
+
+
+class NetworkBuilder:
+    """逐个添加站点和链路，构造网络文档"""
+
+    def __init__(self, user_id, library_id, network_name):
+        now = datetime.utcnow()
+        self.document = {
+            "user_id": ObjectId(user_id),
+            "network_name": network_name,
+            "created_at": now,
+            "updated_at": now,
+            "elements": [],
+            "connections": [],
+            "services": [],
+            "SI": {},
+            "Span": span_parameters(),
+            "simulation_config": {},
+            "revision": 0
+        }
+        self.library_id = str(library_id)
+        # 各站点 (Transceiver element_id, Roadm element_id, 经度, 纬度)
+        self.sites = []
+
+    @property
+    def transceivers(self):
+        return [site[0] for site in self.sites]
+
+    @property
+    def fiber_count(self):
+        return sum(1 for element in self.document['elements'] if element['type'] == 'Fiber')
+
+    def add_element(self, element_type, name, longitude, latitude, **fields):
+        element_id = str(ObjectId())
+        element = {
+            "element_id": element_id,
+            "name": name,
+            "type": element_type,
+            "metadata": {
+                "location": {"city": name, "region": "", "latitude": latitude, "longitude": longitude}
+            }
+        }
+        if element_type != 'Fused':
+            element["library_id"] = self.library_id
+        element.update(fields)
+        self.document['elements'].append(element)
+        return element_id
+
+    def connect(self, from_node, to_node):
+        self.document['connections'].append({
+            "connection_id": str(ObjectId()),
+            "from_node": from_node,
+            "to_node": to_node
+        })
+
+    def add_site(self, name, longitude, latitude):
+        """添加一个站点，返回站点序号"""
+        trx = self.add_element('Transceiver', f'trx {name}', longitude, latitude, type_variety=TRANSCEIVER_TYPE)
+        roadm = self.add_element('Roadm', f'roadm {name}', longitude, latitude, type_variety='default',
+                                 params={"target_pch_out_db": -20})
+        self.connect(trx, roadm)
+        self.connect(roadm, trx)
+        self.sites.append((trx, roadm, longitude, latitude))
+        return len(self.sites) - 1
+
+    def add_link(self, site_a, site_b, spans, span_length=80):
+        """在两个站点之间添加双向链路，每个方向 spans 段长度为 span_length 公里的光纤"""
+        self._add_direction(site_a, site_b, spans, span_length)
+        self._add_direction(site_b, site_a, spans, span_length)
+
+    def _add_direction(self, site_a, site_b, spans, span_length):
+        _, roadm_a, lon_a, lat_a = self.sites[site_a]
+        _, roadm_b, lon_b, lat_b = self.sites[site_b]
+        # 单段损耗，作为线路放大器的初始增益目标，网络设计会重新计算
+        span_loss = round(span_length * FIBER_LOSS_COEF, 2)
+        previous = roadm_a
+        for index in range(spans):
+            ratio = (index + 0.5) / spans
+            longitude, latitude = lon_a + (lon_b - lon_a) * ratio, lat_a + (lat_b - lat_a) * ratio
+            if index > 0:
+                edfa = self.add_element('Edfa', f'edfa {site_a}->{site_b} #{index}', longitude, latitude,
+                                        type_variety=EDFA_TYPE,
+                                        operational={"gain_target": span_loss, "delta_p": None,
+                                                     "tilt_target": 0, "out_voa": 0})
+                self.connect(previous, edfa)
+                previous = edfa
+            fiber = self.add_element('Fiber', f'fiber {site_a}->{site_b} #{index + 1}', longitude, latitude,
+                                     type_variety=FIBER_TYPE,
+                                     params={"length": span_length, "length_units": "km",
+                                             "loss_coef": FIBER_LOSS_COEF, "con_in": 0.5, "con_out": 0.5})
+            self.connect(previous, fiber)
+            previous = fiber
+        self.connect(previous, roadm_b)
+
+
+def _circle(builder, sites):
+    # 站点均匀分布在一个圆上
+    for index in range(sites):
+        angle = 2 * math.pi * index / sites
+        builder.add_site(f'site{index}', round(5 * math.cos(angle), 4), round(45 + 5 * math.sin(angle), 4))
+
+
+def linear_network(user_id, library_id, spans, span_length=80):
+    """两个站点之间一条 spans 段光纤的链路"""
+    builder = NetworkBuilder(user_id, library_id, f'linear-{spans}')
+    builder.add_site('A', 0.0, 45.0)
+    builder.add_site('B', round(spans * span_length / 80, 4), 45.0)
+    builder.add_link(0, 1, spans, span_length)
+    return builder
+
+
+def ring_network(user_id, library_id, sites, spans_per_link=3, span_length=80):
+    """sites 个站点组成的环网，相邻站点之间的链路各有 spans_per_link 段光纤"""
+    builder = NetworkBuilder(user_id, library_id, f'ring-{sites}')
+    _circle(builder, sites)
+    for index in range(sites):
+        builder.add_link(index, (index + 1) % sites, spans_per_link, span_length)
+    return builder
+
+
+def mesh_network(user_id, library_id, sites, spans_per_link=3, span_length=80, degree=3, seed=0):
+    """
+    sites 个站点的随机网状网络：在环网的基础上随机添加链路，直到平均节点度达到 degree。
+
+    :param seed: 随机数种子，相同参数生成相同的网络
+    """
+    builder = NetworkBuilder(user_id, library_id, f'mesh-{sites}')
+    _circle(builder, sites)
+    links = {tuple(sorted((index, (index + 1) % sites))) for index in range(sites)}
+    candidates = [(a, b) for a in range(sites) for b in range(a + 1, sites) if (a, b) not in links]
+    random.Random(seed).shuffle(candidates)
+    target = max(len(links), sites * degree // 2)
+    links.update(candidates[:max(0, target - len(links))])
+    for site_a, site_b in sorted(links):
+        builder.add_link(site_a, site_b, spans_per_link, span_length)
+    return builder
+
+
+TOPOLOGIES = {
+    'linear': linear_network,
+    'ring': ring_network,
+    'mesh': mesh_network,
+}
@@ -1,20 +1,38 @@
+import multiprocessing
+
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 from src.optinetsim_backend.app.config import Config
+from src.optinetsim_backend.app.log import setup_logging
 
 
 def create_app():
+    setup_logging()
     app = Flask(__name__)
     app.config.from_object(Config)
 
     # Initialize JWTManager
     jwt = JWTManager(app)
 
+    # 创建仿真结果缓存和频谱占用索引集合的索引
+    from src.optinetsim_backend.app.database.models import SimulationResultDB, SpectrumOccupancyDB
+    SimulationResultDB.ensure_indexes()
+    SpectrumOccupancyDB.ensure_indexes()
+
+    # 上次运行中未结束的异步仿真任务不会再有结果；仿真工作进程导入应用时跳过
+    if multiprocessing.parent_process() is None:
+        from src.optinetsim_backend.app.simulation.executor import fail_interrupted_jobs
+        fail_interrupted_jobs()
+
     # Register blueprints or resources here
     from src.optinetsim_backend.app.routes import api_init_app
     app = api_init_app(app)
 
+    # 请求指标和 Server-Timing
+    from src.optinetsim_backend.app.metrics import init_app as metrics_init_app
+    metrics_init_app(app)
+
     # Enable CORS
     CORS(app)
 
@@ -0,0 +1,87 @@
+from collections import OrderedDict
+from threading import Lock
+
+from src.optinetsim_backend.app.config import Config
+
+_MISSING = object()
+
+
+class LRUCache:
+    """线程安全的进程内 LRU 缓存，记录命中与未命中次数。"""
+
+    def __init__(self, name, maxsize=32):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """命中时返回缓存值，否则调用 factory 生成并写入缓存"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """删除满足 predicate(key) 的缓存项，predicate 为空时清空缓存"""
+        with self._lock:
+            if predicate is None:
+                self._data.clear()
+                return
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._data),
+                'maxsize': self.maxsize
+            }
+
+
+# 编译后的 GNPY 设备配置
+# 键为 (器件库ID及其 updated_at 组成的 frozenset, 网络 SI/Span 的哈希)
+equipment_cache = LRUCache('equipment', maxsize=Config.EQUIPMENT_CACHE_SIZE)
+
+
+def invalidate_equipment_library(library_id=None):
+    """器件库修改后使相关的设备配置缓存失效，library_id 为空时清空全部"""
+    if library_id is None:
+        equipment_cache.invalidate()
+        return
+    library_id = str(library_id)
+    equipment_cache.invalidate(lambda key: any(cached_id == library_id for cached_id, _ in key[0]))
+
+# 设计后的网络（DesignedNetwork）
+# 键为 (网络ID, revision, 设备配置缓存键, power, no_insert_edfas, 初始频谱哈希)
+design_cache = LRUCache('design', maxsize=Config.DESIGN_CACHE_SIZE)
+
+# 逐元素传播的快照（PathSnapshot），用于增量重仿真
+# 键为 (网络ID, 设备配置缓存键, power, no_insert_edfas, 初始频谱哈希, 源收发器, 目的收发器, 仿真参数哈希)，不含 revision
+propagation_cache = LRUCache('propagation', maxsize=Config.PROPAGATION_CACHE_SIZE)
+
+# 按 OMS 段记忆化的传播结果 (段内传播后的元素, 段输出的频谱信息)
+# 键为 (段内元素指纹的哈希, 段输入频谱信息的指纹, 设备配置缓存键, 仿真参数哈希)
+segment_cache = LRUCache('segment', maxsize=Config.SEGMENT_CACHE_SIZE)
@@ -9,3 +9,20 @@ class Config:
     MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/optinetsim')
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', '=pMpR!JjZV!N')
     JWT_ACCESS_TOKEN_EXPIRES = 36000  # 1 hour
+
+    # 进程内编译设备配置缓存的容量
+    EQUIPMENT_CACHE_SIZE = int(os.getenv('EQUIPMENT_CACHE_SIZE', 32))
+    # 进程内设计后网络缓存的容量
+    DESIGN_CACHE_SIZE = int(os.getenv('DESIGN_CACHE_SIZE', 16))
+    # 进程内传播快照（增量重仿真）缓存的容量
+    PROPAGATION_CACHE_SIZE = int(os.getenv('PROPAGATION_CACHE_SIZE', 8))
+    # 进程内 OMS 段传播结果缓存的容量
+    SEGMENT_CACHE_SIZE = int(os.getenv('SEGMENT_CACHE_SIZE', 256))
+    # 仿真工作进程数；设为 0 时仿真在请求线程中直接执行（用于调试和压测）
+    SIMULATION_WORKERS = int(os.getenv('SIMULATION_WORKERS', os.cpu_count() or 1))
+    # 仿真结果缓存的过期时间（秒）
+    SIMULATION_RESULT_TTL = int(os.getenv('SIMULATION_RESULT_TTL', 24 * 3600))
+    # 是否在响应中添加 Server-Timing 头
+    SERVER_TIMING = os.getenv('SERVER_TIMING', 'true').lower() == 'true'
+    # 日志级别，设为 DEBUG 时输出仿真过程的详细信息
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -1,7 +1,12 @@
+import os
+import socket
 from datetime import datetime
 from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
+from pymongo.results import UpdateResult
 from bson import ObjectId
 from src.optinetsim_backend.app.config import Config
+from src.optinetsim_backend.app.cache import invalidate_equipment_library
 
 client = MongoClient(Config.MONGO_URI)
 db = client.optinetsim
@@ -50,7 +55,9 @@ class NetworkDB:
             "services": [],
             "SI": {},
             "Span": {},
-            "simulation_config": {}
+            "simulation_config": {},
+            # 拓扑及仿真配置每次实际修改时递增，用于判断仿真缓存是否失效
+            "revision": 0
         }
         return db.networks.insert_one(network)
 
@@ -72,31 +79,35 @@ class NetworkDB:
     def add_element(network_id, element):
         return db.networks.update_one(
             {"_id": ObjectId(network_id)},
-            {"$push": {"elements": element}}
+            {"$push": {"elements": element}, "$inc": {"revision": 1}}
         )
 
     @staticmethod
     def update_element(network_id, element_id, element):
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id), "elements.element_id": element_id},
-            {"$set": {"elements.$": element}}
+            {"$set": {"elements.$": element}},
+            {"elements": element}
         )
 
     @staticmethod
     def delete_by_element_id(network_id, element_id):
-        # 删除与该 element 相关的连接关系
-        db.networks.update_one(
-            {"_id": ObjectId(network_id)},
-            {"$pull": {"connections": {"from_node": element_id}}}
-        )
-        db.networks.update_one(
+        # 同时删除元素及与该 element 相关的连接关系
+        # $pull 条件中不使用 $or（mongomock 不支持），按连接的两端分两次写入，每次写入各自递增 revision
+        result = NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$pull": {"connections": {"to_node": element_id}}}
+            {"$pull": {
+                "elements": {"element_id": element_id},
+                "connections": {"from_node": element_id}
+            }},
+            {"elements.element_id": {"$ne": element_id}, "connections.from_node": {"$ne": element_id}}
         )
-        return db.networks.update_one(
+        NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$pull": {"elements": {"element_id": element_id}}}
+            {"$pull": {"connections": {"to_node": element_id}}},
+            {"connections.to_node": {"$ne": element_id}}
         )
+        return result
 
     @staticmethod
     def find_by_user_id(user_id):
@@ -118,23 +129,26 @@ class NetworkDB:
 
     @staticmethod
     def update_simulation_config(network_id, simulation_config):
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$set": {"simulation_config": simulation_config}}
+            {"$set": {"simulation_config": simulation_config}},
+            {"simulation_config": simulation_config}
         )
 
     @staticmethod
     def update_spectrum_information(network_id, spectrum_information):
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$set": {"SI": spectrum_information}}
+            {"$set": {"SI": spectrum_information}},
+            {"SI": spectrum_information}
         )
 
     @staticmethod
     def update_span_parameters(network_id, span_parameters):
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$set": {"Span": span_parameters}}
+            {"$set": {"Span": span_parameters}},
+            {"Span": span_parameters}
         )
 
     @staticmethod
@@ -142,13 +156,13 @@ class NetworkDB:
         """向指定网络添加连接关系"""
         return db.networks.update_one(
             {"_id": ObjectId(network_id)},
-            {"$push": {"connections": connection_data}}
+            {"$push": {"connections": connection_data}, "$inc": {"revision": 1}}
         )
 
     @staticmethod
     def update_connection(network_id, connection_id, update_data):
         """更新指定网络的连接关系"""
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {
                 "_id": ObjectId(network_id),
                 "connections.connection_id": connection_id
@@ -158,15 +172,21 @@ class NetworkDB:
                     "connections.$.from_node": update_data["from_node"],
                     "connections.$.to_node": update_data["to_node"]
                 }
-            }
+            },
+            {"connections": {"$elemMatch": {
+                "connection_id": connection_id,
+                "from_node": update_data["from_node"],
+                "to_node": update_data["to_node"]
+            }}}
         )
 
     @staticmethod
     def delete_connection(network_id, connection_id):
         """从指定网络删除连接关系"""
-        return db.networks.update_one(
+        return NetworkDB._update_with_revision(
             {"_id": ObjectId(network_id)},
-            {"$pull": {"connections": {"connection_id": connection_id}}}
+            {"$pull": {"connections": {"connection_id": connection_id}}},
+            {"connections.connection_id": {"$ne": connection_id}}
         )
 
     @staticmethod
@@ -180,6 +200,22 @@ class NetworkDB:
             return network["elements"][0].get("name", None)
         return None
 
+    @staticmethod
+    def _update_with_revision(query, update, unchanged):
+        """
+        修改网络并在同一次写入中递增 revision，设计不会读到新的拓扑和旧的 revision。
+
+        :param query: 定位网络（及数组元素）的条件
+        :param update: 修改操作
+        :param unchanged: 修改不会改变文档时满足的条件，此时不写入，revision 保持不变
+        :return: UpdateResult，文档存在但没有变化时 matched_count 为 1、modified_count 为 0
+        """
+        result = db.networks.update_one({**query, "$nor": [unchanged]}, {**update, "$inc": {"revision": 1}})
+        if result.matched_count == 0 and db.networks.count_documents(query, limit=1):
+            return UpdateResult({"n": 1, "nModified": 0}, acknowledged=True)
+        return result
+
+
 class EquipmentLibraryDB:
     @staticmethod
     def create(user_id, library_name):
@@ -206,6 +242,13 @@ class EquipmentLibraryDB:
     def find_by_id(library_id):
         return db.equipment_libraries.find_one({"_id": ObjectId(library_id)})
 
+    @staticmethod
+    def find_by_ids(library_ids):
+        # 通过一次 $in 查询取回多个器件库
+        return list(db.equipment_libraries.find(
+            {"_id": {"$in": [ObjectId(library_id) for library_id in library_ids]}}
+        ))
+
     @staticmethod
     def find_by_type_variety(user_id, library_id, element_type, element_type_variety):
         # 返回器件库中是否存在该类型的器件，存在则返回该器件，否则返回 None
@@ -216,6 +259,7 @@ class EquipmentLibraryDB:
 
     @staticmethod
     def update(library_id, library_name):
+        invalidate_equipment_library(library_id)
         return db.equipment_libraries.find_one_and_update(
             {"_id": ObjectId(library_id)},
             {
@@ -229,10 +273,12 @@ class EquipmentLibraryDB:
 
     @staticmethod
     def delete(library_id):
+        invalidate_equipment_library(library_id)
         return db.equipment_libraries.delete_one({"_id": ObjectId(library_id)})
 
     @staticmethod
     def delete_by_user_id(user_id):
+        invalidate_equipment_library()
         return db.equipment_libraries.delete_many({"user_id": ObjectId(user_id)}).deleted_count
 
     # 新增器件的方法
@@ -248,23 +294,159 @@ class EquipmentLibraryDB:
         # 如果没有重复，添加器件到该类别
         db.equipment_libraries.update_one(
             {"_id": ObjectId(library_id)},
-            {"$push": {f"equipments.{category}": equipment}}
+            {
+                "$push": {f"equipments.{category}": equipment},
+                "$set": {"updated_at": datetime.utcnow()}
+            }
         )
+        invalidate_equipment_library(library_id)
         return True
 
     # 更新器件的方法
     @staticmethod
     def update_equipment(library_id, category, type_variety, equipment_update):
         # 更新器件信息
-        return db.equipment_libraries.update_one(
+        return EquipmentLibraryDB._touch(library_id, db.equipment_libraries.update_one(
             {"_id": ObjectId(library_id), f"equipments.{category}.type_variety": type_variety},
             {"$set": {f"equipments.{category}.$": equipment_update}}
-        )
+        ))
 
     # 删除器件的方法
     @staticmethod
     def delete_equipment(library_id, category, type_variety):
-        return db.equipment_libraries.update_one(
+        return EquipmentLibraryDB._touch(library_id, db.equipment_libraries.update_one(
             {"_id": ObjectId(library_id)},
             {"$pull": {f"equipments.{category}": {"type_variety": type_variety}}}
+        ))
+
+    @staticmethod
+    def _touch(library_id, result):
+        # 器件发生实际修改时更新 updated_at，并使设备配置缓存失效
+        if result.modified_count > 0:
+            db.equipment_libraries.update_one(
+                {"_id": ObjectId(library_id)},
+                {"$set": {"updated_at": datetime.utcnow()}}
+            )
+            invalidate_equipment_library(library_id)
+        return result
+
+
+class SimulationJobDB:
+    @staticmethod
+    def create(user_id, network_id, kind, params):
+        job = {
+            "user_id": ObjectId(user_id),
+            "network_id": ObjectId(network_id),
+            "kind": kind,
+            "params": params,
+            "status": "pending",
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            # 任务在创建它的服务进程的进程池中执行，服务重启后据此找出被中断的任务
+            "owner": {"host": socket.gethostname(), "pid": os.getpid()}
+        }
+        return db.simulation_jobs.insert_one(job)
+
+    @staticmethod
+    def find_by_id(user_id, job_id, include_result=False):
+        # 查询任务状态时不取回体积较大的结果
+        projection = None if include_result else {"result": 0}
+        return db.simulation_jobs.find_one({"_id": ObjectId(job_id), "user_id": ObjectId(user_id)}, projection)
+
+    @staticmethod
+    def find_unfinished(host):
+        """本机创建的（以及没有记录创建进程的）未结束任务"""
+        return db.simulation_jobs.find(
+            {"status": {"$in": ["pending", "running"]},
+             "$or": [{"owner.host": host}, {"owner": {"$exists": False}}]},
+            {"owner": 1}
+        )
+
+    @staticmethod
+    def mark_running(job_id):
+        # 只有 pending 状态的任务可以被领取，返回领取后的任务
+        return db.simulation_jobs.find_one_and_update(
+            {"_id": ObjectId(job_id), "status": "pending"},
+            {"$set": {"status": "running", "started_at": datetime.utcnow()}},
+            return_document=True
+        )
+
+    @staticmethod
+    def mark_finished(job_id, result):
+        return db.simulation_jobs.update_one(
+            {"_id": ObjectId(job_id)},
+            {"$set": {"status": "finished", "result": result, "finished_at": datetime.utcnow()}}
         )
+
+    @staticmethod
+    def mark_failed(job_id, error):
+        # 已结束的任务不再被覆盖
+        return db.simulation_jobs.update_one(
+            {"_id": ObjectId(job_id), "status": {"$in": ["pending", "running"]}},
+            {"$set": {"status": "failed", "error": error, "finished_at": datetime.utcnow()}}
+        )
+
+
+class SimulationResultDB:
+    """按请求内容寻址的仿真结果缓存，键由网络、器件库内容和请求参数的哈希构成"""
+
+    @staticmethod
+    def ensure_indexes():
+        db.simulation_results.create_index("key", unique=True)
+        # TTL 索引，MongoDB 会自动删除过期的结果
+        db.simulation_results.create_index("created_at", expireAfterSeconds=Config.SIMULATION_RESULT_TTL)
+
+    @staticmethod
+    def find(key):
+        doc = db.simulation_results.find_one({"key": key}, {"result": 1})
+        return doc['result'] if doc else None
+
+    @staticmethod
+    def save(key, network_id, result):
+        return db.simulation_results.update_one(
+            {"key": key},
+            {"$set": {"network_id": ObjectId(network_id), "result": result, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+
+class SpectrumOccupancyDB:
+    """每个网络的频谱占用索引（见 simulation.spectrum），以 version 字段实现乐观并发控制"""
+
+    @staticmethod
+    def ensure_indexes():
+        db.spectrum_occupancy.create_index("network_id", unique=True)
+
+    @staticmethod
+    def find(network_id):
+        return db.spectrum_occupancy.find_one({"network_id": ObjectId(network_id)})
+
+    @staticmethod
+    def save(network_id, occupancy, version=None):
+        """
+        写入频谱占用索引。
+
+        :param occupancy: 索引文档中除 network_id 和 version 外的字段
+        :param version: 读取时的 version，为空表示此前没有索引
+        :return: 是否写入成功，索引已被其他请求修改时返回 False
+        """
+        now = datetime.utcnow()
+        if version is None:
+            try:
+                db.spectrum_occupancy.insert_one(
+                    dict(occupancy, network_id=ObjectId(network_id), version=1, updated_at=now))
+            except DuplicateKeyError:
+                return False
+            return True
+        result = db.spectrum_occupancy.update_one(
+            {"network_id": ObjectId(network_id), "version": version},
+            {"$set": dict(occupancy, updated_at=now), "$inc": {"version": 1}}
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    def delete(network_id):
+        return db.spectrum_occupancy.delete_one({"network_id": ObjectId(network_id)})
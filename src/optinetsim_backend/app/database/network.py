@@ -3,7 +3,7 @@ from flask_restful import Resource, reqparse
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
 # Project imports
-from src.optinetsim_backend.app.database.models import NetworkDB
+from src.optinetsim_backend.app.database.models import NetworkDB, SpectrumOccupancyDB
 
 
 class NetworkList(Resource):
@@ -76,5 +76,7 @@ class NetworkResource(Resource):
         user_id = get_jwt_identity()
         network = NetworkDB.delete_by_network_id(user_id, network_id)
         if network:
+            # 网络的频谱占用索引随网络一起删除
+            SpectrumOccupancyDB.delete(network_id)
             return {'message': 'Network deleted successfully'}, 200
         return {'message': 'Network not found'}, 404
\ No newline at end of file
@@ -0,0 +1,92 @@
+# coding: utf-8
+"""
+接口响应的编码方式，按请求的 Accept 头选择：
+
+- application/json（默认）：支持 NumPy 数组和标量的 JSON
+- application/msgpack：MessagePack，NumPy 数组编码为 {"__ndarray__": true, "dtype", "shape", "data"}，
+  data 直接引用数组的内存缓冲区
+- application/x-npz：NumPy npz 文件，数值数组以原生格式保存，其余内容以 JSON 保存在 __meta__ 中，
+  原数组的位置替换为 {"__ndarray__": 数组在 npz 中的名称}
+"""
+import io
+import json
+
+import msgpack
+import numpy as np
+from flask import current_app, make_response
+
+MSGPACK_MIMETYPE = 'application/msgpack'
+NPZ_MIMETYPE = 'application/x-npz'
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _msgpack_default(obj):
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        obj = np.ascontiguousarray(obj)
+        return {'__ndarray__': True, 'dtype': obj.dtype.str, 'shape': list(obj.shape), 'data': obj.data}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f'Object of type {type(obj).__name__} is not MessagePack serializable')
+
+
+def _extract_arrays(obj, name, arrays):
+    """将结果中的数值数组取出放入 arrays，原位置替换为引用，返回可 JSON 编码的结构"""
+    if isinstance(obj, dict):
+        return {key: _extract_arrays(value, f'{name}/{key}' if name else str(key), arrays)
+                for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_extract_arrays(value, f'{name}/{index}', arrays) for index, value in enumerate(obj)]
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        arrays[name] = obj
+        return {'__ndarray__': name}
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+
+def output_json(data, code, headers=None):
+    """与 Flask-RESTful 默认的 JSON 输出相同，额外支持 NumPy 类型"""
+    settings = current_app.config.get('RESTFUL_JSON', {})
+    if current_app.debug:
+        settings.setdefault('indent', 4)
+    dumped = json.dumps(data, default=_json_default, **settings) + '\n'
+    resp = make_response(dumped, code)
+    resp.headers.extend(headers or {})
+    return resp
+
+
+def output_msgpack(data, code, headers=None):
+    resp = make_response(msgpack.packb(data, default=_msgpack_default), code)
+    resp.headers.extend(headers or {})
+    resp.headers['Content-Type'] = MSGPACK_MIMETYPE
+    return resp
+
+
+def output_npz(data, code, headers=None):
+    arrays = {}
+    meta = _extract_arrays(data, '', arrays)
+    arrays['__meta__'] = np.array(json.dumps(meta, default=_json_default))
+    buffer = io.BytesIO()
+    np.savez(buffer, **arrays)
+    resp = make_response(buffer.getvalue(), code)
+    resp.headers.extend(headers or {})
+    resp.headers['Content-Type'] = NPZ_MIMETYPE
+    return resp
+
+
+def register_representations(api):
+    """在 Flask-RESTful Api 上注册各响应编码，JSON 保持为默认"""
+    api.representation('application/json')(output_json)
+    api.representation(MSGPACK_MIMETYPE)(output_msgpack)
+    api.representation(NPZ_MIMETYPE)(output_npz)
@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+日志配置。
+
+日志记录先放入内存队列，由后台线程（QueueListener）写出，请求线程和仿真工作进程不会阻塞在输出上。
+日志行末尾附带结构化字段（network_id、stage、duration），network_id 等上下文字段通过 log_context 设置。
+"""
+import atexit
+import logging
+import queue
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+# Project imports
+from src.optinetsim_backend.app.config import Config
+
+STRUCTURED_FIELDS = ('network_id', 'stage', 'duration')
+
+_context_fields = ContextVar('log_context_fields', default={})
+_listener = None
+
+
+@contextmanager
+def log_context(**fields):
+    """在上下文中记录的日志都附带给定的字段"""
+    token = _context_fields.set({**_context_fields.get(), **fields})
+    try:
+        yield
+    finally:
+        _context_fields.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """将 log_context 设置的字段写入日志记录，在记录日志的线程中执行"""
+
+    def filter(self, record):
+        for key, value in _context_fields.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    """在日志消息后以 key=value 的形式附加结构化字段"""
+
+    def format(self, record):
+        message = super().format(record)
+        fields = ' '.join(f'{key}={getattr(record, key)}' for key in STRUCTURED_FIELDS if hasattr(record, key))
+        return f'{message} {fields}' if fields else message
+
+
+def setup_logging(level=None):
+    """为本进程配置经队列异步写出的日志，重复调用时不做任何事"""
+    global _listener
+    if _listener is not None:
+        return
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(StructuredFormatter('%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s'))
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(level or Config.LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,251 @@
+# coding: utf-8
+"""
+进程内指标，以 Prometheus 文本格式在 /api/metrics 导出。
+
+- 请求级指标：每个接口的请求数、延迟和响应大小，由 init_app 注册的请求钩子记录
+- 阶段耗时：stage() 记录的各仿真阶段（加载、设备配置、网络构建、设计、传播、结果组装）的耗时。
+  工作进程中记录的阶段随任务结果一起返回服务进程，见 executor.SimulationExecutor.submit
+- 缓存：服务进程及各工作进程的 LRU 缓存命中情况
+
+同一请求中记录的阶段耗时还会写入响应的 Server-Timing 头。
+"""
+import logging
+import os
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from flask import Response, g, request
+from flask_restful import Resource
+
+# Project imports
+from src.optinetsim_backend.app.cache import design_cache, equipment_cache, propagation_cache, segment_cache
+from src.optinetsim_backend.app.config import Config
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+logger = logging.getLogger(__name__)
+
+_registry = []
+_local = threading.local()
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name + '_total', dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 每个桶的（非累计）计数、总和、总数
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket', {**labels, 'le': repr(float(bound))}, cumulative
+            yield self.name + '_bucket', {**labels, 'le': '+Inf'}, count
+            yield self.name + '_sum', labels, total
+            yield self.name + '_count', labels, count
+
+
+REQUEST_SECONDS = Histogram('optinetsim_request_duration_seconds', '接口请求耗时', ('endpoint', 'method', 'status'))
+RESPONSE_BYTES = Histogram('optinetsim_response_size_bytes', '接口响应大小', ('endpoint',),
+                           buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216))
+STAGE_SECONDS = Histogram('optinetsim_simulation_stage_duration_seconds', '仿真各阶段耗时', ('stage',))
+RESULT_CACHE = Counter('optinetsim_result_cache_lookups', '仿真结果缓存查询次数', ('outcome',))
+
+_CACHE_METRICS = (
+    ('optinetsim_cache_hits_total', 'counter', 'LRU 缓存命中次数'),
+    ('optinetsim_cache_misses_total', 'counter', 'LRU 缓存未命中次数'),
+    ('optinetsim_cache_entries', 'gauge', 'LRU 缓存条目数'),
+)
+
+# 工作进程最近一次返回的缓存统计，键为进程号
+_worker_caches = {}
+_worker_caches_lock = threading.Lock()
+
+
+def _collecting():
+    return getattr(_local, 'stages', None)
+
+
+@contextmanager
+def collect_stages():
+    """收集本线程在上下文中记录的阶段耗时，产出 [(stage, seconds), ...]"""
+    previous = _collecting()
+    _local.stages = []
+    try:
+        yield _local.stages
+    finally:
+        _local.stages = previous
+
+
+def record_stage(name, seconds):
+    STAGE_SECONDS.observe(seconds, stage=name)
+    add_stage_timings([(name, seconds)])
+    logger.debug('stage finished', extra={'stage': name, 'duration': f'{seconds:.4f}'})
+
+
+def add_stage_timings(timings):
+    """将其他进程返回的阶段耗时加入本线程的收集（如当前请求的 Server-Timing），不重复计入直方图"""
+    stages = _collecting()
+    if stages is not None:
+        stages.extend(timings)
+
+
+@contextmanager
+def stage(name):
+    """记录一个仿真阶段的耗时"""
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, perf_counter() - start)
+
+
+def cache_snapshot():
+    """本进程 LRU 缓存的统计，工作进程随任务结果返回"""
+    return os.getpid(), [equipment_cache.stats(), design_cache.stats(), propagation_cache.stats(),
+                         segment_cache.stats()]
+
+
+def update_worker_caches(snapshot):
+    pid, stats = snapshot
+    if pid == os.getpid():
+        return
+    with _worker_caches_lock:
+        _worker_caches[pid] = stats
+
+
+def _cache_samples():
+    totals = {}
+    with _worker_caches_lock:
+        snapshots = list(_worker_caches.values())
+    for stats in [cache_snapshot()[1]] + snapshots:
+        for cache in stats:
+            total = totals.setdefault(cache['name'], {'hits': 0, 'misses': 0, 'size': 0})
+            for field in total:
+                total[field] += cache[field]
+    for name, total in totals.items():
+        yield 'optinetsim_cache_hits_total', {'cache': name}, total['hits']
+        yield 'optinetsim_cache_misses_total', {'cache': name}, total['misses']
+        yield 'optinetsim_cache_entries', {'cache': name}, total['size']
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+def render():
+    """以 Prometheus 文本格式输出所有指标"""
+    lines = []
+    for metric in _registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(f'{name}{_format_labels(labels)} {value}' for name, labels, value in metric.samples())
+    cache_samples = list(_cache_samples())
+    for name, kind, documentation in _CACHE_METRICS:
+        lines.append(f'# HELP {name} {documentation}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(f'{sample}{_format_labels(labels)} {value}'
+                     for sample, labels, value in cache_samples if sample == name)
+    return '\n'.join(lines) + '\n'
+
+
+def _server_timing(timings, total):
+    # 同名阶段（如分块并行执行的任务）的耗时相加
+    durations = {}
+    for name, seconds in timings:
+        durations[name] = durations.get(name, 0) + seconds
+    durations['total'] = total
+    return ', '.join(f'{name};dur={seconds * 1000:.1f}' for name, seconds in durations.items())
+
+
+def init_app(app):
+    """注册记录请求指标和 Server-Timing 的请求钩子"""
+
+    @app.before_request
+    def _start_request():
+        g.metrics_start = perf_counter()
+        _local.stages = []
+
+    @app.after_request
+    def _finish_request(response):
+        start = g.pop('metrics_start', None)
+        timings, _local.stages = _collecting() or [], None
+        if start is None:
+            return response
+        duration = perf_counter() - start
+        endpoint = request.endpoint or 'unknown'
+        REQUEST_SECONDS.observe(duration, endpoint=endpoint, method=request.method, status=response.status_code)
+        size = response.calculate_content_length()
+        # 流式响应没有确定的长度
+        if size is not None:
+            RESPONSE_BYTES.observe(size, endpoint=endpoint)
+        if Config.SERVER_TIMING:
+            response.headers['Server-Timing'] = _server_timing(timings, duration)
+        return response
+
+    return app
+
+
+class MetricsResource(Resource):
+    def get(self):
+        """Prometheus 指标接口"""
+        return Response(render(), mimetype='text/plain; version=0.0.4')
@@ -1,6 +1,8 @@
 from flask_restful import Api
 
 # Project imports
+from src.optinetsim_backend.app.encoders import register_representations
+from src.optinetsim_backend.app.metrics import MetricsResource
 from src.optinetsim_backend.app.auth import *
 from src.optinetsim_backend.app.database import *
 from src.optinetsim_backend.app.simulation import *
@@ -8,6 +10,8 @@ from src.optinetsim_backend.app.simulation import *
 
 def api_init_app(app):
     api = Api(app)
+    # 按 Accept 头选择 JSON、MessagePack 或 npz 编码
+    register_representations(api)
 
     # 用户认证相关接口
     api.add_resource(LoginResource, '/api/auth/login')
@@ -49,6 +53,28 @@ def api_init_app(app):
     # 仿真相关接口
     # 添加单链路仿真接口
     api.add_resource(SingleLinkSimulationResource, '/api/simulation/single-link')
+    # 批量单链路仿真接口
+    api.add_resource(BatchSimulationResource, '/api/simulation/batch')
+    # 流式单链路仿真接口
+    api.add_resource(SingleLinkStreamResource, '/api/simulation/single-link/stream')
+    # 单链路功率扫描接口
+    api.add_resource(PowerSweepSimulationResource, '/api/simulation/single-link/sweep')
+    # 单链路 GSNR 估算接口
+    api.add_resource(SingleLinkEstimateResource, '/api/simulation/single-link/estimate')
+    # 业务规划接口
+    api.add_resource(PlanningResource, '/api/simulation/planning')
+    # 异步仿真任务接口
+    api.add_resource(SimulationJobList, '/api/simulation/jobs')
+    api.add_resource(SimulationJobResource, '/api/simulation/jobs/<string:job_id>')
+    api.add_resource(SimulationJobResult, '/api/simulation/jobs/<string:job_id>/result')
+    # 频谱占用查询及业务频谱分配、释放接口
+    api.add_resource(SpectrumOccupancyResource, '/api/networks/<string:network_id>/spectrum')
+    api.add_resource(SpectrumAllocationList, '/api/networks/<string:network_id>/spectrum/allocations')
+    api.add_resource(SpectrumAllocationResource,
+                     '/api/networks/<string:network_id>/spectrum/allocations/<string:service_id>')
+
+    # 指标接口（Prometheus 文本格式）
+    api.add_resource(MetricsResource, '/api/metrics')
 
     api.init_app(app)
 
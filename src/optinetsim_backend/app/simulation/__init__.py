@@ -1,7 +1,28 @@
 # TODO: API resource for simulation
-from .simulation_api import SingleLinkSimulationResource
+from .simulation_api import (
+    SingleLinkSimulationResource,
+    SingleLinkStreamResource,
+    BatchSimulationResource,
+    PowerSweepSimulationResource,
+    SingleLinkEstimateResource,
+    PlanningResource,
+    SimulationJobList,
+    SimulationJobResource,
+    SimulationJobResult
+)
+from .spectrum_api import SpectrumOccupancyResource, SpectrumAllocationList, SpectrumAllocationResource
 
 __all__ = [
-    'SingleLinkSimulationResource'
+    'SingleLinkSimulationResource',
+    'SingleLinkStreamResource',
+    'BatchSimulationResource',
+    'PowerSweepSimulationResource',
+    'SingleLinkEstimateResource',
+    'PlanningResource',
+    'SimulationJobList',
+    'SimulationJobResource',
+    'SimulationJobResult',
+    'SpectrumOccupancyResource',
+    'SpectrumAllocationList',
+    'SpectrumAllocationResource',
 ]
-
@@ -1,8 +1,13 @@
 import argparse
 import logging
 import sys
+from contextlib import contextmanager
+from copy import deepcopy
+from itertools import islice
 from pathlib import Path
-from numpy import mean
+from numpy import linspace, mean
+
+import networkx as nx
 
 import gnpy.core.ansi_escapes as ansi_escapes
 from gnpy.core.elements import Transceiver, Fiber, RamanFiber, Roadm
@@ -10,155 +15,461 @@ from gnpy.core.utils import automatic_nch, watt2dbm, dbm2watt, pretty_summary_pr
 import gnpy.core.exceptions as exceptions
 from gnpy.core.parameters import SimParams
 from gnpy.core.utils import lin2db, pretty_summary_print, per_label_average, watt2dbm
-from gnpy.topology.request import (ResultElement, jsontocsv, BLOCKING_NOPATH)
+from gnpy.topology.request import (ResultElement, jsontocsv, BLOCKING_NOPATH, propagate)
 from gnpy.tools.plots import plot_baseline, plot_results
+from gnpy.core.network import design_network
 from gnpy.tools.worker_utils import designed_network, transmission_simulation, planning
 from gnpy.tools.json_io import load_initial_spectrum,_spectrum_from_json
 
 # Project imports
-from src.optinetsim_backend.app.simulation.loader import (
-    load_network_from_database,
-    load_equipment_from_database,
-    load_sim_parameters_from_database
-)
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
 from src.optinetsim_backend.app.simulation.sim_params import generate_simulation_parameters
+from src.optinetsim_backend.app.simulation.results import CHANNEL_FORMAT_COLUMNAR, channel_columns, channel_rows
+from src.optinetsim_backend.app.simulation.segments import propagate_segments
+from src.optinetsim_backend.app.cache import design_cache
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.utils import stable_hash
+
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationError(Exception):
+    """仿真无法完成时抛出，消息可直接返回给调用方"""
+
+
+# 本进程当前生效的 SimParams 的哈希
+_applied_sim_params = None
+
+
+def apply_sim_params(sim_params):
+    """设置本进程的 GNPY SimParams（进程级全局状态），参数未变化时跳过"""
+    global _applied_sim_params
+    key = stable_hash(sim_params)
+    if key != _applied_sim_params:
+        SimParams.set_params(sim_params)
+        _applied_sim_params = key
+
+
+class PathIndex:
+    """
+    设计后网络的路径索引，随设计结果一起缓存，同一 revision 的所有仿真共用。
+
+    索引只保存元素 uid，不引用网络元素，因此 DesignedNetwork 的各个副本都可以使用：
+
+    - transceivers: 收发器 uid 列表
+    - path / k_shortest_paths: 收发器对之间的最短路径和 k 条最短路径，首次查询时在 uid 图上计算并记住
+    - oms: 光复用段（OMS），每段为从 ROADM 出发、经过线路元素到达下一个 ROADM 的 uid 序列（含两端）
+    """
+
+    def __init__(self, network):
+        self.transceivers = [n.uid for n in network.nodes() if isinstance(n, Transceiver)]
+        self.has_raman = any(isinstance(n, RamanFiber) for n in network.nodes())
+        # 与 GNPY 的路径计算相同，按边的 weight 计算最短路径
+        self._graph = nx.DiGraph()
+        self._graph.add_nodes_from(n.uid for n in network.nodes())
+        self._graph.add_weighted_edges_from((a.uid, b.uid, weight)
+                                            for a, b, weight in network.edges(data='weight', default=1))
+        self._paths = {}
+        self._k_paths = {}
+        self.oms = _oms_segments(network)
+        # (OMS 起点 uid, 下一个元素 uid) 到 OMS 序号的映射
+        self._oms_by_start = {(segment[0], segment[1]): index for index, segment in enumerate(self.oms)}
+
+    def path(self, source_uid, destination_uid):
+        """
+        两个元素之间的最短路径（uid 列表），不存在时返回 None。
+
+        与 GNPY 的 compute_constrained_path 相同，取 shortest_simple_paths 的第一条路径，
+        存在多条等长路径时选择的路径也相同。
+        """
+        key = (source_uid, destination_uid)
+        if key not in self._paths:
+            try:
+                self._paths[key] = next(nx.shortest_simple_paths(self._graph, source_uid, destination_uid,
+                                                                 weight='weight'))
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                self._paths[key] = None
+        return self._paths[key]
+
+    def k_shortest_paths(self, source_uid, destination_uid, k):
+        """两个元素之间按长度递增的至多 k 条无环路径（uid 列表的列表）"""
+        key = (source_uid, destination_uid, k)
+        if key not in self._k_paths:
+            try:
+                self._k_paths[key] = list(islice(
+                    nx.shortest_simple_paths(self._graph, source_uid, destination_uid, weight='weight'), k))
+            except (nx.NetworkXNoPath, nx.NodeNotFound):
+                self._k_paths[key] = []
+        return self._k_paths[key]
+
+    def has_path(self, path_uids):
+        """路径上相邻元素之间的连接是否都存在"""
+        return all(self._graph.has_edge(a, b) for a, b in zip(path_uids, path_uids[1:]))
+
+    def path_oms(self, path_uids):
+        """路径依次经过的 OMS 序号"""
+        return [self._oms_by_start[pair] for pair in zip(path_uids, path_uids[1:]) if pair in self._oms_by_start]
+
+
+def _oms_segments(network):
+    # 从每个 ROADM 的每个出方向沿线路元素前进，直到到达下一个 ROADM
+    segments = []
+    for roadm in (n for n in network.nodes() if isinstance(n, Roadm)):
+        for node in network.successors(roadm):
+            segment = [roadm.uid]
+            while not isinstance(node, (Roadm, Transceiver)) and len(segment) <= network.number_of_nodes():
+                segment.append(node.uid)
+                node = next(iter(network.successors(node)), None)
+                if node is None:
+                    break
+            if isinstance(node, Roadm):
+                segment.append(node.uid)
+                segments.append(segment)
+    return segments
+
+
+class DesignedNetwork:
+    """
+    一次网络设计的结果：设计后的网络、设计参考请求、所用的设备配置及路径索引。
+
+    设计（补全 EDFA 并运行 design_network）作用于整个网络，与源/目的收发器无关，
+    因此缓存后可供任意收发器对复用。传播会修改网络元素的状态，必须在 clone() 得到的副本上进行。
+    """
+
+    def __init__(self, equipment, network, req=None, ref_req=None, network_id=None, index=None, nodes=None,
+                 shared=None, equipment_key=None):
+        self.equipment = equipment
+        # 设备配置的键（SimulationContext.equipment_key），用于区分不同设备配置下的缓存结果
+        self.equipment_key = equipment_key
+        self.network = network
+        self.req = req
+        self.ref_req = ref_req
+        self.network_id = network_id
+        self.index = index or PathIndex(network)
+        # uid 到网络元素的映射
+        self.nodes = nodes if nodes is not None else {n.uid: n for n in network.nodes()}
+        # 由设计派生、与缓存中的设计共用的数据（如估算模式的噪声贡献表），按名称保存
+        self.shared = shared if shared is not None else {}
+
+    def clone(self):
+        """返回可独立传播的副本，缓存中的设计保持不变，路径索引和 shared 共用"""
+        # 映射与网络一起复制，副本中的映射直接指向副本的元素；
+        # transmission_simulation 会修改 ref_req.power，请求也必须复制
+        network, nodes, req, ref_req = deepcopy((self.network, self.nodes, self.req, self.ref_req))
+        return DesignedNetwork(self.equipment, network, req, ref_req, self.network_id, self.index, nodes,
+                               self.shared, self.equipment_key)
+
+    def for_pair(self):
+        """
+        返回用于下一对收发器传播的设计，同一份设计依次传播多对收发器时使用。
+
+        power_range_db 有多个功率点时，transmission_simulation 会按各功率重新设计路径并修改 ref_req，
+        此时每对收发器都在副本上传播；只有一个功率点时传播不改变设计，直接返回自身。
+        """
+        if len(power_offsets_db(self.equipment)) > 1:
+            return self.clone()
+        return self
+
+    def transceivers(self):
+        """uid 到收发器的映射"""
+        return {uid: self.nodes[uid] for uid in self.index.transceivers}
+
+    def path(self, source_uid, destination_uid):
+        """两个收发器之间的最短路径（网络元素列表），不存在时返回 None"""
+        uids = self.index.path(source_uid, destination_uid)
+        return [self.nodes[uid] for uid in uids] if uids else None
+
+    def request_for(self, source_uid, destination_uid, nodes_list=None, loose_list=None):
+        """基于设计时的请求构造指定收发器对的传播请求"""
+        req = deepcopy(self.req)
+        req.source = source_uid
+        req.destination = destination_uid
+        req.nodes_list = nodes_list or [destination_uid]
+        req.loose_list = loose_list or ['STRICT']
+        return req
+
+
+def design_key(context, spectrum=None, power=0, no_insert_edfas=False):
+    """设计缓存的键：网络 revision、设备配置及所有影响设计的输入"""
+    return (context.network_id, context.revision, context.equipment_key(),
+            power, bool(no_insert_edfas), stable_hash(spectrum))
+
+
+def get_designed_network(context, spectrum: dict = None, power=0, no_insert_edfas=False):
+    """
+    获取网络的设计结果，命中缓存时跳过 EDFA 补全和 design_network。
+
+    :param context: 仿真上下文
+    :param spectrum: 仿真传输所用的频谱信息字典
+    :param power: 跨段输入光功率参考
+    :param no_insert_edfas: 是否禁用插入 EDFAs
+    :return: 可独立传播的 DesignedNetwork 副本
+    """
+    design = design_cache.get_or_create(
+        design_key(context, spectrum, power, no_insert_edfas),
+        lambda: _design_network(context, spectrum, power, no_insert_edfas)
+    )
+    return design.clone()
+
+
+def _design_network(context, spectrum=None, power=0, no_insert_edfas=False):
+    equipment = context.build_equipment()
+    network = context.build_network(equipment)
+    transceivers = [n.uid for n in network.nodes() if isinstance(n, Transceiver)]
+    if len(transceivers) < 2:
+        # 收发器不足时无法设计，由调用方给出提示
+        return DesignedNetwork(equipment, network, network_id=context.network_id,
+                               equipment_key=context.equipment_key())
+
+    initial_spectrum = None
+    if spectrum:
+        # use the spectrum defined by user for the propagation.
+        # the nb of channel for design remains the one of the reference channel
+        initial_spectrum = _spectrum_from_json(spectrum)
+        logger.info('User input for spectrum used for propagation instead of SI')
+    # 设计与收发器对无关，任取两个收发器构造参考请求，实际传播请求由 request_for 生成
+    with stage('design'):
+        network, req, ref_req = designed_network(equipment, network, transceivers[0], transceivers[1],
+                                                 args_power=power,
+                                                 initial_spectrum=initial_spectrum,
+                                                 no_insert_edfas=no_insert_edfas)
+    return DesignedNetwork(equipment, network, req, ref_req, context.network_id,
+                           equipment_key=context.equipment_key())
+
+
+@contextmanager
+def gnpy_errors():
+    """将 GNPY 的异常转换为 SimulationError，避免在服务进程中调用 sys.exit"""
+    try:
+        yield
+    except exceptions.NetworkTopologyError as e:
+        raise SimulationError(f'Invalid network definition: {e}') from e
+    except exceptions.ConfigurationError as e:
+        raise SimulationError(f'Configuration error: {e}') from e
+    except exceptions.ServiceError as e:
+        raise SimulationError(f'Service error: {e}') from e
+    except ValueError as e:
+        raise SimulationError(f'Value error: {e}') from e
 
 
 # Simulate the network
-def simulate_network(user_id, network_id, source_uid, destination_uid, plot=False, spectrum: dict = None, power = 0, no_insert_edfas = False):
-    equipment = load_equipment_from_database(user_id, network_id)
-    network = load_network_from_database(user_id, network_id, equipment)
+def simulate_network(user_id, network_id, source_uid, destination_uid, plot=False, spectrum: dict = None, power = 0, no_insert_edfas = False,
+                     context: SimulationContext = None, channel_format='rows'):
+    # 网络文档和器件库只查询一次，之后的构建都基于这份快照；调用方已加载时直接复用
+    if context is None:
+        context = SimulationContext.load(user_id, network_id)
+    if context is None:
+        raise SimulationError('未找到网络')
+    sim_params = context.build_sim_params()
+    with gnpy_errors():
+        # 设计结果按网络 revision 和设计参数缓存，这里得到的是可独立传播的副本
+        design = get_designed_network(context, spectrum=spectrum, power=power, no_insert_edfas=no_insert_edfas)
     if plot:
-        plot_baseline(network)
-    sim_params = load_sim_parameters_from_database(user_id, network_id)
+        plot_baseline(design.network)
     # print(sim_params)
-    if next((node for node in network if isinstance(node, RamanFiber)), None) is not None:
-        print(f'{ansi_escapes.red}调用错误:{ansi_escapes.reset} '
-              f'RamanFiber 需要通过 --sim-params 传递仿真参数')
-        sys.exit(1)
-    SimParams.set_params(sim_params)
-
-    transceivers = {n.uid: n for n in network.nodes() if isinstance(n, Transceiver)}
-    if not transceivers:
-        return '网络中未找到收发器'
-    if len(transceivers) < 2:
-        return '至少需要两个收发器才能进行网络仿真'
+    apply_sim_params(sim_params)
+    return propagate_pair(design, source_uid, destination_uid, plot=plot, channel_format=channel_format)
+
+
+def propagate_pair(design, source_uid, destination_uid, plot=False, channel_format='rows'):
+    """
+    在设计后的网络上计算一对收发器之间的传播。
+
+    同一个 DesignedNetwork 依次用于多对收发器的传播时，每对收发器使用 design.for_pair()，
+    调用方需保证本进程的 SimParams 已设置。
+
+    :param design: DesignedNetwork，传播会修改其中网络元素的状态
+    :param source_uid: 源收发器的 uid，不存在时任选一个收发器
+    :param destination_uid: 目标收发器的 uid，不存在时任选一个收发器
+    :param channel_format: 通道结果格式，'rows' 为每个通道一个字典，'columnar' 为按指标排列的并行数组
+    :return: (spans, infos, res_path, mypath, channel_data)
+    """
+    equipment = design.equipment
+    network = design.network
+    check_propagation(design)
+
+    transceivers = design.transceivers()
 
     source = transceivers.pop(source_uid, None)
     destination = transceivers.pop(destination_uid, None)
-    #print('源节点:', source)
-    #print('目标节点:', destination)
     nodes_list = []
     loose_list = []
 
     if not source:
         source = list(transceivers.values())[0]
         del transceivers[source.uid]
-        print('No source node specified: picking random transceiver')
+        logger.warning('No source node specified: picking random transceiver %s', source.uid)
 
     if not destination:
         destination = list(transceivers.values())[0]
         nodes_list = [destination.uid]
         loose_list = ['STRICT']
-        print('No destination node specified: picking random transceiver')
+        logger.warning('No destination node specified: picking random transceiver %s', destination.uid)
 
-    initial_spectrum = None
-    if spectrum:
-        # use the spectrum defined by user for the propagation.
-        # the nb of channel for design remains the one of the reference channel
-        initial_spectrum = _spectrum_from_json(spectrum)
-        print('User input for spectrum used for propagation instead of SI')
     power_mode = equipment['Span']['default'].power_mode
-    print('\n'.join([f'功率模式设置为 {power_mode}',
-                     '=> 可在网络 Span 中修改该配置']))
-    try:
-        #print(nodes_list, loose_list)
-        network, req, ref_req = designed_network(equipment, network, source.uid, destination.uid,
-                                                 nodes_list=nodes_list, loose_list=loose_list,
-                                                 args_power=power,
-                                                 initial_spectrum=initial_spectrum,
-                                                 no_insert_edfas=no_insert_edfas,)
-        path, propagations_for_path, powers_dbm, infos = transmission_simulation(equipment, network, req, ref_req)
-    except exceptions.NetworkTopologyError as e:
-        print(f'{ansi_escapes.red}Invalid network definition:{ansi_escapes.reset} {e}')
-        sys.exit(1)
-    except exceptions.ConfigurationError as e:
-        print(f'{ansi_escapes.red}Configuration error:{ansi_escapes.reset} {e}')
-        sys.exit(1)
-    except exceptions.ServiceError as e:
-        print(f'Service error: {e}')
-        sys.exit(1)
-    except ValueError:
-        sys.exit(1)
+    logger.debug('功率模式设置为 %s，可在网络 Span 中修改该配置', power_mode)
+    with gnpy_errors(), stage('propagate'):
+        req = design.request_for(source.uid, destination.uid, nodes_list, loose_list)
+        ref_req = design.ref_req
+        offsets_db = power_offsets_db(equipment)
+        if len(offsets_db) > 1:
+            # 功率扫描由 transmission_simulation 完成
+            path, propagations_for_path, powers_dbm, infos = transmission_simulation(equipment, network, req, ref_req)
+        else:
+            # 只有一个功率点时与 transmission_simulation 相同，但路径直接从索引中取得，
+            # 并复用其他传播中相同 OMS 段的结果，见 segments 模块
+            path = design.path(source.uid, destination.uid)
+            if not path:
+                raise SimulationError('源和目的收发器之间没有可用路径')
+            powers_dbm = [watt2dbm(req.power) + offsets_db[0]]
+            req.power = dbm2watt(powers_dbm[0])
+            infos = propagate_segments(path, req, equipment, design.equipment_key, _applied_sim_params)
+            propagations_for_path = [path]
     if plot:
         plot_results(network, path, source, destination)
     spans = [s.params.length for s in path if isinstance(s, RamanFiber) or isinstance(s, Fiber)]
-    print(f'\n在 {source.uid} 和 {destination.uid} 之间有 {len(spans)} 段光纤，总长 {sum(spans) / 1000:.0f} 公里')
-    print(f'\n正在计算 {source.uid} 到 {destination.uid} 的传播：')
-    print(f'设计使用的参考值: (跨段输入光功率参考 = {watt2dbm(ref_req.power):.2f} dBm,\n'
-          + f'                           通道间隔 = {ref_req.spacing * 1e-9:.2f} GHz\n'
-          + f'                           通道数量 = {ref_req.nb_channel})')
-    print('\n传播中的通道参数: (跨段输入光功率偏差 = '
-          + f'{pretty_summary_print(per_label_average(infos.delta_pdb_per_channel, infos.label))} dB,\n'
-          + '                      通道间隔 = '
-          + f'{pretty_summary_print(per_label_average(infos.slot_width * 1e-9, infos.label))} GHz,\n'
-          + '                      收发器输出功率 = '
-          + f'{pretty_summary_print(per_label_average(watt2dbm(infos.tx_power), infos.label))} dBm,\n'
-          + f'                      通道数量 = {infos.number_of_channels})')
-    
-    res_path = []    
+    # 最后一个功率下传播结束时路径上的元素
+    mypath = propagations_for_path[-1]
+    # 只传播一个功率时返回路径上的元素
+    res_path = [elem.uid for elem in propagations_for_path[0]] if len(powers_dbm) == 1 else []
+    # 汇总信息的格式化开销较大，只在需要输出时计算
+    if logger.isEnabledFor(logging.DEBUG):
+        _log_propagation_summary(source, destination, spans, ref_req, infos, propagations_for_path, powers_dbm,
+                                 power_mode)
+
+    # 线路末端每个通道的结果，直接由频谱信息和目标收发器的数组计算
+    if channel_format == CHANNEL_FORMAT_COLUMNAR:
+        channel_data = channel_columns(infos, path[-1])
+    else:
+        channel_data = channel_rows(infos, path[-1])
+
+    return spans, infos, res_path, mypath, channel_data
+        
+def sweep_pair(design, source_uid, destination_uid, powers_dbm, indices=None):
+    """
+    在同一份设计上对一对收发器进行跨段输入光功率扫描。
+
+    与 transmission_simulation 相同，多于一个功率点时依次按每个功率点重新设计路径后传播，
+    后一个功率点的设计以前一个为起点。indices 只选择需要传播的功率点，之前的功率点仍依次重新设计（不传播），
+    因此分块并行扫描的每个功率点与完整的顺序扫描结果相同。
+
+    :param design: DesignedNetwork，重新设计和传播会修改其中的网络元素和 ref_req
+    :param source_uid: 源收发器的 uid
+    :param destination_uid: 目标收发器的 uid
+    :param powers_dbm: 整个扫描的等间隔递增的跨段输入光功率列表 (dBm)
+    :param indices: 需要传播的功率点在 powers_dbm 中的序号（递增），为空时传播全部功率点
+    :return: [(power_dbm, 该功率下传播结束时的目标收发器), ...]
+    """
+    equipment = design.equipment
+    if not equipment['Span']['default'].power_mode:
+        raise SimulationError('增益模式下无法手动设置功率，不能进行功率扫描')
+    require_transceivers(design, source_uid, destination_uid)
+    if indices is None:
+        indices = range(len(powers_dbm))
+    indices = set(indices)
+
+    req = design.request_for(source_uid, destination_uid)
+    path = design.path(source_uid, destination_uid)
+    if not path:
+        raise SimulationError('源和目的收发器之间没有可用路径')
+    # 与 transmission_simulation 相同，功率点换算为相对请求功率的偏移，参考请求按相同偏移调整
+    pref_ch_db = watt2dbm(design.ref_req.power)
+    p_ch_db = watt2dbm(req.power)
+    points = []
+    with gnpy_errors(), stage('propagate'):
+        for index, power_dbm in enumerate(powers_dbm[:max(indices) + 1]):
+            dp_db = power_dbm - p_ch_db
+            design.ref_req.power = dbm2watt(pref_ch_db + dp_db)
+            req.power = dbm2watt(power_dbm)
+            if len(powers_dbm) > 1:
+                design_network(design.ref_req, design.network.subgraph(path), equipment,
+                               set_connector_losses=False, verbose=False)
+            if index in indices:
+                propagate(path, req, equipment)
+                points.append((pref_ch_db + dp_db, deepcopy(path[-1])))
+    return points
+
+
+def _log_propagation_summary(source, destination, spans, ref_req, infos, propagations_for_path, powers_dbm,
+                             power_mode):
+    # 以 DEBUG 级别输出传播过程的汇总信息及路径上每个元素的结果
+    logger.debug('在 %s 和 %s 之间有 %d 段光纤，总长 %.0f 公里',
+                 source.uid, destination.uid, len(spans), sum(spans) / 1000)
+    logger.debug('设计使用的参考值: 跨段输入光功率参考 = %.2f dBm, 通道间隔 = %.2f GHz, 通道数量 = %d',
+                 watt2dbm(ref_req.power), ref_req.spacing * 1e-9, ref_req.nb_channel)
+    logger.debug('传播中的通道参数: 跨段输入光功率偏差 = %s dB, 通道间隔 = %s GHz, 收发器输出功率 = %s dBm, 通道数量 = %d',
+                 pretty_summary_print(per_label_average(infos.delta_pdb_per_channel, infos.label)),
+                 pretty_summary_print(per_label_average(infos.slot_width * 1e-9, infos.label)),
+                 pretty_summary_print(per_label_average(watt2dbm(infos.tx_power), infos.label)),
+                 infos.number_of_channels)
+    if not power_mode:
+        logger.debug('以增益模式传播：无法手动设置功率')
     for mypath, power_dbm in zip(propagations_for_path, powers_dbm):
-        if power_mode:
-            print(f'跨段输入光功率参考 = {ansi_escapes.cyan}{power_dbm:.2f} '
-                  + f'dBm{ansi_escapes.reset}:')
-        else:
-            print('\n以 {ansi_escapes.cyan}增益模式{ansi_escapes.reset} 传播：无法手动设置功率')
         if len(powers_dbm) == 1:
             for elem in mypath:
-                print(elem)
-                res_path.append(elem.uid)
-            if power_mode:
-                print(f'\n跨段输入光功率参考的传输结果 = {power_dbm:.2f} dBm:')
-            else:
-                print('\n传输结果:')
-            print(f'  最终 GSNR (0.1 nm): {ansi_escapes.cyan}{mean(destination.snr_01nm):.02f} dB{ansi_escapes.reset}')
+                logger.debug('%s', elem)
+        else:
+            logger.debug('%s', mypath[-1])
+        if power_mode:
+            logger.debug('跨段输入光功率参考 = %.2f dBm 的传输结果: 最终 GSNR (0.1 nm) = %.2f dB',
+                         power_dbm, mean(mypath[-1].snr_01nm))
         else:
-            print(mypath[-1])
-
-    channel_data = []  
-    # print('\n线路末端每个通道的 GSNR 为:')
-    # print(
-    #     '{:>5}{:>26}{:>26}{:>28}{:>28}{:>28}' .format(
-    #         '通道 #',
-    #         '通道频率 (THz)',
-    #         '通道功率 (dBm)',
-    #         'OSNR ASE (信号带宽, dB)',
-    #         'SNR NLI (信号带宽, dB)',
-    #         'GSNR (信号带宽, dB)'))
-    for final_carrier, ch_osnr, ch_snr_nl, ch_snr in zip(
-            infos.carriers, path[-1].osnr_ase, path[-1].osnr_nli, path[-1].snr):
-        ch_freq = final_carrier.frequency * 1e-12
-        ch_power = lin2db(final_carrier.power.signal * 1e3)
-        channel_info = {  # 创建一个字典来存储单个通道的信息
-            'channel_number': final_carrier.channel_number,
-            'channel_frequency': round(ch_freq, 5),
-            'channel_power': round(ch_power, 2),
-            'OSNR_ASE': round(ch_osnr, 2),
-            'SNR_NLI': round(ch_snr_nl, 2),
-            'GSNR': round(ch_snr, 2)
-        }
-        channel_data.append(channel_info)  # 将通道信息添加到列表中
-        # print(
-        #     '{:5}{:26.5f}{:26.2f}{:28.2f}{:28.2f}{:28.2f}' .format(
-        #         final_carrier.channel_number, round(
-        #             ch_freq, 5), round(
-        #             ch_power, 2), round(
-        #             ch_osnr, 2), round(
-        #             ch_snr_nl, 2), round(
-        #                 ch_snr, 2)))
+            logger.debug('传输结果: 最终 GSNR (0.1 nm) = %.2f dB', mean(mypath[-1].snr_01nm))
+
+
+def check_propagation(design):
+    """传播前的检查，与 GNPY 的 transmission_simulation 流程一致，不满足时抛出 SimulationError"""
+    if design.index.has_raman:
+        raise SimulationError('RamanFiber 需要通过 --sim-params 传递仿真参数')
+    if not design.index.transceivers:
+        raise SimulationError('网络中未找到收发器')
+    if len(design.index.transceivers) < 2:
+        raise SimulationError('至少需要两个收发器才能进行网络仿真')
+
+
+def set_final_power(design, req, path):
+    """
+    与 transmission_simulation 相同，将传播请求设置为最后一个功率点，单链路仿真报告的是这一功率点的结果。
+
+    多个功率点时 transmission_simulation 依次按各功率点重新设计路径，这里按相同顺序重新设计，
+    路径上的元素与其最后一次传播前的状态相同。
+
+    :param design: DesignedNetwork，重新设计会修改其中的网络元素和 ref_req
+    :return: 功率点数
+    """
+    offsets_db = power_offsets_db(design.equipment)
+    pref_ch_db = watt2dbm(design.ref_req.power)
+    p_ch_db = watt2dbm(req.power)
+    if len(offsets_db) > 1:
+        for dp_db in offsets_db:
+            design.ref_req.power = dbm2watt(pref_ch_db + dp_db)
+            design_network(design.ref_req, design.network.subgraph(path), design.equipment,
+                           set_connector_losses=False, verbose=False)
+    req.power = dbm2watt(p_ch_db + offsets_db[-1])
+    return len(offsets_db)
+
+
+def require_transceivers(design, source_uid, destination_uid):
+    """检查设计后的网络中存在指定的源和目的收发器，不存在时抛出 SimulationError"""
+    transceivers = design.index.transceivers
+    if source_uid not in transceivers or destination_uid not in transceivers:
+        raise SimulationError('网络中未找到指定的收发器')
+
+
+def power_offsets_db(equipment):
+    """
+    与 transmission_simulation 相同的功率点（相对跨段输入光功率参考, dB）。
+
+    增益模式下为 [0]，功率模式下由 SI 的 power_range_db 给出。
+    """
+    if not equipment['Span']['default'].power_mode:
+        return [0]
+    p_start, p_stop, p_step = equipment['SI']['default'].power_range_db
+    p_num = abs(int(round((p_stop - p_start) / p_step))) + 1 if p_step != 0 else 1
+    return list(linspace(p_start, p_stop, p_num))
+
 
-    return spans, infos, res_path, mypath, channel_data
-        
 if __name__ == '__main__':
     simulate_network('678eb752758dcc9974b2603d', '67a83f2109f8bdef32408844',
                      '67a858fd55643b796290c2e2', '67a858fd55643b796290c2e4', False)
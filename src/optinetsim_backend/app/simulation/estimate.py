@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+GSNR 快速估算。
+
+完整仿真沿路径逐元素计算传播；估算模式利用 ROADM 的功率均衡：每个 ROADM 都将各通道功率设为设计的目标值，
+因此从 ROADM（或发射端收发器）出发、到下一个 ROADM（或收发器）之前的一段（hop）中，
+各元素引入的 ASE 和 NLI 噪声与信号之比只取决于这一段本身，与上游路径无关。
+
+每段只用设计的参考频谱单独传播一次，记录每个元素引入的噪声信号比（线性值，按通道）并随设计缓存，
+同一网络 revision 的任意路径查询只需将路径上各段的贡献相加：
+
+    1 / GSNR = Σ (ΔASE / S + ΔNLI / S) + 1 / OSNR_tx + Σ 1 / OSNR_roadm
+
+其中 OSNR_roadm 为路径上每个 ROADM 在其上下游方向之间的 roadm-osnr 损伤，与完整仿真相同。
+结果只包含完整仿真中会传播的通道，即路径上放大器共同支持的频带内的通道。
+
+精度：各段噪声按非相干叠加，与 GNPY 的 GN 模型一致，主要误差来自
+- 增益模式或没有 ROADM 均衡的长链路中，各段输入功率随上游变化
+- ROADM 的 per-degree 损伤按该段的任一上游方向计算
+- 收发器的 penalties 不计入
+- 各段噪声按设计的全部参考通道计算，路径滤除的通道对 NLI 的贡献仍被计入
+功率模式且每个 ROADM 都做功率均衡的网络中，各通道 GSNR (0.1 nm) 与完整仿真之差不超过 ESTIMATE_TOLERANCE_DB
+（测试中在合成环网的全部收发器对上验证）；增益模式或缺少 ROADM 均衡时没有这一保证。
+calibrate 为 True 时对同一收发器对执行一次完整仿真，返回实际误差，
+并记录该设计下各次校准观测到的最大误差；尚未校准时结果中不包含观测误差。
+"""
+from copy import deepcopy
+
+import numpy as np
+from gnpy.core.elements import Roadm, Transceiver
+from gnpy.core.utils import lin2db
+
+# Project imports
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.simulation.core import SimulationError, gnpy_errors, require_transceivers
+from src.optinetsim_backend.app.simulation.segments import input_spectral_information, path_spectral_information
+
+# 功率模式、ROADM 均衡的网络中估算的各通道 GSNR 与完整仿真之差的上限 (dB)，见模块说明
+ESTIMATE_TOLERANCE_DB = 0.5
+
+
+class HopNoise:
+    """
+    一段的噪声贡献。
+
+    :param uids: 段内元素的 uid
+    :param ase: 每个元素引入的 ASE 噪声信号比，形状为 (元素数, 通道数)
+    :param nli: 每个元素引入的 NLI 噪声信号比
+    """
+
+    def __init__(self, uids, ase, nli):
+        self.uids = uids
+        self.ase = ase
+        self.nli = nli
+
+
+class NoiseTable:
+    """一份设计的噪声贡献表，各段在首次查询时计算，同一 revision 的设计副本共用"""
+
+    def __init__(self):
+        self._hops = {}
+        # 各次校准观测到的估算与完整仿真之差的最大值 (dB)，只反映已校准的收发器对，不是误差上界
+        self.max_observed_error = None
+
+    def hop(self, design, start_uid, next_uid):
+        key = (start_uid, next_uid)
+        hop = self._hops.get(key)
+        if hop is None:
+            hop = self._hops[key] = _hop_noise(design, start_uid, next_uid)
+        return hop
+
+    def record_error(self, error_db):
+        self.max_observed_error = (error_db if self.max_observed_error is None
+                                   else max(self.max_observed_error, error_db))
+
+
+def noise_table(design):
+    return design.shared.setdefault('noise', NoiseTable())
+
+
+def _is_hop_boundary(el):
+    return isinstance(el, (Roadm, Transceiver))
+
+
+def _noise_ratios(si):
+    return si.ase / si.signal, si.nli / si.signal
+
+
+def _hop_noise(design, start_uid, next_uid):
+    # 在段内元素的副本上用设计的参考频谱传播，不修改设计
+    network = design.network
+    start = design.nodes[start_uid]
+    elements = [start]
+    node = design.nodes[next_uid]
+    while not _is_hop_boundary(node) and len(elements) <= network.number_of_nodes():
+        elements.append(node)
+        node = next(iter(network.successors(node)), None)
+        if node is None:
+            break
+    elements = deepcopy(elements)
+
+    si = input_spectral_information(design.req)
+    ase_rows, nli_rows = [], []
+    with gnpy_errors():
+        for index, el in enumerate(elements):
+            before_ase, before_nli = _noise_ratios(si)
+            if isinstance(el, Roadm):
+                # 均衡后的输出功率与上游方向无关，任取一个不同于下游方向的上游方向
+                from_degree = next((n.uid for n in network.predecessors(design.nodes[el.uid]) if n.uid != next_uid),
+                                   None)
+                si = el(si, degree=next_uid, from_degree=from_degree)
+            elif isinstance(el, Transceiver):
+                # 发射端收发器不引入噪声
+                pass
+            else:
+                si = el(si)
+            after_ase, after_nli = _noise_ratios(si)
+            ase_rows.append(after_ase - before_ase)
+            nli_rows.append(after_nli - before_nli)
+    return HopNoise([el.uid for el in elements], np.array(ase_rows), np.array(nli_rows))
+
+
+def estimate_pair(design, source_uid, destination_uid):
+    """
+    估算一对收发器之间的 GSNR。
+
+    :param design: DesignedNetwork，估算不修改其中的网络元素
+    :return: 结果字典，per_channel 中为各通道的估算值
+    """
+    require_transceivers(design, source_uid, destination_uid)
+    path = design.index.path(source_uid, destination_uid)
+    if not path:
+        raise SimulationError('源和目的收发器之间没有可用路径')
+    table = noise_table(design)
+
+    with stage('estimate'):
+        # 路径在每个 ROADM 和收发器处分段，最后的目的收发器不引入噪声
+        hops = [table.hop(design, uid, path[index + 1])
+                for index, uid in enumerate(path[:-1]) if _is_hop_boundary(design.nodes[uid])]
+        ase = np.concatenate([hop.ase for hop in hops]).sum(axis=0)
+        nli = np.concatenate([hop.nli for hop in hops]).sum(axis=0)
+
+        # 与完整仿真相同，只保留路径上放大器共同支持的频带内的通道
+        with gnpy_errors():
+            si = path_spectral_information([design.nodes[uid] for uid in path], design.req, design.equipment)
+        kept = np.isin(np.asarray(input_spectral_information(design.req).frequency), np.asarray(si.frequency))
+        ase, nli = ase[kept], nli[kept]
+
+        inverse = ase + nli + 10 ** (-np.asarray(si.tx_osnr, dtype=float) / 10)
+        for index, uid in enumerate(path):
+            el = design.nodes[uid]
+            if isinstance(el, Roadm):
+                osnr = el.get_impairment('roadm-osnr', si.frequency, from_degree=path[index - 1],
+                                         degree=path[index + 1])
+                if osnr is not None:
+                    inverse = inverse + 10 ** (-np.asarray(osnr, dtype=float) / 10)
+        gsnr = -lin2db(inverse)
+        # 0.1 nm 参考带宽 (12.5 GHz)
+        bandwidth_correction = lin2db(np.asarray(si.baud_rate, dtype=float) / 12.5e9)
+        gsnr_01nm = gsnr + bandwidth_correction
+        osnr_ase_01nm = -lin2db(ase) + bandwidth_correction if ase.any() else None
+
+    result = {
+        'Source': source_uid,
+        'Destination': destination_uid,
+        'path': path,
+        'Mean GSNR (signal bw, dB)': float(np.mean(gsnr)),
+        'Mean GSNR (0.1nm, dB)': float(np.mean(gsnr_01nm)),
+        'Mean OSNR ASE (0.1nm, dB)': float(np.mean(osnr_ase_01nm)) if osnr_ase_01nm is not None else None,
+        'per_channel': {
+            'channel_frequency': np.asarray(si.frequency, dtype=float).tolist(),
+            'GSNR_01nm': gsnr_01nm.tolist(),
+        },
+    }
+    if table.max_observed_error is not None:
+        result['max observed error (dB)'] = table.max_observed_error
+    return result
+
+
+def calibrate(estimate, transceiver, table):
+    """
+    将估算结果与同一收发器对的完整仿真比较，记录误差。
+
+    :param estimate: estimate_pair 的结果
+    :param transceiver: 完整仿真结束时的目的收发器
+    :return: 各通道 GSNR (0.1 nm) 之差绝对值的最大值 (dB)
+    """
+    exact = np.asarray(transceiver.snr_01nm, dtype=float)
+    error = float(np.max(np.abs(np.asarray(estimate['per_channel']['GSNR_01nm']) - exact)))
+    table.record_error(error)
+    return error
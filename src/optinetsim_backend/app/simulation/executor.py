@@ -0,0 +1,305 @@
+# coding: utf-8
+"""
+本地仿真进程池。
+
+GNPY 传播是 CPU 密集型计算，放在独立的工作进程中执行，HTTP 工作线程不会被长时间占用，
+工作进程中的异常或退出也不会影响服务进程。
+
+GNPY 的 SimParams 是进程级的全局状态，每个任务执行前在工作进程中设置该任务的仿真参数，
+参数与上一个任务相同时跳过（见 core.apply_sim_params），因此所有仿真参数共用一个进程池，
+同一工作进程中依次执行的任务不会互相覆盖。
+
+工作进程数为 0 时不启动进程池，任务在调用线程中依次执行，
+仿真与服务进程共享数据库连接（如压测时使用的内存数据库）。
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+
+# Project imports
+from src.optinetsim_backend.app.config import Config
+from src.optinetsim_backend.app.database.models import SimulationJobDB
+from src.optinetsim_backend.app.metrics import (
+    STAGE_SECONDS,
+    add_stage_timings,
+    cache_snapshot,
+    collect_stages,
+    update_worker_caches
+)
+from src.optinetsim_backend.app.log import log_context
+from src.optinetsim_backend.app.simulation.core import apply_sim_params
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.results import build_all_pairs_result, to_builtin
+from src.optinetsim_backend.app.simulation.tasks import prepare_design, run_simulation_job, run_source_rows
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker():
+    # 工作进程启动时配置日志，GNPY 及仿真模块随本模块导入一次
+    from src.optinetsim_backend.app.log import setup_logging
+    setup_logging()
+
+
+def _call_with_stages(sim_params, fn, *args, **kwargs):
+    # 在工作进程中设置仿真参数后执行任务，同时返回任务中记录的阶段耗时和本进程的缓存统计
+    apply_sim_params(sim_params)
+    with collect_stages() as timings:
+        result = fn(*args, **kwargs)
+    return result, timings, cache_snapshot()
+
+
+def _unwrap(inner):
+    """
+    返回只包含任务结果的 Future。
+    任务记录的阶段耗时在服务进程中计入指标，并保存在返回的 Future 的 stage_timings 属性中。
+    """
+    outer = Future()
+    outer.set_running_or_notify_cancel()
+    outer.stage_timings = []
+
+    def on_done(future):
+        try:
+            result, timings, caches = future.result()
+        except BaseException as e:
+            outer.set_exception(e)
+            return
+        for name, seconds in timings:
+            STAGE_SECONDS.observe(seconds, stage=name)
+        update_worker_caches(caches)
+        outer.stage_timings = timings
+        outer.set_result(result)
+
+    inner.add_done_callback(on_done)
+    return outer
+
+
+def _result(future):
+    # 等待任务结果，并将任务的阶段耗时加入当前请求的 Server-Timing
+    result = future.result()
+    add_stage_timings(future.stage_timings)
+    return result
+
+
+class SimulationExecutor:
+    """仿真工作进程池，最多 workers 个工作进程，所有仿真参数共用"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+        self._lock = Lock()
+        # 直接执行模式下任务共享本进程的 SimParams，需要依次执行
+        self._inline_lock = Lock()
+
+    @property
+    def inline(self):
+        return self.workers <= 0
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # MongoClient 不是 fork 安全的，工作进程通过 spawn 启动并建立自己的连接
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker
+                )
+            return self._pool
+
+    def _discard(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    def submit(self, sim_params, fn, *args, **kwargs):
+        """
+        将任务提交到进程池，任务执行前在工作进程中设置 sim_params。
+
+        :param sim_params: 网络的仿真参数（simulation_config）
+        :param fn: 模块顶层定义的任务函数
+        :return: concurrent.futures.Future
+        """
+        if self.inline:
+            return self._run_inline(sim_params, fn, *args, **kwargs)
+        pool = self._get_pool()
+        try:
+            inner = pool.submit(_call_with_stages, sim_params, fn, *args, **kwargs)
+        except BrokenProcessPool:
+            # 进程池因工作进程崩溃不可用，重建后重试一次
+            self._discard(pool)
+            pool = self._get_pool()
+            inner = pool.submit(_call_with_stages, sim_params, fn, *args, **kwargs)
+        inner.add_done_callback(lambda f: self._discard_if_broken(pool, f))
+        return _unwrap(inner)
+
+    def _discard_if_broken(self, pool, future):
+        # 工作进程崩溃后整个进程池不可用，之后的任务提交到新建的进程池
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            logger.error('simulation worker pool crashed, discarding it')
+            self._discard(pool)
+
+    def _run_inline(self, sim_params, fn, *args, **kwargs):
+        future = Future()
+        future.set_running_or_notify_cancel()
+        future.stage_timings = []
+        try:
+            with self._inline_lock:
+                # 阶段耗时已在本进程中计入指标，这里只保留给 Server-Timing
+                result, future.stage_timings, _ = _call_with_stages(sim_params, fn, *args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        return future
+
+    def run(self, sim_params, fn, *args, **kwargs):
+        """在工作进程中执行任务并等待结果"""
+        return _result(self.submit(sim_params, fn, *args, **kwargs))
+
+    def stream(self, sim_params, fn, *args, **kwargs):
+        """
+        在工作进程中执行 fn(events, *args, **kwargs)，并逐个产出任务放入 events 队列的事件。
+
+        :param fn: 任务函数，以 None 表示事件结束
+        :return: 事件生成器；工作进程异常退出时产出 error 事件后结束
+        """
+        events = queue.Queue() if self.inline else _event_queue()
+        future = self.submit(sim_params, fn, events, *args, **kwargs)
+        while True:
+            try:
+                event = events.get(timeout=1)
+            except queue.Empty:
+                # 任务正常结束时一定已放入 None，这里只处理工作进程崩溃或任务被取消
+                if future.done() and (future.cancelled() or future.exception() is not None):
+                    message = 'Job cancelled' if future.cancelled() else str(future.exception())
+                    yield {'event': 'error', 'message': '仿真失败: ' + message}
+                    return
+                continue
+            if event is None:
+                return
+            yield event
+
+    def map_chunks(self, sim_params, fn, items, *args):
+        """
+        将 items 按顺序切分为不超过工作进程数的若干块，并行执行 fn(*args, chunk)。
+
+        :param fn: 返回列表的任务函数，chunk 作为最后一个参数传入
+        :return: 按 items 顺序合并后的结果列表
+        """
+        if not items:
+            return []
+        chunk_count = max(1, min(len(items), self.workers))
+        chunk_size = -(-len(items) // chunk_count)
+        futures = [
+            self.submit(sim_params, fn, *args, items[start:start + chunk_size])
+            for start in range(0, len(items), chunk_size)
+        ]
+        results = []
+        for future in futures:
+            results.extend(_result(future))
+        return results
+
+
+# 用于工作进程向服务进程发送事件的 Manager 进程，在第一次流式仿真时启动
+_manager = None
+_manager_lock = Lock()
+
+
+def _event_queue():
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = multiprocessing.get_context('spawn').Manager()
+    return _manager.Queue()
+
+
+simulation_executor = SimulationExecutor(Config.SIMULATION_WORKERS)
+
+
+def submit_job(job_id, sim_params):
+    """在进程池中执行异步仿真任务"""
+    future = simulation_executor.submit(sim_params, run_simulation_job, job_id)
+    future.add_done_callback(lambda f: _on_job_done(job_id, f))
+    return future
+
+
+def _on_job_done(job_id, future):
+    # 仿真本身的失败由 run_simulation_job 记录，这里只处理工作进程崩溃等任务之外的异常
+    if future.cancelled():
+        SimulationJobDB.mark_failed(job_id, 'Job cancelled')
+        return
+    exc = future.exception()
+    if isinstance(exc, BrokenProcessPool):
+        SimulationJobDB.mark_failed(job_id, '工作进程异常退出（可能是内存不足），任务已中断')
+    elif exc is not None:
+        SimulationJobDB.mark_failed(job_id, str(exc))
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def fail_interrupted_jobs():
+    """
+    将创建进程已退出的未结束任务标记为失败，服务启动时调用。
+
+    任务只在创建它的服务进程中执行，该进程退出后任务不会再有结果；
+    同一主机上仍在运行的其他服务进程的任务不受影响。
+    """
+    count = 0
+    for job in SimulationJobDB.find_unfinished(socket.gethostname()):
+        pid = (job.get('owner') or {}).get('pid')
+        if pid is None or (pid != os.getpid() and not _process_alive(pid)):
+            count += SimulationJobDB.mark_failed(job['_id'], '服务重启，任务已中断').modified_count
+    if count:
+        logger.warning('marked %d interrupted simulation jobs as failed', count)
+    return count
+
+
+def submit_all_pairs_job(job_id, user_id, network_id, params):
+    """
+    在后台线程中执行全网收发器对分析任务。
+
+    网络只设计一次，源收发器按行分块分发到各工作进程，每个工作进程计算若干行，
+    汇总后的矩阵和统计写回 simulation_jobs 集合。
+    """
+    thread = threading.Thread(target=_run_all_pairs_job, args=(job_id, user_id, network_id, params),
+                              name=f'all-pairs-{job_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def _run_all_pairs_job(job_id, user_id, network_id, params):
+    if SimulationJobDB.mark_running(job_id) is None:
+        return
+    try:
+        with log_context(network_id=network_id):
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                raise ValueError('未找到网络')
+            sim_params = context.build_sim_params()
+            design = simulation_executor.run(sim_params, prepare_design, context, **params)
+            # 设计不会增删收发器，直接使用网络文档中的收发器
+            transceivers = [element['element_id'] for element in context.network['elements']
+                            if element['type'] == 'Transceiver']
+            if len(transceivers) < 2:
+                raise ValueError('至少需要两个收发器才能进行网络仿真')
+            rows = simulation_executor.map_chunks(sim_params, run_source_rows, transceivers, design, transceivers)
+            result = build_all_pairs_result(transceivers, context.element_names, rows)
+    except Exception as e:
+        logger.exception('all-pairs job %s failed', job_id)
+        SimulationJobDB.mark_failed(job_id, str(e))
+        return
+    SimulationJobDB.mark_finished(job_id, to_builtin(result))
@@ -0,0 +1,173 @@
+# coding: utf-8
+"""
+网络元素结果提取。
+
+按元素类型注册提取函数，直接读取 GNPY 元素对象上的数值属性，返回 Python 原生数值，
+键名与 GNPY 元素字符串描述中的字段一致。查找时沿元素类的 MRO 进行，子类未单独注册时使用父类的提取函数，
+没有任何可用的提取函数时退回到解析元素的字符串描述。
+"""
+import numpy as np
+from gnpy.core.elements import Transceiver, Fiber, RamanFiber, Edfa, Roadm, Fused
+from gnpy.core.utils import watt2dbm
+
+_EXTRACTORS = {}
+
+
+def register_extractor(*element_classes):
+    """
+    注册元素类型的结果提取函数。
+
+    :param element_classes: GNPY 元素类
+    :return: 装饰器，被装饰的函数签名为 fn(elem) -> dict
+    """
+    def decorator(fn):
+        for element_class in element_classes:
+            _EXTRACTORS[element_class] = fn
+        return fn
+    return decorator
+
+
+def extract_element_info(elem, element_name):
+    """
+    提取元素的仿真结果。
+
+    :param elem: GNPY 元素
+    :param element_name: 元素名称，为空时使用 uid
+    :return: 结果字典，"element" 为元素类型和名称
+    """
+    info = {"element": f'{type(elem).__name__} {element_name or elem.uid}'}
+    for element_class in type(elem).__mro__:
+        extractor = _EXTRACTORS.get(element_class)
+        if extractor is not None:
+            info.update(extractor(elem))
+            return info
+    return parse_element_info(elem, element_name)
+
+
+def label_average(values, labels):
+    """
+    按频带标签计算各信道数值的平均值。
+
+    :param values: 各信道的数值
+    :param labels: 各信道的频带标签
+    :return: 只有一个频带时返回数值，否则返回 {标签: 平均值}
+    """
+    values = np.asarray(values, dtype=float)
+    unique_labels, inverse = np.unique(np.asarray(labels), return_inverse=True)
+    averages = np.bincount(inverse, weights=values) / np.bincount(inverse)
+    if len(unique_labels) == 1:
+        return float(averages[0])
+    return {str(label): float(average) for label, average in zip(unique_labels, averages)}
+
+
+def _mean(values):
+    return float(np.mean(values))
+
+
+def _optional(value):
+    return float(value) if value is not None else None
+
+
+@register_extractor(Transceiver)
+def _transceiver_info(elem):
+    if elem.snr is None:
+        # 尚未传播的收发器没有结果
+        return {}
+    return {
+        "GSNR (0.1nm, dB)": label_average(elem.snr_01nm, elem.propagated_labels),
+        "GSNR (signal bw, dB)": label_average(elem.snr, elem.propagated_labels),
+        "OSNR ASE (0.1nm, dB)": label_average(elem.osnr_ase_01nm, elem.propagated_labels),
+        "OSNR ASE (signal bw, dB)": label_average(elem.osnr_ase, elem.propagated_labels),
+        "CD (ps/nm)": _mean(elem.chromatic_dispersion),
+        "PMD (ps)": _mean(elem.pmd),
+        "PDL (dB)": _mean(elem.pdl),
+        "Latency (ms)": _mean(elem.latency),
+        "Actual pch out (dBm)": label_average(watt2dbm(elem.tx_power), elem.propagated_labels),
+    }
+
+
+@register_extractor(Fiber, RamanFiber)
+def _fiber_info(elem):
+    if elem.pch_out_db is None:
+        return {}
+    return {
+        "type_variety": elem.type_variety,
+        "length (km)": float(elem.params.length) / 1000,
+        "pad att_in (dB)": float(elem.params.att_in),
+        "total loss (dB)": float(elem.loss),
+        "conn loss in (dB)": float(elem.params.con_in),
+        "conn loss out (dB)": float(elem.params.con_out),
+        "reference pch out (dBm)": float(elem.pch_out_db),
+        "actual pch out (dBm)": label_average(elem.pch_out_dbm, elem.propagated_labels),
+    }
+
+
+@register_extractor(Edfa)
+def _edfa_info(elem):
+    if elem.pin_db is None or elem.pout_db is None:
+        return {}
+    return {
+        "type_variety": elem.params.type_variety,
+        "effective gain(dB)": float(elem.effective_gain),
+        "noise figure (dB)": _mean(elem.nf),
+        "pad att_in (dB)": float(elem.att_in),
+        "Power In (dBm)": float(elem.pin_db),
+        "Power Out (dBm)": float(elem.pout_db),
+        "Delta_P (dB)": _optional(elem.delta_p),
+        "target pch (dBm)": _optional(elem.target_pch_out_dbm),
+        "actual pch out (dBm)": label_average(elem.pch_out_dbm, elem.propagated_labels),
+        "output VOA (dB)": float(elem.out_voa),
+    }
+
+
+@register_extractor(Roadm)
+def _roadm_info(elem):
+    if elem.ref_pch_out_dbm is None:
+        return {}
+    return {
+        "Type_variety": elem.type_variety,
+        "Reference loss (dB)": float(elem.ref_effective_loss),
+        "Actual loss (dB)": label_average(elem.loss_pch_db, elem.propagated_labels),
+        "Reference pch out (dBm)": float(elem.ref_pch_out_dbm),
+        "Actual pch out (dBm)": label_average(elem.pch_out_dbm, elem.propagated_labels),
+    }
+
+
+@register_extractor(Fused)
+def _fused_info(elem):
+    return {"loss (dB)": float(elem.loss)}
+
+
+def parse_element_info(elem, element_name):
+    """将 GNPY 元素的字符串描述解析为字典，用于没有注册提取函数的元素类型"""
+    replaced_str = str(elem).replace(elem.uid, element_name or elem.uid)
+
+    # 解析字符串为字典
+    element_dict = {}
+    lines = replaced_str.split('\n')
+
+    if lines:
+        # 处理第一行元素描述
+        element_dict["element"] = lines[0].strip()
+
+        # 处理后续属性行
+        for line in lines[1:]:
+            line = line.strip()
+            if not line:
+                continue
+
+            # 分割键值对
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key = key.strip()
+                value = value.strip()
+
+                # 尝试转换为数值类型
+                try:
+                    value = float(value) if '.' in value else int(value)
+                except ValueError:
+                    pass  # 保持字符串类型
+
+                element_dict[key] = value
+
+    return element_dict
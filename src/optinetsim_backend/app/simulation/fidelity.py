@@ -0,0 +1,115 @@
+# coding: utf-8
+"""
+NLI 计算精度。
+
+NLI 的计算量与计算 NLI 的通道数成正比。GNPY 的 ggn_* 方法只对 nli_params.computed_channels 中的通道计算 NLI，
+其余通道的 NLI 按频率插值。精度档位自动选择这一通道子集：
+
+- exact: 计算全部通道（移除网络 nli_params 中的 computed_channels 和 computed_number_of_channels）
+- balanced: 约 1/8 的通道
+- fast: 约 1/32 的通道
+
+gn_model_analytic（GNPY 的默认方法）逐通道解析计算 NLI，不读取 computed_channels，只支持 exact。
+
+子集在整个频带内等间隔选取并包含频带两端的通道，NLI 在频带边缘变化最快，两端的通道不参与外推。
+插值误差随网络和频谱而变化，接口在首次使用某一档位时对同一收发器对执行一次 exact 仿真作为校准，
+比较两次仿真各通道的 GSNR，误差随网络内容缓存，见 SingleLinkSimulationResource。
+"""
+from math import ceil
+
+import numpy as np
+from gnpy.core.utils import automatic_nch
+from gnpy.tools.json_io import _spectrum_from_json
+
+FIDELITY_FAST = 'fast'
+FIDELITY_BALANCED = 'balanced'
+FIDELITY_EXACT = 'exact'
+FIDELITIES = (FIDELITY_FAST, FIDELITY_BALANCED, FIDELITY_EXACT)
+
+# 各档位计算 NLI 的通道比例及最少通道数
+_SUBSAMPLING = {
+    FIDELITY_FAST: (1 / 32, 5),
+    FIDELITY_BALANCED: (1 / 8, 9),
+}
+
+# 读取 computed_channels 的 NLI 方法（GNPY 按方法名包含判断）
+_SUBSAMPLING_METHODS = ('ggn_spectrally_separated', 'ggn_approx')
+_NLI_CHANNEL_KEYS = ('computed_channels', 'computed_number_of_channels')
+
+
+def channel_count(network_SI, spectrum=None):
+    """
+    传播的通道数，与 GNPY 构造频谱信息时的计算相同。
+
+    :param network_SI: 网络的 SI
+    :param spectrum: 请求中指定的频谱信息，指定时按该频谱计算
+    """
+    if spectrum:
+        return len(_spectrum_from_json(spectrum))
+    return automatic_nch(network_SI['f_min'], network_SI['f_max'], network_SI['spacing'])
+
+
+def supports_fidelity(sim_params, fidelity):
+    """
+    仿真参数的 NLI 方法能否实现该档位，exact 总是可以实现。
+
+    :param sim_params: 网络的仿真参数（simulation_config）
+    """
+    if fidelity not in _SUBSAMPLING:
+        return True
+    # 与 GNPY 的 NLIParams 相同，未指定方法时使用 gn_model_analytic
+    method = (sim_params.get('nli_params') or {}).get('method', 'gn_model_analytic')
+    return any(name in method for name in _SUBSAMPLING_METHODS)
+
+
+def computed_channels(nb_channel, fidelity):
+    """
+    档位对应的计算 NLI 的通道编号（从 1 开始），exact 或通道数不超过最少通道数时返回 None，即计算全部通道。
+
+    :param nb_channel: 通道数
+    :param fidelity: 精度档位
+    """
+    if fidelity not in _SUBSAMPLING:
+        return None
+    ratio, minimum = _SUBSAMPLING[fidelity]
+    count = max(minimum, ceil(nb_channel * ratio))
+    if count >= nb_channel:
+        return None
+    return np.unique(np.round(np.linspace(1, nb_channel, count)).astype(int)).tolist()
+
+
+def apply_fidelity(sim_params, fidelity, nb_channel):
+    """
+    返回按档位设置了 computed_channels 的仿真参数副本，计算全部通道时移除网络中已有的通道子集。
+
+    :param sim_params: 网络的仿真参数（simulation_config）
+    """
+    channels = computed_channels(nb_channel, fidelity)
+    nli_params = {key: value for key, value in (sim_params.get('nli_params') or {}).items()
+                  if key not in _NLI_CHANNEL_KEYS}
+    if channels is not None:
+        nli_params['computed_channels'] = channels
+    return dict(sim_params, nli_params=nli_params)
+
+
+def channel_gsnr(result):
+    """单链路仿真结果中各通道的 GSNR（信号带宽, dB），full_channel_info 可以是 rows 或 columnar 格式"""
+    channels = result['full_channel_info']
+    if isinstance(channels, dict):
+        return np.asarray(channels['GSNR'], dtype=float)
+    return np.asarray([channel['GSNR'] for channel in channels], dtype=float)
+
+
+def interpolation_error(result, exact_result):
+    """
+    同一收发器对在某一档位和 exact 下仿真结果的差异。
+
+    :return: 各通道 GSNR 之差绝对值的最大值和平均值 (dB)
+    """
+    error = np.abs(channel_gsnr(result) - channel_gsnr(exact_result))
+    return {
+        'source_uid': result['Source'],
+        'destination_uid': result['Destination'],
+        'max GSNR error (dB)': float(np.max(error)),
+        'mean GSNR error (dB)': float(np.mean(error)),
+    }
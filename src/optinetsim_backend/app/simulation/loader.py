@@ -1,3 +1,4 @@
+from copy import deepcopy
 from pathlib import Path
 from typing import Union, Dict, List
 
@@ -5,11 +6,180 @@ from gnpy.tools.json_io import network_from_json, _equipment_from_json
 
 # Project imports
 from src.optinetsim_backend.app.database.models import NetworkDB, EquipmentLibraryDB
+from src.optinetsim_backend.app.cache import equipment_cache
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.simulation.fidelity import apply_fidelity, channel_count
+from src.optinetsim_backend.app.utils import stable_hash
 
 _examples_dir = Path(__file__).parent / 'example-data'
 DEFAULT_EXTRA_CONFIG = {"std_medium_gain_advanced_config.json": _examples_dir/"std_medium_gain_advanced_config.json",
                         "Juniper-BoosterHG.json": _examples_dir/"Juniper-BoosterHG.json"}
 
+# 数据库中 element 独有、GNPY 不识别的键
+_NON_GNPY_ELEMENT_KEYS = ('element_id', 'name', 'library_id')
+
+
+class SimulationContext:
+    """
+    单次仿真所需数据的快照。
+
+    网络文档只查询一次，其引用的所有器件库通过一次 $in 查询取回，
+    器件配置、有向图（DiGraph）和仿真参数都由这份快照构建。
+    """
+
+    def __init__(self, network, libraries, fidelity=None, spectrum=None):
+        self.network = network
+        self.libraries = libraries
+        # NLI 计算精度档位，见 fidelity 模块，为空时使用网络的 nli_params
+        self.fidelity = fidelity
+        # 请求中指定的传播频谱，精度档位按其通道数选择计算 NLI 的通道
+        self.spectrum = spectrum
+
+    @classmethod
+    def load(cls, user_id, network_id):
+        """
+        从数据库中加载仿真上下文。
+
+        :param user_id: 用户ID
+        :param network_id: 网络ID
+        :return: SimulationContext，如果未找到网络则返回None
+        """
+        with stage('load'):
+            network = NetworkDB.find_by_network_id(user_id, network_id)
+            if not network:
+                return None
+            return cls.from_network(network)
+
+    @classmethod
+    def from_network(cls, network):
+        """由已读取的网络文档构造仿真上下文，只查询其引用的器件库"""
+        library_ids = {element['library_id'] for element in network['elements'] if element.get('library_id')}
+        libraries = EquipmentLibraryDB.find_by_ids(library_ids) if library_ids else []
+        return cls(network, libraries)
+
+    def with_fidelity(self, fidelity, spectrum=None):
+        """
+        返回使用指定精度档位的上下文，与原上下文共用网络文档和器件库。
+
+        :param spectrum: 请求中指定的传播频谱，为空时按网络 SI 的通道数
+        """
+        return SimulationContext(self.network, self.libraries, fidelity, spectrum)
+
+    @property
+    def network_id(self):
+        return str(self.network['_id'])
+
+    @property
+    def revision(self):
+        # 旧的网络文档没有 revision 字段
+        return self.network.get('revision', 0)
+
+    def equipment_key(self):
+        """设备配置缓存的键：器件库ID及其 updated_at，加上网络 SI 和 Span 的哈希"""
+        libraries = frozenset((str(library['_id']), library.get('updated_at')) for library in self.libraries)
+        return libraries, stable_hash({'SI': self.network['SI'], 'Span': self.network['Span']})
+
+    @property
+    def element_names(self):
+        """element_id 到元素名称的映射，组装结果时使用，无需再逐个查询数据库"""
+        return {element['element_id']: element.get('name') for element in self.network['elements']}
+
+    def result_key(self, kind, params):
+        """
+        仿真结果缓存的键：网络中参与仿真的全部内容、引用器件库的设备内容以及请求参数的哈希。
+
+        :param kind: 仿真类型
+        :param params: 请求参数
+        """
+        network = {key: self.network[key] for key in ('elements', 'connections', 'SI', 'Span', 'simulation_config')}
+        libraries = sorted((str(library['_id']), library['equipments']) for library in self.libraries)
+        payload = {'kind': kind, 'network': network, 'libraries': libraries, 'params': params}
+        if self.fidelity:
+            # exact 也会修改网络的 nli_params，结果与未指定档位时不同
+            payload['fidelity'] = self.fidelity
+        return stable_hash(payload)
+
+    def build_equipment(self, extra_config_filenames: List[Path] = None) -> dict:
+        if extra_config_filenames:
+            # 额外配置文件不参与缓存
+            return build_equipment(self.network, self.libraries, extra_config_filenames)
+        equipment = equipment_cache.get_or_create(
+            self.equipment_key(),
+            lambda: build_equipment(self.network, self.libraries)
+        )
+        # 返回副本，防止仿真过程对设备配置的修改污染缓存
+        return deepcopy(equipment)
+
+    def build_network(self, equipment):
+        with stage('network'):
+            return network_from_json(network_json_from_document(self.network), equipment)
+
+    def build_sim_params(self):
+        sim_params = self.network['simulation_config'].copy()
+        if self.fidelity:
+            sim_params = apply_fidelity(sim_params, self.fidelity, channel_count(self.network['SI'], self.spectrum))
+        return sim_params
+
+
+def network_json_from_document(network):
+    """
+    将数据库中的网络文档转换为 GNPY 的网络 JSON 格式。
+
+    :param network: 网络文档
+    :return: GNPY 网络 JSON
+    """
+    elements = []
+    for element in network['elements']:
+        # 将 element_id 键名替换为 uid，并移除 name 和 library_id 键值对
+        element_json = {'uid': element['element_id']}
+        element_json.update((key, value) for key, value in element.items() if key not in _NON_GNPY_ELEMENT_KEYS)
+        elements.append(element_json)
+    return {
+        'network_name': network['network_name'],
+        'elements': elements,
+        # GNPY 只读取 from_node 和 to_node，connection_id 无需移除，因此不必复制
+        'connections': network['connections'],
+    }
+
+
+def build_equipment(network, libraries, extra_config_filenames: List[Path] = None) -> dict:
+    """
+    合并器件库中的所有设备及网络的 SI、Span 配置，并加载额外的配置文件。
+
+    :param network: 网络文档
+    :param libraries: 网络引用的器件库文档列表
+    :param extra_config_filenames: 额外的配置文件列表
+    :return: 设备配置字典
+    """
+    # 初始化一个空字典，用于存储所有设备
+    equipment_json = {}
+
+    # 遍历每个器件库
+    for library in libraries:
+        # 遍历当前库的每一类设备
+        for eq_category, eq_list in library['equipments'].items():
+            if eq_category not in equipment_json:
+                # 如果总设备字典中还没有这个类别，则直接添加
+                equipment_json[eq_category] = eq_list.copy()  # 使用 copy 防止后续修改原列表
+            else:
+                # 如果已经存在，则将列表合并（扩展列表）
+                equipment_json[eq_category].extend(eq_list)
+
+    # 添加SI和Span配置信息
+    equipment_json['SI'] = [network['SI'].copy()]
+    equipment_json['Span'] = [network['Span'].copy()]
+
+    # 加载额外的配置文件
+    extra_configs = DEFAULT_EXTRA_CONFIG
+    if extra_config_filenames:
+        extra_configs = {f.name: f for f in extra_config_filenames}
+        for k, v in DEFAULT_EXTRA_CONFIG.items():
+            extra_configs[k] = v
+    # 使用合并的配置文件返回设备配置
+    with stage('equipment'):
+        return _equipment_from_json(equipment_json, extra_configs)
+
+
 def load_network_from_database(user_id, network_id, equipment):
     """
     从数据库中加载网络配置，并将其转换为一个有向图（DiGraph）。
@@ -18,36 +188,11 @@ def load_network_from_database(user_id, network_id, equipment):
     :param network_id: 网络ID
     :return: 转换后的有向图（DiGraph）
     """
-    # 从数据库中查找指定网络ID的网络配置
-    network = NetworkDB.find_by_network_id(user_id, network_id)
+    context = SimulationContext.load(user_id, network_id)
     # 如果未找到网络配置，则返回None
-    if not network:
+    if not context:
         return None
-    network_json = {}
-    network_json['network_name'] = network['network_name']
-    network_json['elements'] = [
-        {key: value for key, value in element.items()}
-        for element in network['elements']
-    ]
-    network_json['connections'] = [
-        {key: value for key, value in element.items()}
-        for element in network['connections']
-    ]
-    # 遍历 elements 列表中的每个元素
-    for element in network_json['elements']:
-        # 将 element_id 键名替换为 uid
-        element['uid'] = element.pop('element_id')
-
-        # 移除 name 和 library_id 键值对
-        element.pop('name', None)
-        element.pop('library_id', None)
-    # 遍历 connections 列表中的每个元素
-    for connection in network_json['connections']:
-        # 移除 connection_id 键值对
-        connection.pop('connection_id', None)
-    # print(network_json)
-    # 返回转换后的有向图
-    return network_from_json(network_json, equipment)
+    return context.build_network(equipment)
 
 
 def load_spectral_information_from_database(user_id, network_id):
@@ -93,50 +238,12 @@ def load_equipment_from_database(user_id, network_id, extra_config_filenames: Li
     :param extra_config_filenames: 额外的配置文件列表
     :return: 设备配置字典
     """
-    # 从数据库中查找指定网络ID的网络配置
-    network = NetworkDB.find_by_network_id(user_id, network_id)
+    context = SimulationContext.load(user_id, network_id)
     # 如果未找到网络配置，则返回None
-    if not network:
+    if not context:
         return None
+    return context.build_equipment(extra_config_filenames)
 
-    # 用于存储所有的器件库ID
-    library_ids = set()
-
-    # 遍历网络配置中的每个元素
-    for element_config in network['elements']:
-        # 提取library_id并加入集合
-        library_ids.add(element_config['library_id'])
-
-    # 初始化一个空字典，用于存储所有设备
-    equipment_json = {}
-
-    # 遍历每个器件库ID
-    for library_id in library_ids:
-        # 从数据库中查找指定库ID的设备
-        library = EquipmentLibraryDB.find_by_id(library_id)
-
-        # 遍历当前库的每一类设备
-        for eq_category, eq_list in library['equipments'].items():
-            if eq_category not in equipment_json:
-                # 如果总设备字典中还没有这个类别，则直接添加
-                equipment_json[eq_category] = eq_list.copy()  # 使用 copy 防止后续修改原列表
-            else:
-                # 如果已经存在，则将列表合并（扩展列表）
-                equipment_json[eq_category].extend(eq_list)
-
-    # 添加SI和Span配置信息
-    equipment_json['SI'] = [network['SI'].copy()]
-    equipment_json['Span'] = [network['Span'].copy()]
-
-    # 加载额外的配置文件
-    extra_configs = DEFAULT_EXTRA_CONFIG
-    if extra_config_filenames:
-        extra_configs = {f.name: f for f in extra_config_filenames}
-        for k, v in DEFAULT_EXTRA_CONFIG.items():
-            extra_configs[k] = v
-    # print(extra_configs)
-    # 使用合并的配置文件返回设备配置
-    return _equipment_from_json(equipment_json, extra_configs)
 
 def load_sim_parameters_from_database(user_id, network_id):
     """
@@ -145,9 +252,7 @@ def load_sim_parameters_from_database(user_id, network_id):
     :param network_id: 网络ID
     :return: 仿真参数，如果未找到则返回None
     """
-    # 从数据库中查找指定网络ID的网络配置
-    network = NetworkDB.find_by_network_id(user_id, network_id)
-    if not network:
+    context = SimulationContext.load(user_id, network_id)
+    if not context:
         return None
-
-    return network['simulation_config'].copy()
\ No newline at end of file
+    return context.build_sim_params()
@@ -0,0 +1,196 @@
+# coding: utf-8
+"""
+业务规划。
+
+将网络文档中保存的业务（services）转换为 GNPY 的 PathRequest，在同一份设计上依次完成
+路由计算（含分离约束）、传播与模式选择、频谱分配，返回每条业务的可行性、所用模式和 GSNR 余量。
+
+业务支持两种格式：
+
+- GNPY 业务请求（path-request）格式，包含 request-id、source、destination 和 path-constraints，
+  由 GNPY 的 requests_from_json 转换
+- 简化格式：{request_id, source, destination, trx_type, trx_mode, nodes_list, loose_list, bidirectional,
+  path_bandwidth, power_dbm, effective_freq_slot}，除 request_id、source、destination 外均可选，
+  由 generate_simulation_parameters 转换。
+  未指定 trx_type 时使用源收发器元素的型号（type_variety），未指定 trx_mode 时由 GNPY 按可行性自动选择模式
+"""
+from collections import Counter
+
+from numpy import mean
+from gnpy.core.elements import Transceiver
+from gnpy.tools.json_io import disjunctions_from_json, requests_from_json
+from gnpy.topology.request import (
+    compute_path_dsjctn,
+    compute_path_with_disjunction,
+    correct_json_route_list,
+    deduplicate_disjunctions,
+    requests_aggregation
+)
+from gnpy.topology.spectrum_assignment import build_oms_list, pth_assign_spectrum
+
+# Project imports
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.simulation.core import SimulationError, gnpy_errors
+from src.optinetsim_backend.app.simulation.sim_params import generate_simulation_parameters
+
+# requests_aggregation 合并相同收发器对和模式的业务时，以此连接各业务的 request_id
+_AGGREGATED_ID_SEPARATOR = ' | '
+
+
+def select_services(services, request_ids=None):
+    """按 request_id 筛选业务（GNPY 格式为 request-id），request_ids 为空时返回全部业务"""
+    if not request_ids:
+        return list(services)
+    wanted = {str(request_id) for request_id in request_ids}
+    return [service for service in services
+            if str(service.get('request-id', service.get('request_id'))) in wanted]
+
+
+def service_trx_type(service, transceiver_types):
+    """
+    简化格式业务使用的收发器型号：业务指定的 trx_type，未指定时为源收发器元素的型号。
+
+    :param transceiver_types: 收发器 uid（element_id）到型号的映射
+    :return: 收发器型号，无法确定时返回 None
+    """
+    return service.get('trx_type') or transceiver_types.get(service.get('source'))
+
+
+def unplannable_service(elements, services):
+    """
+    检查业务能否规划，在提交规划前调用。
+
+    :param elements: 网络文档中的元素列表
+    :param services: select_services 筛选后的业务列表
+    :return: 错误信息，全部业务都能规划时返回 None
+    """
+    if not services:
+        return '网络中没有需要规划的业务'
+    transceiver_types = {element['element_id']: element.get('type_variety')
+                         for element in elements if element.get('type') == 'Transceiver'}
+    for index, service in enumerate(services):
+        if 'path-constraints' not in service and not service_trx_type(service, transceiver_types):
+            request_id = service.get('request_id', index)
+            return f'业务 {request_id} 未指定 trx_type，且源收发器没有型号（type_variety）'
+    return None
+
+
+def service_requests(equipment, network_SI, services, transceiver_types=None):
+    """
+    将业务列表转换为 PathRequest 列表，顺序与 services 一致。
+
+    :param equipment: 网络的设备配置
+    :param network_SI: 网络的 SI
+    :param services: 业务列表，格式见模块说明
+    :param transceiver_types: 收发器 uid 到型号的映射，用于未指定 trx_type 的业务
+    """
+    gnpy_services = [service for service in services if 'path-constraints' in service]
+    requests = iter(requests_from_json({'path-request': gnpy_services}, equipment)) if gnpy_services else iter([])
+    result = []
+    for index, service in enumerate(services):
+        if 'path-constraints' in service:
+            result.append(next(requests))
+            continue
+        if not service.get('source') or not service.get('destination'):
+            raise SimulationError(f'第 {index + 1} 条业务缺少 source 或 destination')
+        trx_type = service_trx_type(service, transceiver_types or {})
+        if not trx_type:
+            # 没有收发器型号时模式的 OSNR 未知，无法判断业务是否可行
+            raise SimulationError(f'第 {index + 1} 条业务未指定 trx_type，且源收发器没有型号')
+        result.append(generate_simulation_parameters(
+            equipment, service['source'], service['destination'], network_SI,
+            request_id=str(service.get('request_id', index)),
+            trx_type_variety=trx_type,
+            trx_mode=service.get('trx_mode', ''),
+            nodes_list=service.get('nodes_list'),
+            loose_list=service.get('loose_list'),
+            bidir=service.get('bidirectional', False),
+            path_bandwidth=service.get('path_bandwidth', 0),
+            power_dbm=service.get('power_dbm'),
+            effective_freq_slot=service.get('effective_freq_slot') or [{'N': None, 'M': None}]
+        ))
+    return result
+
+
+def plan_services(design, network_SI, services, synchronization=None):
+    """
+    在同一份设计上规划全部业务，步骤与 GNPY 的 planning 相同：先由网络构建 OMS 列表（同时为各元素设置所属 OMS），
+    再计算路由、传播并选择模式，最后分配频谱。
+
+    :param design: DesignedNetwork，规划会修改其中网络元素的状态
+    :param network_SI: 网络的 SI
+    :param services: 业务列表
+    :param synchronization: GNPY 格式的分离约束列表
+    :return: 每条业务的规划结果及汇总
+    """
+    equipment = design.equipment
+    network = design.network
+    transceiver_types = {node.uid: node.type_variety for node in network.nodes if isinstance(node, Transceiver)}
+    with gnpy_errors():
+        with stage('spectrum'):
+            oms_list = build_oms_list(network, equipment)
+        requests = service_requests(equipment, network_SI, services, transceiver_types)
+        disjunctions = disjunctions_from_json({'synchronization': synchronization or []})
+        with stage('routing'):
+            requests = correct_json_route_list(network, requests)
+            disjunctions = deduplicate_disjunctions(disjunctions)
+            requests, disjunctions = requests_aggregation(requests, disjunctions)
+            paths = compute_path_dsjctn(network, equipment, requests, disjunctions)
+        with stage('propagate'):
+            propagated_paths, reversed_paths, _ = compute_path_with_disjunction(network, equipment, requests, paths)
+        with stage('spectrum'):
+            pth_assign_spectrum(paths, requests, oms_list, reversed_paths)
+
+    sys_margins = equipment['SI']['default'].sys_margins
+    results = []
+    for req, propagated_path in zip(requests, propagated_paths):
+        result = service_result(req, propagated_path, sys_margins)
+        # 被合并的业务各自返回一条结果
+        for request_id in str(req.request_id).split(_AGGREGATED_ID_SEPARATOR):
+            results.append(dict(result, request_id=request_id))
+    blocking = Counter(result['blocking_reason'] for result in results if not result['feasible'])
+    return {
+        'services': results,
+        'summary': {
+            'services': len(results),
+            'feasible': sum(1 for result in results if result['feasible']),
+            'blocked': sum(blocking.values()),
+            'blocking_reasons': dict(blocking),
+        },
+    }
+
+
+def service_result(req, propagated_path, sys_margins):
+    """
+    单条业务的规划结果。
+
+    GSNR 余量与 GNPY 判断模式是否可行的方式相同：目的收发器各通道 GSNR (0.1 nm) 的最小值
+    减去模式要求的 OSNR 和系统余量 sys_margins。
+    """
+    blocking_reason = getattr(req, 'blocking_reason', None)
+    result = {
+        'request_id': req.request_id,
+        'source': req.source,
+        'destination': req.destination,
+        'feasible': blocking_reason is None,
+        'blocking_reason': blocking_reason,
+        'trx_type': req.tsp,
+        'mode': req.tsp_mode,
+        'bit_rate': req.bit_rate,
+        'path_bandwidth': req.path_bandwidth,
+        'path': [el.uid for el in propagated_path],
+        'GSNR (0.1nm, dB)': None,
+        'required OSNR (dB)': None,
+        'GSNR margin (dB)': None,
+        'spectrum': None,
+    }
+    if propagated_path:
+        snr_01nm = propagated_path[-1].snr_01nm
+        result['GSNR (0.1nm, dB)'] = float(mean(snr_01nm))
+        if req.OSNR is not None:
+            result['required OSNR (dB)'] = float(req.OSNR + sys_margins)
+            result['GSNR margin (dB)'] = float(min(snr_01nm) - req.OSNR - sys_margins)
+    if getattr(req, 'N', None) is not None and getattr(req, 'M', None) is not None:
+        # N 为中心频率在 6.25 GHz 栅格上相对 193.1 THz 的索引，占用 [N - M, N + M - 1] 共 2M 个频隙
+        result['spectrum'] = {'N': req.N, 'M': req.M}
+    return result
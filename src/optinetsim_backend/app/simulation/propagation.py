@@ -0,0 +1,206 @@
+# coding: utf-8
+"""
+逐元素传播。
+
+与 GNPY 的 propagate 计算过程相同，但按元素逐个执行；传播前的检查、功率点的选择和收发器的最后计算
+都与单链路仿真（propagate_pair）共用，结果与单链路仿真相同：
+
+- propagate_stepwise 每经过一个元素就产出一个事件，调用方可以在整条路径传播完成之前将中间结果发送给客户端
+- propagate_incremental 保存每个元素的输入频谱信息和传播后的状态，网络修改后重新仿真时，
+  从路径上第一个发生变化的元素开始传播，之前的元素直接使用上次的结果
+"""
+import logging
+from copy import deepcopy
+
+import numpy as np
+from gnpy.core.elements import Fiber
+from gnpy.core.utils import lin2db, watt2dbm
+
+# Project imports
+from src.optinetsim_backend.app.cache import propagation_cache
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.simulation.core import (
+    SimulationError,
+    apply_sim_params,
+    check_propagation,
+    design_key,
+    get_designed_network,
+    gnpy_errors,
+    power_offsets_db,
+    propagate_pair,
+    require_transceivers,
+    set_final_power
+)
+from src.optinetsim_backend.app.simulation.results import (
+    CHANNEL_FORMAT_COLUMNAR,
+    build_single_link_result,
+    channel_columns,
+    channel_rows
+)
+from src.optinetsim_backend.app.simulation.segments import (
+    element_fingerprint,
+    finish_transceivers,
+    path_spectral_information,
+    propagate_element
+)
+from src.optinetsim_backend.app.utils import stable_hash
+
+logger = logging.getLogger(__name__)
+
+
+def _constrained_path(design, source_uid, destination_uid):
+    # 返回 (传播请求, 路径, 功率点数)，检查和功率点的选择与 propagate_pair 相同，即最后一个功率点
+    check_propagation(design)
+    require_transceivers(design, source_uid, destination_uid)
+    req = design.request_for(source_uid, destination_uid)
+    path = design.path(source_uid, destination_uid)
+    if not path:
+        raise SimulationError('源和目的收发器之间没有可用路径')
+    with gnpy_errors():
+        power_count = set_final_power(design, req, path)
+    return req, path, power_count
+
+
+def _channel_data(si, path, channel_format):
+    if channel_format == CHANNEL_FORMAT_COLUMNAR:
+        return channel_columns(si, path[-1])
+    return channel_rows(si, path[-1])
+
+
+def propagate_stepwise(design, source_uid, destination_uid, element_names, channel_format='rows'):
+    """
+    在设计后的网络上逐元素计算一对收发器之间的传播。
+
+    :param design: DesignedNetwork，传播会修改其中网络元素的状态
+    :param source_uid: 源收发器的 uid
+    :param destination_uid: 目标收发器的 uid
+    :param element_names: element_id 到元素名称的映射
+    :param channel_format: 汇总结果中通道结果的格式
+    :return: 事件生成器，依次产出每个元素的 element 事件，最后产出 summary 事件
+    """
+    req, path, power_count = _constrained_path(design, source_uid, destination_uid)
+
+    with gnpy_errors():
+        si = path_spectral_information(path, req, design.equipment)
+    for index, el in enumerate(path):
+        with gnpy_errors():
+            si = propagate_element(path, index, si)
+        yield element_event(index, el, element_names.get(el.uid), si)
+
+    with gnpy_errors():
+        finish_transceivers(path, si, req)
+
+    spans = [el.params.length for el in path if isinstance(el, Fiber)]
+    # 与 propagate_pair 相同，只传播一个功率点时才返回路径
+    res_path = [el.uid for el in path] if power_count == 1 else []
+    yield {
+        'event': 'summary',
+        'result': build_single_link_result(element_names, source_uid, destination_uid, spans, si,
+                                           res_path, path, _channel_data(si, path, channel_format)),
+    }
+
+
+class PathSnapshot:
+    """
+    一次逐元素传播的快照。
+
+    :param fingerprints: 路径上每个元素的指纹，见 element_fingerprint
+    :param inputs: 进入每个元素之前的频谱信息
+    :param elements: 每个元素传播后的副本（尚未计算收发器的 SNR 和损伤）
+    :param output: 路径末端的频谱信息
+    """
+
+    def __init__(self, fingerprints, inputs, elements, output):
+        self.fingerprints = fingerprints
+        self.inputs = inputs
+        self.elements = elements
+        self.output = output
+
+    def resume_index(self, fingerprints):
+        """返回第一个与快照不一致的元素序号，完全一致时返回路径长度"""
+        for index, (previous, current) in enumerate(zip(self.fingerprints, fingerprints)):
+            if previous != current:
+                return index
+        if len(self.fingerprints) != len(fingerprints):
+            return min(len(self.fingerprints), len(fingerprints))
+        return len(fingerprints)
+
+
+def snapshot_key(context, source_uid, destination_uid, spectrum=None, power=0, no_insert_edfas=False):
+    """传播快照的键：与设计缓存的键相同但不含 revision，网络修改后仍能找到上次的快照"""
+    network_id, _, *design_inputs = design_key(context, spectrum, power, no_insert_edfas)
+    return (network_id, *design_inputs, source_uid, destination_uid, stable_hash(context.build_sim_params()))
+
+
+def propagate_incremental(design, source_uid, destination_uid, key, channel_format='rows'):
+    """
+    逐元素计算一对收发器之间的传播，并从上次传播的快照中恢复未变化的部分。
+
+    网络仍完整地重新设计，设计后路径上每个元素的指纹与快照比较，从第一个不一致的元素开始传播，
+    之前的元素及其输出直接复用。传播完成后保存新的快照。
+
+    :param design: DesignedNetwork，传播会修改其中网络元素的状态
+    :param key: 快照的键，见 snapshot_key
+    :return: 与 propagate_pair 相同的 (spans, infos, res_path, mypath, channel_data)
+    """
+    req, path, _ = _constrained_path(design, source_uid, destination_uid)
+    fingerprints = [element_fingerprint(path, index) for index in range(len(path))]
+
+    previous = propagation_cache.get(key)
+    start = previous.resume_index(fingerprints) if previous is not None else 0
+    if start:
+        # 快照只读，复用的元素和频谱信息都取副本
+        path[:start] = deepcopy(previous.elements[:start])
+        si = deepcopy(previous.inputs[start] if start < len(path) else previous.output)
+        inputs, elements = previous.inputs[:start], previous.elements[:start]
+    else:
+        with gnpy_errors():
+            si = path_spectral_information(path, req, design.equipment)
+        inputs, elements = [], []
+    logger.debug('增量仿真从路径上第 %d 个元素开始传播（共 %d 个）', start, len(path))
+
+    with gnpy_errors(), stage('propagate'):
+        for index in range(start, len(path)):
+            inputs.append(deepcopy(si))
+            si = propagate_element(path, index, si)
+            elements.append(deepcopy(path[index]))
+        propagation_cache.put(key, PathSnapshot(fingerprints, inputs, elements, deepcopy(si)))
+        finish_transceivers(path, si, req)
+
+    spans = [el.params.length for el in path if isinstance(el, Fiber)]
+    return spans, si, [el.uid for el in path], path, _channel_data(si, path, channel_format)
+
+
+def simulate_incremental(context, source_uid, destination_uid, spectrum=None, power=0, no_insert_edfas=False,
+                         channel_format='rows'):
+    """
+    增量单链路仿真，结果与 simulate_network 相同。
+
+    功率模式下 SI 的 power_range_db 包含多个功率点时，每个功率点都需要完整传播，退回到 propagate_pair。
+    快照保存在执行仿真的进程中。所有仿真共用一个进程池，任务由任一空闲的工作进程执行，
+    因此只有重新仿真恰好落在保存快照的工作进程中（工作进程数为 0 时总在服务进程中）才能从快照恢复，
+    否则与 simulate_network 相同地完整传播。
+    """
+    with gnpy_errors():
+        design = get_designed_network(context, spectrum=spectrum, power=power, no_insert_edfas=no_insert_edfas)
+    apply_sim_params(context.build_sim_params())
+    if len(power_offsets_db(design.equipment)) > 1:
+        return propagate_pair(design, source_uid, destination_uid, channel_format=channel_format)
+    key = snapshot_key(context, source_uid, destination_uid, spectrum, power, no_insert_edfas)
+    return propagate_incremental(design, source_uid, destination_uid, key, channel_format)
+
+
+def element_event(index, el, element_name, si):
+    """经过一个元素后的累计结果：平均 GSNR（信号带宽，不含收发器损伤）和平均信道功率"""
+    noise = si.ase + si.nli
+    mask = noise > 0
+    gsnr = float(np.mean(lin2db(si.signal[mask] / noise[mask]))) if mask.any() else None
+    return {
+        'event': 'element',
+        'index': index,
+        'uid': el.uid,
+        'name': element_name,
+        'type': type(el).__name__,
+        'gsnr_db': gsnr,
+        'power_dbm': float(np.mean(watt2dbm(si.signal))),
+    }
@@ -0,0 +1,219 @@
+# coding: utf-8
+import numpy as np
+from numpy import argmax, generic, ndarray
+from gnpy.core.utils import watt2dbm, per_label_average, mean
+
+# Project imports
+from src.optinetsim_backend.app.simulation.extractors import extract_element_info
+
+
+def convert_to_spectrum_array(data, metric_name):
+    """
+    Convert dictionary format to array of objects with spectrum_band and metric value.
+
+    Args:
+        data (dict): Dictionary with spectrum band as key and metric value as value
+        metric_name (str): Name of the metric value field in output
+
+    Returns:
+        list: Array of dictionaries with spectrum_band and metric value
+    """
+    return [
+        {
+            "spectrum_band": band,
+            metric_name: str(value)
+        }
+        for band, value in data.items()
+    ]
+
+
+# 通道结果的输出格式
+CHANNEL_FORMAT_ROWS = 'rows'
+CHANNEL_FORMAT_COLUMNAR = 'columnar'
+CHANNEL_FORMATS = (CHANNEL_FORMAT_ROWS, CHANNEL_FORMAT_COLUMNAR)
+
+# 按行输出时各指标保留的小数位数
+_CHANNEL_DECIMALS = {
+    'channel_frequency': 5,
+    'channel_power': 2,
+    'OSNR_ASE': 2,
+    'SNR_NLI': 2,
+    'GSNR': 2,
+}
+
+
+def channel_columns(infos, transceiver):
+    """
+    线路末端每个通道的结果，按指标排列为并行的 NumPy 数组。
+
+    :param infos: 传播结束时的频谱信息（SpectralInformation）
+    :param transceiver: 传播结束时的目标收发器
+    :return: {指标名: 数组}
+    """
+    return {
+        'channel_number': np.asarray(infos.channel_number),
+        'channel_frequency': np.asarray(infos.frequency) * 1e-12,
+        'channel_power': watt2dbm(np.asarray(infos.signal)),
+        'OSNR_ASE': np.asarray(transceiver.osnr_ase),
+        'SNR_NLI': np.asarray(transceiver.osnr_nli),
+        'GSNR': np.asarray(transceiver.snr),
+    }
+
+
+def channel_rows(infos, transceiver):
+    """线路末端每个通道的结果，每个通道一个字典"""
+    columns = {
+        key: (np.round(values, _CHANNEL_DECIMALS[key]) if key in _CHANNEL_DECIMALS else values).tolist()
+        for key, values in channel_columns(infos, transceiver).items()
+    }
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def to_builtin(obj):
+    """将结果中的 NumPy 标量和数组递归转换为 Python 原生类型，以便写入 MongoDB"""
+    if isinstance(obj, dict):
+        return {key: to_builtin(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [to_builtin(value) for value in obj]
+    if isinstance(obj, ndarray):
+        return obj.tolist()
+    if isinstance(obj, generic):
+        return obj.item()
+    return obj
+
+
+def sweep_point(power_dbm, transceiver):
+    """提取功率扫描中单个功率点的平均 GSNR、OSNR 和 NLI"""
+    return {
+        'power': float(power_dbm),
+        'gsnr': float(mean(transceiver.snr)),
+        'gsnr_01nm': float(mean(transceiver.snr_01nm)),
+        'osnr_ase': float(mean(transceiver.osnr_ase)),
+        'snr_nli': float(mean(transceiver.osnr_nli)),
+    }
+
+
+def build_sweep_result(source_uid, destination_uid, points):
+    """
+    组装功率扫描接口的返回结果，各指标按功率顺序排列为数组。
+
+    :param points: sweep_point 返回的功率点列表
+    :return: 结果字典
+    """
+    def column(key):
+        return np.array([point[key] for point in points], dtype=float)
+
+    gsnr = column('gsnr')
+    return {
+        'Source': source_uid,
+        'Destination': destination_uid,
+        'power (dBm)': column('power'),
+        'Mean GSNR (signal bw, dB)': gsnr,
+        'Mean GSNR (0.1nm, dB)': column('gsnr_01nm'),
+        'Mean OSNR ASE (signal bw, dB)': column('osnr_ase'),
+        'Mean SNR NLI (signal bw, dB)': column('snr_nli'),
+        'optimal power (dBm)': points[int(argmax(gsnr))]['power'] if points else None,
+    }
+
+
+def pair_metrics(transceiver):
+    """提取一对收发器传播结束时目标收发器的平均 GSNR (0.1 nm)、OSNR ASE (0.1 nm) 和时延"""
+    return [float(mean(transceiver.snr_01nm)), float(mean(transceiver.osnr_ase_01nm)), float(mean(transceiver.latency))]
+
+
+def _statistics(values):
+    if not values.size:
+        return None
+    return {'min': float(values.min()), 'mean': float(values.mean()),
+            'median': float(np.median(values)), 'max': float(values.max())}
+
+
+def build_all_pairs_result(transceivers, element_names, rows):
+    """
+    组装全网收发器对分析的结果。
+
+    :param transceivers: 收发器 uid 列表，矩阵的行和列都按此顺序排列
+    :param element_names: element_id 到元素名称的映射
+    :param rows: 每个源收发器一行，{'source': uid, 'metrics': [pair_metrics 或 None, ...], 'errors': {uid: 错误信息}}
+    :return: GSNR、OSNR 和时延矩阵（源为行、目的为列，对角线及失败的收发器对为 None）及汇总统计
+    """
+    metrics = {row['source']: row['metrics'] for row in rows}
+    matrices = [[[None] * len(transceivers) for _ in transceivers] for _ in range(3)]
+    failures = []
+    for i, source in enumerate(transceivers):
+        for j, values in enumerate(metrics.get(source, [])):
+            if values is not None:
+                for matrix, value in zip(matrices, values):
+                    matrix[i][j] = value
+    for row in rows:
+        failures.extend({'Source': row['source'], 'Destination': destination, 'message': message}
+                        for destination, message in row['errors'].items())
+
+    gsnr = np.array([value for row in matrices[0] for value in row if value is not None], dtype=float)
+    worst = None
+    if gsnr.size:
+        i, j = min(((i, j) for i, row in enumerate(matrices[0]) for j, value in enumerate(row) if value is not None),
+                   key=lambda index: matrices[0][index[0]][index[1]])
+        worst = {'Source': transceivers[i], 'Destination': transceivers[j], 'GSNR (0.1nm, dB)': matrices[0][i][j]}
+    return {
+        'transceivers': [{'uid': uid, 'name': element_names.get(uid)} for uid in transceivers],
+        'GSNR (0.1nm, dB)': matrices[0],
+        'OSNR ASE (0.1nm, dB)': matrices[1],
+        'Latency (ms)': matrices[2],
+        'summary': {
+            'pairs': len(transceivers) * (len(transceivers) - 1),
+            'simulated': int(gsnr.size),
+            'failed': len(failures),
+            'GSNR (0.1nm, dB)': _statistics(gsnr),
+            'OSNR ASE (0.1nm, dB)': _statistics(np.array(
+                [value for row in matrices[1] for value in row if value is not None], dtype=float)),
+            'Latency (ms)': _statistics(np.array(
+                [value for row in matrices[2] for value in row if value is not None], dtype=float)),
+            'worst pair': worst,
+        },
+        'failures': failures,
+    }
+
+
+def build_single_link_result(element_names, source_uid, destination_uid, spans, infos, res_path, mypath, channel_data):
+    """
+    组装单链路仿真接口的返回结果。
+
+    :param element_names: element_id 到元素名称的映射，见 SimulationContext.element_names
+    :param source_uid: 源收发器的 uid
+    :param destination_uid: 目标收发器的 uid
+    :return: 结果字典
+    """
+    full_path_info = [extract_element_info(elem, element_names.get(elem.uid)) for elem in mypath]
+
+    return {
+        'Source': source_uid,
+        'Destination': destination_uid,
+        'number of channels': infos.number_of_channels,
+        'number of fiber': len(spans),
+        'length of fiber (km)': sum(spans) / 1000,
+        'Mean GSNR (0.1nm, dB)': convert_to_spectrum_array(
+            per_label_average(mypath[-1].snr_01nm, mypath[-1].propagated_labels),
+            'mean_GSNR_0_1nm'
+        ),
+        'Mean GSNR (signal bw, dB)': convert_to_spectrum_array(
+            per_label_average(mypath[-1].snr, mypath[-1].propagated_labels),
+            'mean_GSNR_signal_bw'
+        ),
+        'Mean OSNR ASE (0.1nm, dB)': convert_to_spectrum_array(
+            per_label_average(mypath[-1].osnr_ase_01nm, mypath[-1].propagated_labels),
+            'mean_OSNR_ASE_0_1nm'
+        ),
+        'Mean OSNR ASE (signal bw, dB)': convert_to_spectrum_array(
+            per_label_average(mypath[-1].osnr_ase, mypath[-1].propagated_labels),
+            'mean_OSNR_ASE_signal_bw'
+        ),
+        'Total CD (ps/nm)': mean(mypath[-1].chromatic_dispersion),
+        'Total PMD (ps)': mean(mypath[-1].pmd),
+        'Total PDL (dB)': mean(mypath[-1].pdl),
+        'Total Latency (ms)': mean(mypath[-1].latency),
+        'Total Actual pch out (dBm)': per_label_average(watt2dbm(mypath[-1].tx_power), mypath[-1].propagated_labels),
+        'path': res_path,
+        'full_path_info': full_path_info,  # 使用新的 full_path_info
+        'full_channel_info': channel_data,
+    }
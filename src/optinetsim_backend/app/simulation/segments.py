@@ -0,0 +1,133 @@
+# coding: utf-8
+"""
+按 OMS 段记忆化的传播。
+
+路径在每个 ROADM 处分段（第一段从源收发器开始），每段的传播结果只取决于段内设计后的元素、
+进入该段的频谱信息和 SimParams。三者相同时直接复用缓存中该段传播后的元素和输出频谱信息，
+结果与完整传播完全相同。
+
+段缓存的键还包含设备配置的键，器件库修改后不会复用旧的结果。
+进入一段的频谱信息包含上游累积的 ASE 和 NLI，因此复用发生在路径前缀相同的传播之间：
+同一源收发器到多个目的收发器的批量和全收发器对仿真、相同收发器对的重复仿真，
+以及网络修改后未受影响的前缀段。缓存保存在执行仿真的进程中，工作进程之间不共享：
+所有仿真共用一个进程池，任务由任一空闲的工作进程执行，跨请求的复用只在任务落在同一工作进程时发生
+（工作进程数为 0 时总在服务进程中）；可靠的复用发生在一个任务内部，即同一次 run_pairs 或 run_source_rows
+调用中依次传播的收发器对之间。
+只有单个功率点的传播使用段缓存，多个功率点时每个功率点都重新设计网络，见 core.propagate_pair。
+"""
+import hashlib
+from copy import deepcopy
+
+import numpy as np
+from gnpy.core.elements import Roadm
+from gnpy.core.info import create_input_spectral_information, carriers_to_spectral_information
+from gnpy.topology.request import filter_si
+
+# Project imports
+from src.optinetsim_backend.app.cache import segment_cache
+from src.optinetsim_backend.app.utils import stable_hash
+
+# 参与频谱信息指纹计算的属性
+_SPECTRAL_FIELDS = ('frequency', 'slot_width', 'signal', 'nli', 'ase', 'baud_rate', 'roll_off',
+                    'chromatic_dispersion', 'pmd', 'pdl', 'latency', 'delta_pdb_per_channel',
+                    'tx_osnr', 'tx_power', 'label')
+
+
+def input_spectral_information(req):
+    """根据传播请求生成发射端的频谱信息，用户指定了初始频谱时使用该频谱"""
+    if req.initial_spectrum is not None:
+        return carriers_to_spectral_information(initial_spectrum=req.initial_spectrum, power=req.power)
+    return create_input_spectral_information(
+        f_min=req.f_min, f_max=req.f_max, roll_off=req.roll_off, baud_rate=req.baud_rate,
+        spacing=req.spacing, tx_osnr=req.tx_osnr, tx_power=req.tx_power, delta_pdb=req.offset_db)
+
+
+def path_spectral_information(path, req, equipment):
+    """与 GNPY 的 propagate 相同，发射端的频谱信息只保留路径上放大器共同支持的频带"""
+    return filter_si(path, equipment, input_spectral_information(req))
+
+
+def propagate_element(path, index, si):
+    """经过路径上的第 index 个元素，ROADM 需要知道上下游方向"""
+    el = path[index]
+    if isinstance(el, Roadm):
+        return el(si, degree=path[index + 1].uid, from_degree=path[index - 1].uid)
+    return el(si)
+
+
+def roadm_osnr(path, si):
+    """
+    路径上每个 ROADM 在其上下游方向之间的 roadm-osnr 损伤。
+
+    GNPY 的 propagate 在每个 ROADM 之后按当时的通道频率读取，传播不增删通道，因此与按末端频谱信息读取相同。
+    """
+    return [el.get_impairment('roadm-osnr', si.frequency, from_degree=path[index - 1].uid,
+                              degree=path[index + 1].uid)
+            for index, el in enumerate(path) if isinstance(el, Roadm)]
+
+
+def finish_transceivers(path, si, req):
+    """与 GNPY 的 propagate 相同，最后计算收发器的 SNR 和损伤"""
+    path[0].update_snr(si.tx_osnr)
+    path[0].calc_penalties(req.penalties)
+    path[-1].update_snr(*roadm_osnr(path, si), si.tx_osnr)
+    path[-1].calc_penalties(req.penalties)
+
+
+def element_fingerprint(path, index):
+    """
+    元素在路径上的指纹：设计后的元素配置（to_json）及其上下游元素的 uid。
+
+    输入频谱信息相同且指纹相同时，元素的传播结果相同；ROADM 的输出还取决于上下游方向。
+    """
+    el = path[index]
+    neighbours = [path[i].uid if 0 <= i < len(path) else None for i in (index - 1, index + 1)]
+    return stable_hash([el.uid, type(el).__name__, el.to_json, neighbours])
+
+
+def spectral_fingerprint(si):
+    """频谱信息的指纹，按各数组的原始字节计算，只有完全相同的频谱信息才会相等"""
+    digest = hashlib.sha1()
+    for field in _SPECTRAL_FIELDS:
+        value = getattr(si, field, None)
+        if value is not None:
+            digest.update(field.encode('utf-8'))
+            digest.update(np.ascontiguousarray(value).tobytes())
+    return digest.hexdigest()
+
+
+def segment_bounds(path):
+    """路径在每个 ROADM 处分段，返回 [(起始序号, 结束序号), ...]，不含结束序号"""
+    starts = [0] + [index for index, el in enumerate(path) if index > 0 and isinstance(el, Roadm)]
+    return list(zip(starts, starts[1:] + [len(path)]))
+
+
+def propagate_segments(path, req, equipment, equipment_key, sim_params_key):
+    """
+    与 GNPY 的 propagate 相同，但逐段查询和写入段缓存。
+
+    命中的段将 path 中对应的元素替换为缓存元素的副本。
+
+    :param path: 传播路径上的网络元素列表，传播会修改其中元素的状态
+    :param req: 传播请求
+    :param equipment: 设备配置
+    :param equipment_key: 设备配置的键，见 SimulationContext.equipment_key
+    :param sim_params_key: 本进程当前生效的 SimParams 的哈希
+    :return: 路径末端的频谱信息
+    """
+    si = path_spectral_information(path, req, equipment)
+    fingerprints = [element_fingerprint(path, index) for index in range(len(path))]
+    for start, end in segment_bounds(path):
+        key = (stable_hash(fingerprints[start:end]), spectral_fingerprint(si), equipment_key, sim_params_key)
+        cached = segment_cache.get(key)
+        if cached is not None:
+            # 缓存只读，复用的元素和频谱信息都取副本
+            elements, si = deepcopy(cached)
+            path[start:end] = elements
+            continue
+        for index in range(start, end):
+            si = propagate_element(path, index, si)
+        # 同一份设计会依次用于多对收发器的传播，写入缓存的必须是副本
+        segment_cache.put(key, deepcopy((path[start:end], si)))
+    finish_transceivers(path, si, req)
+    return si
@@ -14,13 +14,18 @@ from gnpy.topology.request import correct_json_route_list, deduplicate_disjuncti
     compute_constrained_path, propagate
 from gnpy.tools.json_io import requests_from_json, disjunctions_from_json
 
-# Project imports
-from src.optinetsim_backend.app.database.models import NetworkDB, EquipmentLibraryDB
-
 
 # Generate transceiver mode parameters
-def generate_trx_mode_params(user_id, network_id, network_SI, trx_type_variety='', trx_mode=''):
-    trx_params = {}
+def generate_trx_mode_params(equipment, network_SI, trx_type_variety='', trx_mode=''):
+    """
+    生成收发器模式参数，与 GNPY 的 trx_mode_params 相同，收发器型号从网络引用的器件库中查找。
+
+    :param equipment: 网络的设备配置（SimulationContext.build_equipment）
+    :param network_SI: 网络的 SI
+    :param trx_type_variety: 收发器型号，为空时使用网络 SI 的参数
+    :param trx_mode: 收发器模式（format），为空时模式待定，规划时按可行性自动选择
+    :return: 收发器参数字典
+    """
     # default transponder characteristics
     # mainly used with transmission_main_example.py
     default_trx_params = {
@@ -52,34 +57,72 @@ def generate_trx_mode_params(user_id, network_id, network_SI, trx_type_variety='
         "equalization_offset_db": 0
     }
 
-    # TODO: Add the code to get information from the database and assign it to trx_params
+    if not trx_type_variety:
+        return default_trx_params
+
+    transceiver = equipment['Transceiver'].get(trx_type_variety)
+    if transceiver is None:
+        raise exceptions.EquipmentConfigError(f'Could not find transponder "{trx_type_variety}" in equipment library')
+    trx_params = {
+        'f_min': transceiver.frequency['min'],
+        'f_max': transceiver.frequency['max'],
+        'spacing': network_SI['spacing'],
+    }
+    if not trx_mode:
+        trx_params.update(undetermined_trx_params)
+        return trx_params
 
+    mode = next((mode for mode in transceiver.mode if mode['format'] == trx_mode), None)
+    if mode is None:
+        raise exceptions.EquipmentConfigError(
+            f'Could not find transponder "{trx_type_variety}" with mode "{trx_mode}" in equipment library')
+    trx_params.update(mode)
+    trx_params.setdefault('penalties', {})
+    trx_params.setdefault('cost', None)
+    trx_params.setdefault('equalization_offset_db', 0)
+    # 模式规定了最小通道间隔时按该间隔排列通道
+    if trx_params.get('min_spacing'):
+        trx_params['spacing'] = trx_params['min_spacing']
     return trx_params
 
 
 # Generate simulation parameters
-def generate_simulation_parameters(user_id, network_id, source, destination, network_SI, network_Span):
-    nodes_list = [destination]
-    loose_list = ['STRICT']
+def generate_simulation_parameters(equipment, source, destination, network_SI, request_id='reference',
+                                   trx_type_variety='', trx_mode='', nodes_list=None, loose_list=None,
+                                   bidir=False, path_bandwidth=0, power_dbm=None, effective_freq_slot=None):
+    """
+    生成一对收发器之间的 GNPY 传播请求。
+
+    :param equipment: 网络的设备配置
+    :param source: 源收发器的 uid
+    :param destination: 目的收发器的 uid
+    :param network_SI: 网络的 SI
+    :param nodes_list: 路径必须经过的节点，为空时只约束目的节点
+    :param loose_list: 与 nodes_list 对应的 STRICT 或 LOOSE
+    :param path_bandwidth: 业务带宽 (bit/s)
+    :param power_dbm: 单通道发射功率 (dBm)，为空时使用网络 SI 的 power_dbm
+    :param effective_freq_slot: 业务占用的频隙 [{'N': ..., 'M': ...}]，规划时使用，N、M 为 None 时由频谱分配确定
+    :return: PathRequest
+    """
+    trx_params = generate_trx_mode_params(equipment, network_SI, trx_type_variety, trx_mode)
+    nodes_list = list(nodes_list) if nodes_list else [destination]
+    loose_list = list(loose_list) if loose_list else ['STRICT'] * len(nodes_list)
+    power_dbm = network_SI['power_dbm'] if power_dbm is None else power_dbm
     params = {
-        'request_id': 'reference',
-        'trx_type': '',
-        'trx_mode': '',
+        'request_id': request_id,
+        'trx_type': trx_type_variety,
+        'trx_mode': trx_mode or None,
         'source': source,
         'destination': destination,
-        'bidir': False,
+        'bidir': bidir,
         'nodes_list': nodes_list,
         'loose_list': loose_list,
-        'format': '',
-        'path_bandwidth': 0,
-        'effective_freq_slot': None,
-        'nb_channel': automatic_nch(network_SI['f_min'], network_SI['f_max'],
-                                    network_SI['spacing']),
-        'power': dbm2watt(network_SI['power_dbm']),
-        'tx_power': dbm2watt(network_SI['tx_power_dbm']) if 'tx_power_dbm' in network_SI else network_SI['power_dbm'],
+        'format': trx_params.get('format', ''),
+        'path_bandwidth': path_bandwidth,
+        'effective_freq_slot': effective_freq_slot,
+        'nb_channel': automatic_nch(trx_params['f_min'], trx_params['f_max'], trx_params['spacing']),
+        'power': dbm2watt(power_dbm),
+        'tx_power': dbm2watt(network_SI['tx_power_dbm']) if 'tx_power_dbm' in network_SI else dbm2watt(power_dbm),
     }
-    trx_params = generate_trx_mode_params(user_id, network_id, network_SI)
-
-    # TODO: Add the code to get information from the database and assign it to params
-
-
+    params.update(trx_params)
+    return PathRequest(**params)
@@ -1,29 +1,184 @@
 # coding: utf-8
+import json
+
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request
-from src.optinetsim_backend.app.simulation.core import simulate_network
-from gnpy.core.utils import watt2dbm, per_label_average, mean
-from src.optinetsim_backend.app.database.models import NetworkDB
+from flask import request, Response
+from bson import ObjectId
+from src.optinetsim_backend.app.simulation.results import (
+    CHANNEL_FORMATS,
+    convert_to_spectrum_array,
+    build_sweep_result,
+    to_builtin
+)
+from src.optinetsim_backend.app.simulation.fidelity import (
+    FIDELITIES,
+    FIDELITY_EXACT,
+    channel_count,
+    computed_channels,
+    interpolation_error,
+    supports_fidelity
+)
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.planning import select_services, unplannable_service
+from src.optinetsim_backend.app.simulation.tasks import (
+    run_single_link,
+    run_estimate,
+    prepare_design,
+    run_pairs,
+    run_planning,
+    run_power_sweep,
+    stream_single_link
+)
+from src.optinetsim_backend.app.simulation.executor import simulation_executor, submit_all_pairs_job, submit_job
+from src.optinetsim_backend.app.database.models import NetworkDB, SimulationJobDB, SimulationResultDB
+from src.optinetsim_backend.app.metrics import RESULT_CACHE, stage
+
+# 单次功率扫描允许的最大功率点数
+MAX_SWEEP_POINTS = 201
+
 
-def convert_to_spectrum_array(data, metric_name):
+def parse_single_link_request(data):
     """
-    Convert dictionary format to array of objects with spectrum_band and metric value.
-    
-    Args:
-        data (dict): Dictionary with spectrum band as key and metric value as value
-        metric_name (str): Name of the metric value field in output
-        
-    Returns:
-        list: Array of dictionaries with spectrum_band and metric value
+    解析单链路仿真的请求参数。
+
+    :param data: 请求体 JSON
+    :return: (network_id, 仿真参数字典, 错误信息)，参数合法时错误信息为 None
     """
-    return [
-        {
-            "spectrum_band": band,
-            metric_name: str(value)
-        }
-        for band, value in data.items()
-    ]
+    if not data:
+        return None, None, "请求体不能为空"
+
+    # 检查必需参数
+    network_id = data.get("network_id")
+    source_uid = data.get("source_uid")
+    destination_uid = data.get("destination_uid")
+    if not network_id or not source_uid or not destination_uid:
+        return None, None, "必须提供 network_id、source_uid 和 destination_uid 参数"
+    channel_format, message = parse_channel_format(data)
+    if message:
+        return None, None, message
+
+    # 获取可选参数
+    params = {
+        "source_uid": source_uid,
+        "destination_uid": destination_uid,
+        "spectrum": data.get("spectrum", None),
+        "power": data.get("power", 0),
+        "no_insert_edfas": data.get("no_insert_edfas", False),
+        "channel_format": channel_format
+    }
+    return network_id, params, None
+
+
+def parse_channel_format(data):
+    """解析通道结果格式 format，返回 (格式, 错误信息)"""
+    channel_format = data.get("format", CHANNEL_FORMATS[0])
+    if channel_format not in CHANNEL_FORMATS:
+        return None, "format 必须是 " + " 或 ".join(CHANNEL_FORMATS)
+    return channel_format, None
+
+
+def parse_fidelity(data):
+    """解析 NLI 计算精度档位 fidelity，返回 (档位, 错误信息)，未指定时档位为 None"""
+    fidelity = data.get("fidelity")
+    if fidelity is not None and fidelity not in FIDELITIES:
+        return None, "fidelity 必须是 " + "、".join(FIDELITIES) + " 之一"
+    return fidelity, None
+
+
+def fidelity_report(context, user_id, network_id, params, result):
+    """
+    精度档位的说明及插值误差。
+
+    误差来自对同一收发器对的一次 exact 仿真，按网络内容、档位和设计参数缓存，
+    之后同一网络上其他收发器对的请求直接返回这次校准的结果。
+    """
+    channels = computed_channels(channel_count(context.network['SI'], context.spectrum), context.fidelity)
+    report = {
+        'level': context.fidelity,
+        'computed_channels': channels,
+        'calibration': None,
+    }
+    if channels is None:
+        # 全部通道都计算了 NLI，没有插值误差
+        return report
+    design_params = {key: params[key] for key in ("spectrum", "power", "no_insert_edfas")}
+    calibration_key = context.result_key('fidelity-calibration', design_params)
+    calibration = SimulationResultDB.find(calibration_key)
+    if calibration is None:
+        exact = context.with_fidelity(FIDELITY_EXACT, context.spectrum)
+        exact_result = simulation_executor.run(
+            exact.build_sim_params(), run_single_link, user_id, network_id, context=exact, **params
+        )
+        calibration = interpolation_error(result, exact_result)
+        SimulationResultDB.save(calibration_key, network_id, calibration)
+    report['calibration'] = calibration
+    return report
+
+
+def parse_pairs(pairs):
+    """解析批量仿真的收发器对列表，返回 ([(source_uid, destination_uid), ...], 错误信息)"""
+    if not isinstance(pairs, list) or not pairs:
+        return None, "pairs 必须是非空列表"
+    parsed = []
+    for pair in pairs:
+        if not isinstance(pair, dict) or not pair.get("source_uid") or not pair.get("destination_uid"):
+            return None, "pairs 中的每一项都必须提供 source_uid 和 destination_uid"
+        parsed.append((pair["source_uid"], pair["destination_uid"]))
+    return parsed, None
+
+
+def parse_sweep(sweep):
+    """解析功率扫描范围 {start, stop, step} (dBm)，返回 (功率点列表, 错误信息)"""
+    if not isinstance(sweep, dict):
+        return None, "必须提供 sweep 参数"
+    start, stop, step = sweep.get("start"), sweep.get("stop"), sweep.get("step")
+    if not all(isinstance(value, (int, float)) for value in (start, stop, step)):
+        return None, "sweep 的 start、stop 和 step 必须是数值"
+    if step <= 0 or stop < start:
+        return None, "sweep 必须满足 step > 0 且 stop >= start"
+    count = int(round((stop - start) / step)) + 1
+    if count > MAX_SWEEP_POINTS:
+        return None, f"功率点数不能超过 {MAX_SWEEP_POINTS}"
+    return [round(start + i * step, 6) for i in range(count)], None
+
+
+def parse_planning_request(data):
+    """
+    解析业务规划的请求参数。
+
+    :return: (network_id, 规划参数字典, 错误信息)，参数合法时错误信息为 None
+    """
+    if not data or not data.get("network_id"):
+        return None, None, "必须提供 network_id 参数"
+    request_ids = data.get("request_ids")
+    if request_ids is not None and not isinstance(request_ids, list):
+        return None, None, "request_ids 必须是列表"
+    synchronization = data.get("synchronization")
+    if synchronization is not None and not isinstance(synchronization, list):
+        return None, None, "synchronization 必须是列表"
+    params = {
+        "request_ids": request_ids,
+        "synchronization": synchronization,
+        "power": data.get("power", 0),
+        "no_insert_edfas": data.get("no_insert_edfas", False)
+    }
+    return data["network_id"], params, None
+
+
+def format_job(job):
+    """将任务文档转换为接口返回格式"""
+    return {
+        "job_id": str(job['_id']),
+        "kind": job['kind'],
+        "network_id": str(job['network_id']),
+        "status": job['status'],
+        "error": job['error'],
+        "created_at": job['created_at'].strftime('%Y-%m-%dT%H:%M:%SZ'),
+        "started_at": job['started_at'].strftime('%Y-%m-%dT%H:%M:%SZ') if job['started_at'] else None,
+        "finished_at": job['finished_at'].strftime('%Y-%m-%dT%H:%M:%SZ') if job['finished_at'] else None
+    }
+
 
 class SingleLinkSimulationResource(Resource):
     @jwt_required()
@@ -38,6 +193,16 @@ class SingleLinkSimulationResource(Resource):
             - spectrum (可选): 仿真传输所用的频谱信息字典
             - power (可选): 跨段输入光功率参考，默认为 0
             - no_insert_edfas (可选): 是否禁用插入 EDFAs，默认为 False
+            - format (可选): 通道结果 full_channel_info 的格式，rows 为每个通道一个对象（默认），
+              columnar 为按指标排列的并行数组
+            - incremental (可选): 是否增量仿真，默认为 False。修改网络后重新仿真同一对收发器时，
+              从路径上第一个发生变化的元素开始传播，结果与完整仿真相同。上次的快照保存在执行仿真的工作进程中，
+              本次请求由其他工作进程执行时仍完整传播
+            - fidelity (可选): NLI 计算精度 fast、balanced 或 exact，默认使用网络的 nli_params。
+              fast 和 balanced 只对部分通道计算 NLI，其余通道插值，结果中的 fidelity 给出所选通道
+              和校准得到的插值误差 calibration（首次使用时额外执行一次 exact 仿真）；
+              二者需要网络的 nli_params.method 为 ggn_spectrally_separated 或 ggn_approx，否则返回 400
+        响应编码按 Accept 头选择，支持 application/json、application/msgpack 和 application/x-npz。
         """
         '''
         示例：
@@ -52,98 +217,341 @@ class SingleLinkSimulationResource(Resource):
         except Exception as e:
             return {"message": "请求体解析失败: " + str(e)}, 400
 
-        # 检查必需参数
-        network_id = data.get("network_id")
-        source_uid = data.get("source_uid")
-        destination_uid = data.get("destination_uid")
-        if not network_id or not source_uid or not destination_uid:
-            return {"message": "必须提供 network_id、source_uid 和 destination_uid 参数"}, 400
-
-        # 获取可选参数
-        plot = data.get("plot", False)
-        spectrum = data.get("spectrum", None)
-        power = data.get("power", 0)
-        no_insert_edfas = data.get("no_insert_edfas", False)
+        network_id, params, message = parse_single_link_request(data)
+        if message:
+            return {"message": message}, 400
+        fidelity, message = parse_fidelity(data)
+        if message:
+            return {"message": message}, 400
 
         # 当前用户ID通过 JWT 获取
         user_id = get_jwt_identity()
 
         try:
-            spans, infos, res_path, mypath, channel_data = simulate_network(
-                user_id, network_id, source_uid, destination_uid,
-                plot=plot,
-                spectrum=spectrum,
-                power=power,
-                no_insert_edfas=no_insert_edfas
+            # 在此加载一次仿真上下文，随任务一起交给工作进程，工作进程无需再查询数据库
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                return {"message": "Network not found"}, 404
+            if fidelity:
+                if not supports_fidelity(context.network['simulation_config'], fidelity):
+                    return {"message": f"fidelity {fidelity} 需要 nli_params.method 为 ggn_spectrally_separated "
+                                       "或 ggn_approx，当前的 NLI 方法对全部通道计算 NLI"}, 400
+                # 精度档位改变仿真参数，结果缓存也按档位区分
+                context = context.with_fidelity(fidelity, params.get("spectrum"))
+            plot = data.get("plot", False)
+            incremental = bool(data.get("incremental", False))
+            # 相同网络内容和请求参数的结果直接从缓存返回，绘图请求需要实际执行仿真
+            result_key = None if plot else context.result_key('single-link', params)
+            if result_key:
+                with stage('result_cache'):
+                    result = SimulationResultDB.find(result_key)
+                RESULT_CACHE.inc(outcome='miss' if result is None else 'hit')
+                if result is not None:
+                    return result, 200
+            # 工作进程在执行任务前设置网络的仿真参数，SimParams 不会被其他请求覆盖
+            result = simulation_executor.run(
+                context.build_sim_params(), run_single_link, user_id, network_id,
+                plot=plot, context=context, incremental=incremental, **params
             )
-            
-            full_path_info = []
-            for elem in mypath:
-                element_id = elem.uid
-                element_name = NetworkDB.find_element_name_by_id(network_id, element_id)
-                replaced_str = str(elem).replace(elem.uid, element_name or elem.uid)
-                
-                # 解析字符串为字典
-                element_dict = {}
-                lines = replaced_str.split('\n')
-                
-                if lines:
-                    # 处理第一行元素描述
-                    element_dict["element"] = lines[0].strip()
-                    
-                    # 处理后续属性行
-                    for line in lines[1:]:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # 分割键值对
-                        if ':' in line:
-                            key, value = line.split(':', 1)
-                            key = key.strip()
-                            value = value.strip()
-                            
-                            # 尝试转换为数值类型
-                            try:
-                                value = float(value) if '.' in value else int(value)
-                            except ValueError:
-                                pass  # 保持字符串类型
-                            
-                            element_dict[key] = value
-                
-                full_path_info.append(element_dict)
-            
-            result = {
-                'Source': source_uid,
-                'Destination': destination_uid,
-                'number of channels': infos.number_of_channels,
-                'number of fiber': len(spans),
-                'length of fiber (km)': sum(spans) / 1000,
-                'Mean GSNR (0.1nm, dB)': convert_to_spectrum_array(
-                    per_label_average(mypath[-1].snr_01nm, mypath[-1].propagated_labels),
-                    'mean_GSNR_0_1nm'
-                ),
-                'Mean GSNR (signal bw, dB)': convert_to_spectrum_array(
-                    per_label_average(mypath[-1].snr, mypath[-1].propagated_labels),
-                    'mean_GSNR_signal_bw'
-                ),
-                'Mean OSNR ASE (0.1nm, dB)': convert_to_spectrum_array(
-                    per_label_average(mypath[-1].osnr_ase_01nm, mypath[-1].propagated_labels),
-                    'mean_OSNR_ASE_0_1nm'
-                ),
-                'Mean OSNR ASE (signal bw, dB)': convert_to_spectrum_array(
-                    per_label_average(mypath[-1].osnr_ase, mypath[-1].propagated_labels),
-                    'mean_OSNR_ASE_signal_bw'
-                ),
-                'Total CD (ps/nm)': mean(mypath[-1].chromatic_dispersion),
-                'Total PMD (ps)': mean(mypath[-1].pmd),
-                'Total PDL (dB)': mean(mypath[-1].pdl),
-                'Total Latency (ms)': mean(mypath[-1].latency),
-                'Total Actual pch out (dBm)': per_label_average(watt2dbm(mypath[-1].tx_power), mypath[-1].propagated_labels),
-                'path': res_path,
-                'full_path_info': full_path_info,  # 使用新的 full_path_info
-                'full_channel_info': channel_data,
-            }
+            if fidelity and fidelity != FIDELITY_EXACT:
+                result['fidelity'] = fidelity_report(context, user_id, network_id, params, result)
+            if result_key:
+                SimulationResultDB.save(result_key, network_id, to_builtin(result))
             return result, 200
         except Exception as e:
-            return {"message": "仿真失败: " + str(e)}, 500 
\ No newline at end of file
+            return {"message": "仿真失败: " + str(e)}, 500
+
+
+class SingleLinkStreamResource(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        流式单链路仿真接口：沿路径每传播一个元素就返回一个 element 事件
+        （uid、name、type、累计 GSNR gsnr_db、平均信道功率 power_dbm），最后返回 summary 事件，
+        其 result 与单链路仿真接口的返回相同；仿真失败时返回 error 事件。
+        JSON 参数与单链路仿真接口相同（不支持 plot）。
+        Accept 为 text/event-stream 时以 SSE 格式返回，否则以 NDJSON（每行一个事件）返回。
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+
+        network_id, params, message = parse_single_link_request(data)
+        if message:
+            return {"message": message}, 400
+
+        user_id = get_jwt_identity()
+        try:
+            context = SimulationContext.load(user_id, network_id)
+        except Exception as e:
+            return {"message": "仿真失败: " + str(e)}, 500
+        if context is None:
+            return {"message": "Network not found"}, 404
+
+        events = simulation_executor.stream(context.build_sim_params(), stream_single_link, context, **params)
+        if request.accept_mimetypes.best_match(['application/x-ndjson', 'text/event-stream']) == 'text/event-stream':
+            body = (f"event: {event['event']}\ndata: {json.dumps(event)}\n\n" for event in events)
+            return Response(body, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+        return Response((json.dumps(event) + '\n' for event in events), mimetype='application/x-ndjson')
+
+
+class BatchSimulationResource(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        批量单链路仿真接口：设备加载、网络构建和设计只执行一次，各收发器对的传播分发到多个工作进程。
+        需要传递的 JSON 参数：
+            - network_id: 网络ID
+            - pairs: 收发器对列表，每项包含 source_uid 和 destination_uid
+            - spectrum、power、no_insert_edfas、format (可选): 与单链路仿真接口相同
+        返回的 results 与 pairs 顺序一致，每项的格式与单链路仿真接口的返回相同。
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+        if not data or not data.get("network_id"):
+            return {"message": "必须提供 network_id 参数"}, 400
+
+        pairs, message = parse_pairs(data.get("pairs"))
+        if message:
+            return {"message": message}, 400
+        channel_format, message = parse_channel_format(data)
+        if message:
+            return {"message": message}, 400
+
+        network_id = data["network_id"]
+        user_id = get_jwt_identity()
+
+        try:
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                return {"message": "Network not found"}, 404
+            sim_params = context.build_sim_params()
+            design = simulation_executor.run(
+                sim_params, prepare_design, context,
+                spectrum=data.get("spectrum", None),
+                power=data.get("power", 0),
+                no_insert_edfas=data.get("no_insert_edfas", False)
+            )
+            results = simulation_executor.map_chunks(sim_params, run_pairs, pairs,
+                                                     context.element_names, design, channel_format)
+            return {"network_id": network_id, "results": results}, 200
+        except Exception as e:
+            return {"message": "仿真失败: " + str(e)}, 500
+
+
+class PowerSweepSimulationResource(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        单链路功率扫描接口：网络设计一次后，与 GNPY 的功率扫描相同，在每个跨段输入光功率下重新设计路径并计算传播。
+        需要传递的 JSON 参数：
+            - network_id、source_uid、destination_uid: 与单链路仿真接口相同
+            - sweep: 扫描范围 {"start": -2, "stop": 3, "step": 0.5} (dBm)
+            - parallel (可选): 是否将功率点分发到多个工作进程并行计算，结果与顺序计算相同，默认为 False
+            - spectrum、power、no_insert_edfas (可选): 与单链路仿真接口相同，power 为设计参考功率
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+
+        network_id, params, message = parse_single_link_request(data)
+        if message:
+            return {"message": message}, 400
+        powers_dbm, message = parse_sweep(data.get("sweep"))
+        if message:
+            return {"message": message}, 400
+
+        user_id = get_jwt_identity()
+
+        try:
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                return {"message": "Network not found"}, 404
+            sim_params = context.build_sim_params()
+            design = simulation_executor.run(
+                sim_params, prepare_design, context,
+                spectrum=params["spectrum"],
+                power=params["power"],
+                no_insert_edfas=params["no_insert_edfas"]
+            )
+            sweep_args = (design, params["source_uid"], params["destination_uid"])
+            if data.get("parallel", False):
+                # 按功率点序号分块，每块仍按整个扫描范围依次重新设计，结果与顺序扫描相同
+                points = simulation_executor.map_chunks(sim_params, run_power_sweep, list(range(len(powers_dbm))),
+                                                        *sweep_args, powers_dbm)
+            else:
+                points = simulation_executor.run(sim_params, run_power_sweep, *sweep_args, powers_dbm)
+            return build_sweep_result(params["source_uid"], params["destination_uid"], points), 200
+        except Exception as e:
+            return {"message": "仿真失败: " + str(e)}, 500
+
+
+class SingleLinkEstimateResource(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        单链路 GSNR 估算接口：将路径上各段预先计算的 ASE 和 NLI 噪声贡献相加，不执行逐元素传播。
+        每个网络 revision 的各段只在首次用到时传播一次，之后的查询在毫秒级返回。
+        需要传递的 JSON 参数：
+            - network_id、source_uid、destination_uid、spectrum、power、no_insert_edfas: 与单链路仿真接口相同
+            - calibrate (可选): 是否同时执行完整仿真并返回估算误差 calibration_error，默认为 False
+        返回路径、平均 GSNR、各通道的 GSNR (0.1 nm)；该设计已校准过时还返回各次校准观测到的最大误差
+        max observed error，它只反映已校准的收发器对。功率模式且 ROADM 均衡的网络中，估算的各通道 GSNR 与完整仿真之差
+        不超过 0.5 dB（estimate.ESTIMATE_TOLERANCE_DB）；估算的适用范围和误差来源见 simulation/estimate.py。
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+
+        network_id, params, message = parse_single_link_request(data)
+        if message:
+            return {"message": message}, 400
+        # 估算结果只包含各通道的 GSNR，不区分通道格式
+        params.pop("channel_format")
+
+        user_id = get_jwt_identity()
+        try:
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                return {"message": "Network not found"}, 404
+            result = simulation_executor.run(
+                context.build_sim_params(), run_estimate, user_id, network_id,
+                context=context, calibrate_error=bool(data.get("calibrate", False)), **params
+            )
+            return result, 200
+        except Exception as e:
+            return {"message": "估算失败: " + str(e)}, 500
+
+
+class PlanningResource(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        业务规划接口：规划网络中保存的业务（services），网络只设计一次，
+        所有业务依次完成路由（含分离约束）、传播与模式选择和频谱分配。
+        需要传递的 JSON 参数：
+            - network_id: 网络ID
+            - request_ids (可选): 只规划这些业务，默认规划全部业务
+            - synchronization (可选): GNPY 格式的分离约束列表
+            - power、no_insert_edfas (可选): 与单链路仿真接口相同
+        返回每条业务的可行性 feasible、阻塞原因 blocking_reason、所用模式 mode、GSNR 余量及分配的频谱，
+        以及汇总统计。业务较多时可使用 kind 为 planning 的异步任务。
+        业务未指定 trx_type 且源收发器没有型号时返回 400。
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+
+        network_id, params, message = parse_planning_request(data)
+        if message:
+            return {"message": message}, 400
+
+        user_id = get_jwt_identity()
+        try:
+            context = SimulationContext.load(user_id, network_id)
+            if context is None:
+                return {"message": "Network not found"}, 404
+            message = unplannable_service(context.network['elements'],
+                                          select_services(context.network.get('services', []), params['request_ids']))
+            if message:
+                return {"message": message}, 400
+            result = simulation_executor.run(
+                context.build_sim_params(), run_planning, user_id, network_id, context=context, **params
+            )
+            return {"network_id": network_id, **result}, 200
+        except Exception as e:
+            return {"message": "规划失败: " + str(e)}, 500
+
+
+class SimulationJobList(Resource):
+    @jwt_required()
+    def post(self):
+        """
+        异步仿真接口：立即返回任务ID，仿真在后台工作进程中执行。
+        JSON 参数：
+            - kind (可选): 任务类型，默认为 single-link
+              - single-link: 单链路仿真，其余参数与单链路仿真接口相同（不支持 plot）
+              - all-pairs: 全网收发器对分析，计算每对收发器之间的 GSNR、OSNR 和时延矩阵及汇总统计，
+                需要 network_id，spectrum、power、no_insert_edfas 可选
+              - planning: 业务规划，参数与业务规划接口相同
+        """
+        try:
+            data = request.get_json()
+        except Exception as e:
+            return {"message": "请求体解析失败: " + str(e)}, 400
+
+        kind = (data or {}).get("kind", "single-link")
+        if kind == "single-link":
+            network_id, params, message = parse_single_link_request(data)
+            if message:
+                return {"message": message}, 400
+        elif kind == "all-pairs":
+            network_id = data.get("network_id")
+            if not network_id:
+                return {"message": "必须提供 network_id 参数"}, 400
+            params = {
+                "spectrum": data.get("spectrum", None),
+                "power": data.get("power", 0),
+                "no_insert_edfas": data.get("no_insert_edfas", False)
+            }
+        elif kind == "planning":
+            network_id, params, message = parse_planning_request(data)
+            if message:
+                return {"message": message}, 400
+        else:
+            return {"message": "kind 必须是 single-link、all-pairs 或 planning"}, 400
+        if not ObjectId.is_valid(network_id):
+            return {"message": "Invalid network ID format."}, 400
+
+        user_id = get_jwt_identity()
+        network = NetworkDB.find_by_network_id(user_id, network_id)
+        if not network:
+            return {"message": "Network not found"}, 404
+        if kind == "planning":
+            message = unplannable_service(network['elements'],
+                                          select_services(network.get('services', []), params['request_ids']))
+            if message:
+                return {"message": message}, 400
+
+        job_id = str(SimulationJobDB.create(user_id, network_id, kind, params).inserted_id)
+        if kind == "all-pairs":
+            submit_all_pairs_job(job_id, user_id, network_id, params)
+        else:
+            submit_job(job_id, network['simulation_config'])
+        return {"job_id": job_id, "status": "pending"}, 202
+
+
+class SimulationJobResource(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """查询异步仿真任务的状态"""
+        if not ObjectId.is_valid(job_id):
+            return {"message": "Invalid job ID format."}, 400
+
+        job = SimulationJobDB.find_by_id(get_jwt_identity(), job_id)
+        if not job:
+            return {"message": "Job not found"}, 404
+        return format_job(job), 200
+
+
+class SimulationJobResult(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """获取异步仿真任务的结果，任务未完成时返回 202"""
+        if not ObjectId.is_valid(job_id):
+            return {"message": "Invalid job ID format."}, 400
+
+        job = SimulationJobDB.find_by_id(get_jwt_identity(), job_id, include_result=True)
+        if not job:
+            return {"message": "Job not found"}, 404
+        if job['status'] == 'finished':
+            return job['result'], 200
+        if job['status'] == 'failed':
+            return {"message": "仿真失败: " + str(job['error'])}, 500
+        return format_job(job), 202
@@ -0,0 +1,290 @@
+# coding: utf-8
+"""
+频谱占用索引。
+
+每个网络保存一份索引：网络中的每个光复用段（OMS，从一个 ROADM 经过线路元素到达下一个 ROADM）
+对应一行 6.25 GHz 频隙的占用位图，业务分配和释放时只修改所经 OMS 的对应频隙，不需要从全部业务重新计算占用。
+沿路径查找可用频谱时，将路径上各 OMS 的位图合并（任一 OMS 占用即不可用），
+再以滑动窗口找出连续的空闲频隙，支持首次适应（first-fit）和最佳适应（best-fit）。
+
+频隙编号与 GNPY 的频谱分配相同：N 为中心频率在 6.25 GHz 栅格上相对 193.1 THz 的索引，
+宽度为 M × 12.5 GHz 的业务占用 [N - M, N + M - 1] 共 2M 个频隙。
+
+OMS 和路径取自设计后的网络（见 SpectrumTopology），网络 revision 变化后索引按新的拓扑重建，
+已有分配的路径仍然存在时保留，否则丢弃。不经过任何 OMS 的路径（如收发器之间没有 ROADM）没有可管理的频谱，不能分配。
+"""
+import math
+
+import numpy as np
+from bson import Binary
+
+# Project imports
+from src.optinetsim_backend.app.database.models import SpectrumOccupancyDB
+
+SLOT_WIDTH = 6.25e9
+# N = 0 对应的中心频率
+GRID_ANCHOR = 193.1e12
+
+FIRST_FIT = 'first-fit'
+BEST_FIT = 'best-fit'
+POLICIES = (FIRST_FIT, BEST_FIT)
+
+# 索引被其他请求同时修改时的重试次数
+_SAVE_ATTEMPTS = 3
+
+
+class SpectrumError(Exception):
+    """频谱分配请求无效或无法完成时抛出，消息可直接返回给调用方"""
+
+
+class SpectrumTopology:
+    """
+    设计后网络的 OMS 分解及收发器之间的路径。
+
+    由设计结果的路径索引（core.PathIndex）构造，OMS 和路径与 GNPY 传播所用的网络一致，
+    包括网络设计时自动补全的放大器和切分的光纤。
+
+    :param index: 设计后网络的 PathIndex
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.oms = [tuple(segment) for segment in index.oms]
+
+    def paths(self, source_uid, destination_uid, k=1):
+        """两个收发器之间按长度递增的至多 k 条路径"""
+        for uid in (source_uid, destination_uid):
+            if uid not in self.index.transceivers:
+                raise SpectrumError(f'网络中未找到收发器 {uid}')
+        return self.index.k_shortest_paths(source_uid, destination_uid, k)
+
+    def path_oms(self, path):
+        """路径依次经过的 OMS 的键（OMS 的 uid 序列），路径上的边不存在时返回 None"""
+        if not self.index.has_path(path):
+            return None
+        return [self.oms[index] for index in self.index.path_oms(path)]
+
+
+def slot_range(network_SI):
+    """网络 SI 覆盖的频隙范围 (n_min, 频隙数)，包括首尾通道两侧各半个通道间隔"""
+    half_spacing = network_SI['spacing'] / 2
+    n_min = math.floor((network_SI['f_min'] - half_spacing - GRID_ANCHOR) / SLOT_WIDTH)
+    n_max = math.ceil((network_SI['f_max'] + half_spacing - GRID_ANCHOR) / SLOT_WIDTH) - 1
+    return n_min, n_max - n_min + 1
+
+
+class SpectrumIndex:
+    """
+    一个网络在某个 revision 下的频谱占用。
+
+    :param oms: OMS 键列表，与 occupied 的行一一对应
+    :param n_min: 第 0 列频隙的索引 N
+    :param occupied: 布尔矩阵，行为 OMS，列为频隙，True 表示已占用
+    :param allocations: service_id 到分配信息 {path, N, M} 的映射
+    :param version: 读取时存储的 version，为空表示数据库中还没有索引
+    """
+
+    def __init__(self, revision, oms, n_min, occupied, allocations=None, version=None):
+        self.revision = revision
+        self.oms = list(oms)
+        self.rows = {key: row for row, key in enumerate(self.oms)}
+        self.n_min = n_min
+        self.occupied = occupied
+        self.allocations = dict(allocations or {})
+        self.version = version
+        # 重建时路径已不存在而被丢弃的分配
+        self.dropped = []
+
+    @property
+    def slots(self):
+        return self.occupied.shape[1]
+
+    @classmethod
+    def empty(cls, network, topology):
+        n_min, slots = slot_range(network['SI'])
+        return cls(network.get('revision', 0), topology.oms, n_min, np.zeros((len(topology.oms), slots), dtype=bool))
+
+    @classmethod
+    def from_document(cls, document):
+        rows, slots = len(document['oms']), document['slots']
+        packed = np.frombuffer(document['bitmap'], dtype=np.uint8).reshape(rows, -1)
+        occupied = np.unpackbits(packed, axis=1, count=slots).astype(bool)
+        return cls(document['revision'], [tuple(key) for key in document['oms']], document['n_min'], occupied,
+                   document['allocations'], document['version'])
+
+    def to_document(self):
+        return {
+            'revision': self.revision,
+            'oms': [list(key) for key in self.oms],
+            'n_min': self.n_min,
+            'slots': self.slots,
+            # 每个 OMS 一行，按位压缩
+            'bitmap': Binary(np.packbits(self.occupied, axis=1).tobytes()),
+            'allocations': self.allocations,
+        }
+
+    def _columns(self, n_value, m_value):
+        start = n_value - m_value - self.n_min
+        return start, start + 2 * m_value
+
+    def free_slots(self, oms_keys):
+        """路径上所有 OMS 都空闲的频隙"""
+        rows = [self.rows[key] for key in oms_keys]
+        return ~self.occupied[rows].any(axis=0)
+
+    def find_slot(self, oms_keys, m_value, policy=FIRST_FIT):
+        """
+        沿路径查找 2M 个连续的空闲频隙。
+
+        :param oms_keys: 路径经过的 OMS
+        :param m_value: 业务宽度（12.5 GHz 的倍数）
+        :param policy: first-fit 取频率最低的位置，best-fit 取能容纳业务的最短空闲区间的起点
+        :return: 中心频隙索引 N，没有可用频谱时返回 None
+        """
+        width = 2 * m_value
+        free = self.free_slots(oms_keys)
+        if width > free.size:
+            return None
+        if policy == FIRST_FIT:
+            # 滑动窗口内空闲频隙数等于窗口宽度的位置即可放置
+            counts = np.concatenate(([0], np.cumsum(free, dtype=np.int32)))
+            starts = np.flatnonzero(counts[width:] - counts[:-width] == width)
+            return int(starts[0]) + self.n_min + m_value if starts.size else None
+        # 各段连续空闲区间的起止位置
+        edges = np.diff(np.concatenate(([0], free.astype(np.int8), [0])))
+        run_starts, run_ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        lengths = run_ends - run_starts
+        fits = np.flatnonzero(lengths >= width)
+        if not fits.size:
+            return None
+        best = fits[np.argmin(lengths[fits])]
+        return int(run_starts[best]) + self.n_min + m_value
+
+    def assign(self, service_id, path, oms_keys, n_value, m_value):
+        start, stop = self._columns(n_value, m_value)
+        rows = [self.rows[key] for key in oms_keys]
+        if start < 0 or stop > self.slots:
+            raise SpectrumError('频谱超出网络的频率范围')
+        if self.occupied[rows, start:stop].any():
+            raise SpectrumError('频谱已被占用')
+        self.occupied[np.ix_(rows, np.arange(start, stop))] = True
+        self.allocations[service_id] = {'path': list(path), 'N': int(n_value), 'M': int(m_value)}
+
+    def release(self, service_id, topology):
+        allocation = self.allocations.pop(service_id, None)
+        if allocation is None:
+            return None
+        start, stop = self._columns(allocation['N'], allocation['M'])
+        rows = [self.rows[key] for key in topology.path_oms(allocation['path']) or [] if key in self.rows]
+        self.occupied[np.ix_(rows, np.arange(start, stop))] = False
+        return allocation
+
+    def rebuild(self, network, topology):
+        """网络修改后按新的拓扑重建索引，重新应用路径仍然存在的分配"""
+        rebuilt = SpectrumIndex.empty(network, topology)
+        rebuilt.version = self.version
+        for service_id, allocation in self.allocations.items():
+            oms_keys = topology.path_oms(allocation['path'])
+            try:
+                if oms_keys is None:
+                    raise SpectrumError('路径已不存在')
+                rebuilt.assign(service_id, allocation['path'], oms_keys, allocation['N'], allocation['M'])
+            except SpectrumError as e:
+                rebuilt.dropped.append(dict(allocation, service_id=service_id, reason=str(e)))
+        return rebuilt
+
+    def summary(self):
+        used = self.occupied.sum(axis=1)
+        return {
+            'revision': self.revision,
+            'n_min': self.n_min,
+            'slots': self.slots,
+            'oms': [{'from': key[0], 'to': key[-1], 'elements': list(key), 'used_slots': int(count),
+                     'utilization': round(float(count) / self.slots, 4) if self.slots else 0.0}
+                    for key, count in zip(self.oms, used)],
+            'allocations': [dict(allocation, service_id=service_id)
+                            for service_id, allocation in self.allocations.items()],
+            'dropped': self.dropped,
+        }
+
+
+def load_index(network, topology):
+    """读取网络的频谱占用索引，不存在时返回空索引，网络 revision 变化时按新的拓扑重建"""
+    document = SpectrumOccupancyDB.find(network['_id'])
+    if document is None:
+        return SpectrumIndex.empty(network, topology)
+    index = SpectrumIndex.from_document(document)
+    n_min, slots = slot_range(network['SI'])
+    if index.revision != network.get('revision', 0) or (index.n_min, index.slots) != (n_min, slots):
+        index = index.rebuild(network, topology)
+    return index
+
+
+def width_to_m(width_ghz):
+    """业务带宽 (GHz) 换算为 M（12.5 GHz 的倍数，向上取整）"""
+    return max(1, math.ceil(width_ghz / 12.5 - 1e-9))
+
+
+def allocate(load_network, build_topology, service_id, source_uid, destination_uid, m_value, policy=FIRST_FIT,
+             k=1):
+    """
+    为业务分配路径和频谱，并写回索引。
+
+    依次尝试两个收发器之间的 k 条最短路径，在第一条有可用频谱的路径上分配，不经过任何 OMS 的路径不参与分配。
+
+    :param load_network: 读取最新网络文档的函数，索引被并发修改而写入失败时重新读取后重试
+    :param build_topology: 由网络文档构造 SpectrumTopology 的函数
+    :return: 分配结果；没有可用频谱时返回 None
+    """
+    for _ in range(_SAVE_ATTEMPTS):
+        network = load_network()
+        topology = build_topology(network)
+        index = load_index(network, topology)
+        if service_id in index.allocations:
+            raise SpectrumError(f'业务 {service_id} 已分配频谱')
+        paths = topology.paths(source_uid, destination_uid, k)
+        candidates = [(path, topology.path_oms(path)) for path in paths]
+        candidates = [(path, oms_keys) for path, oms_keys in candidates if oms_keys]
+        if paths and not candidates:
+            raise SpectrumError('收发器之间的路径不经过任何 OMS，没有可分配的频谱')
+        for path, oms_keys in candidates:
+            n_value = index.find_slot(oms_keys, m_value, policy)
+            if n_value is not None:
+                index.assign(service_id, path, oms_keys, n_value, m_value)
+                break
+        else:
+            return None
+        if SpectrumOccupancyDB.save(network['_id'], index.to_document(), index.version):
+            result = allocation_result(service_id, index.allocations[service_id], len(oms_keys))
+            if index.dropped:
+                result['dropped'] = index.dropped
+            return result
+    raise SpectrumError('频谱占用索引被同时修改，请重试')
+
+
+def release(load_network, build_topology, service_id):
+    """释放业务占用的频谱，业务未分配时返回 None"""
+    for _ in range(_SAVE_ATTEMPTS):
+        network = load_network()
+        topology = build_topology(network)
+        index = load_index(network, topology)
+        allocation = index.release(service_id, topology)
+        if allocation is None:
+            return None
+        if SpectrumOccupancyDB.save(network['_id'], index.to_document(), index.version):
+            return allocation_result(service_id, allocation)
+    raise SpectrumError('频谱占用索引被同时修改，请重试')
+
+
+def allocation_result(service_id, allocation, oms_count=None):
+    result = {
+        'service_id': service_id,
+        'path': allocation['path'],
+        'N': allocation['N'],
+        'M': allocation['M'],
+        'center_frequency (THz)': (GRID_ANCHOR + allocation['N'] * SLOT_WIDTH) / 1e12,
+        'width (GHz)': allocation['M'] * 12.5,
+    }
+    if oms_count is not None:
+        result['oms'] = oms_count
+    return result
@@ -0,0 +1,132 @@
+# coding: utf-8
+from flask import request
+from flask_restful import Resource
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from bson import ObjectId
+
+# Project imports
+from src.optinetsim_backend.app.database.models import NetworkDB
+from src.optinetsim_backend.app.simulation.core import SimulationError
+from src.optinetsim_backend.app.simulation.executor import simulation_executor
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.spectrum import (
+    FIRST_FIT,
+    POLICIES,
+    SpectrumError,
+    allocate,
+    load_index,
+    release,
+    width_to_m
+)
+from src.optinetsim_backend.app.simulation.tasks import spectrum_topology
+
+# 单次分配最多尝试的候选路径数
+MAX_CANDIDATE_PATHS = 10
+
+
+def _network_loader(user_id, network_id):
+    def load():
+        network = NetworkDB.find_by_network_id(user_id, network_id)
+        if not network:
+            raise LookupError('Network not found')
+        return network
+    return load
+
+
+def _build_topology(network):
+    # OMS 取自设计后的网络，设计在仿真工作进程中执行，并随设计缓存复用
+    context = SimulationContext.from_network(network)
+    return simulation_executor.run(context.build_sim_params(), spectrum_topology, context)
+
+
+def _valid_service_id(service_id):
+    # service_id 作为 MongoDB 文档的键保存
+    return isinstance(service_id, str) and service_id and '.' not in service_id and not service_id.startswith('$')
+
+
+class SpectrumOccupancyResource(Resource):
+    @jwt_required()
+    def get(self, network_id):
+        """查询网络的频谱占用：每个 OMS 已占用的 6.25 GHz 频隙数和利用率，以及已分配的业务"""
+        if not ObjectId.is_valid(network_id):
+            return {"message": "Invalid network ID format."}, 400
+        network = NetworkDB.find_by_network_id(get_jwt_identity(), network_id)
+        if not network:
+            return {"message": "Network not found"}, 404
+        try:
+            return load_index(network, _build_topology(network)).summary(), 200
+        except SimulationError as e:
+            return {"message": str(e)}, 400
+        except Exception as e:
+            return {"message": "频谱占用查询失败: " + str(e)}, 500
+
+
+class SpectrumAllocationList(Resource):
+    @jwt_required()
+    def post(self, network_id):
+        """
+        为业务分配路径和频谱。
+        需要传递的 JSON 参数：
+            - service_id: 业务ID
+            - source_uid: 源收发器的 uid
+            - destination_uid: 目标收发器的 uid
+            - width (可选): 业务占用的带宽 (GHz)，按 12.5 GHz 向上取整，默认为网络 SI 的通道间隔
+            - policy (可选): first-fit（默认）或 best-fit
+            - k (可选): 依次尝试的最短路径数，默认为 1
+        没有可用频谱时返回 409。
+        """
+        if not ObjectId.is_valid(network_id):
+            return {"message": "Invalid network ID format."}, 400
+        data = request.get_json(silent=True)
+        if not data:
+            return {"message": "请求体不能为空"}, 400
+        service_id = data.get("service_id")
+        source_uid, destination_uid = data.get("source_uid"), data.get("destination_uid")
+        if not _valid_service_id(service_id):
+            return {"message": "service_id 必须是不含 . 且不以 $ 开头的字符串"}, 400
+        if not source_uid or not destination_uid:
+            return {"message": "必须提供 source_uid 和 destination_uid 参数"}, 400
+        policy = data.get("policy", FIRST_FIT)
+        if policy not in POLICIES:
+            return {"message": "policy 必须是 " + " 或 ".join(POLICIES)}, 400
+        k = data.get("k", 1)
+        if not isinstance(k, int) or not 1 <= k <= MAX_CANDIDATE_PATHS:
+            return {"message": f"k 必须是 1 到 {MAX_CANDIDATE_PATHS} 之间的整数"}, 400
+        width = data.get("width")
+        if width is not None and (not isinstance(width, (int, float)) or width <= 0):
+            return {"message": "width 必须是正数"}, 400
+
+        load_network = _network_loader(get_jwt_identity(), network_id)
+        try:
+            if width is None:
+                width = load_network()['SI']['spacing'] / 1e9
+            result = allocate(load_network, _build_topology, service_id, source_uid, destination_uid,
+                              width_to_m(width), policy, k)
+        except LookupError as e:
+            return {"message": str(e)}, 404
+        except (SpectrumError, SimulationError) as e:
+            return {"message": str(e)}, 400
+        except Exception as e:
+            return {"message": "频谱分配失败: " + str(e)}, 500
+        if result is None:
+            return {"message": "没有可用的频谱"}, 409
+        return result, 201
+
+
+class SpectrumAllocationResource(Resource):
+    @jwt_required()
+    def delete(self, network_id, service_id):
+        """释放业务占用的频谱"""
+        if not ObjectId.is_valid(network_id):
+            return {"message": "Invalid network ID format."}, 400
+        try:
+            result = release(_network_loader(get_jwt_identity(), network_id), _build_topology, service_id)
+        except LookupError as e:
+            return {"message": str(e)}, 404
+        except (SpectrumError, SimulationError) as e:
+            return {"message": str(e)}, 400
+        except Exception as e:
+            return {"message": "频谱释放失败: " + str(e)}, 500
+        if result is None:
+            return {"message": "Allocation not found"}, 404
+        return result, 200
@@ -0,0 +1,239 @@
+# coding: utf-8
+"""
+在仿真工作进程中执行的任务。
+
+任务函数需可被 pickle，因此都定义在模块顶层，参数与返回值只使用可序列化的数据。
+"""
+import pickle
+
+from src.optinetsim_backend.app.simulation.core import (
+    SimulationError,
+    apply_sim_params,
+    gnpy_errors,
+    get_designed_network,
+    propagate_pair,
+    simulate_network,
+    sweep_pair
+)
+from src.optinetsim_backend.app.simulation.estimate import calibrate, estimate_pair, noise_table
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.planning import plan_services, select_services
+from src.optinetsim_backend.app.simulation.propagation import propagate_stepwise, simulate_incremental
+from src.optinetsim_backend.app.simulation.spectrum import SpectrumTopology
+from src.optinetsim_backend.app.simulation.results import (
+    build_single_link_result,
+    pair_metrics,
+    sweep_point,
+    to_builtin
+)
+from src.optinetsim_backend.app.database.models import SimulationJobDB
+from src.optinetsim_backend.app.metrics import stage
+from src.optinetsim_backend.app.log import log_context
+
+
+def run_single_link(user_id, network_id, source_uid, destination_uid, plot=False, spectrum=None, power=0,
+                    no_insert_edfas=False, context=None, channel_format='rows', incremental=False):
+    """
+    执行单链路仿真并返回接口所需的结果字典，context 为调用方已加载的仿真上下文。
+
+    incremental 为 True 时从上次传播的快照中恢复未变化的部分，见 propagation.simulate_incremental（不支持 plot）。
+    """
+    with log_context(network_id=network_id):
+        if context is None:
+            context = SimulationContext.load(user_id, network_id)
+        if context is None:
+            raise SimulationError('未找到网络')
+        if incremental and not plot:
+            spans, infos, res_path, mypath, channel_data = simulate_incremental(
+                context, source_uid, destination_uid,
+                spectrum=spectrum,
+                power=power,
+                no_insert_edfas=no_insert_edfas,
+                channel_format=channel_format
+            )
+        else:
+            spans, infos, res_path, mypath, channel_data = simulate_network(
+                user_id, network_id, source_uid, destination_uid,
+                plot=plot,
+                spectrum=spectrum,
+                power=power,
+                no_insert_edfas=no_insert_edfas,
+                context=context,
+                channel_format=channel_format
+            )
+        with stage('results'):
+            return build_single_link_result(context.element_names, source_uid, destination_uid,
+                                            spans, infos, res_path, mypath, channel_data)
+
+
+def run_estimate(user_id, network_id, source_uid, destination_uid, spectrum=None, power=0, no_insert_edfas=False,
+                 context=None, calibrate_error=False):
+    """
+    估算单链路的 GSNR，见 estimate 模块。
+
+    :param calibrate_error: 为 True 时再执行一次完整仿真，结果中增加 calibration_error (dB)
+    """
+    with log_context(network_id=network_id):
+        if context is None:
+            context = SimulationContext.load(user_id, network_id)
+        if context is None:
+            raise SimulationError('未找到网络')
+        apply_sim_params(context.build_sim_params())
+        with gnpy_errors():
+            design = get_designed_network(context, spectrum=spectrum, power=power, no_insert_edfas=no_insert_edfas)
+        result = estimate_pair(design, source_uid, destination_uid)
+        if calibrate_error:
+            # 估算不修改网络元素，同一副本可直接用于完整仿真
+            _, _, _, mypath, _ = propagate_pair(design, source_uid, destination_uid)
+            result['calibration_error (dB)'] = calibrate(result, mypath[-1], noise_table(design))
+            result['max observed error (dB)'] = noise_table(design).max_observed_error
+        return result
+
+
+def prepare_design(context, spectrum=None, power=0, no_insert_edfas=False):
+    """
+    设计网络并返回 pickle 后的 DesignedNetwork。
+
+    批量仿真只设计一次，序列化结果分发给各工作进程，反序列化得到的就是可独立传播的副本。
+    """
+    with gnpy_errors():
+        design = get_designed_network(context, spectrum=spectrum, power=power, no_insert_edfas=no_insert_edfas)
+    return pickle.dumps(design, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def run_pairs(element_names, design_payload, channel_format, pairs):
+    """
+    在同一份设计上依次计算多对收发器的传播。
+
+    :param element_names: element_id 到元素名称的映射
+    :param design_payload: prepare_design 返回的序列化设计
+    :param channel_format: 通道结果格式，见 propagate_pair
+    :param pairs: [(source_uid, destination_uid), ...]
+    :return: 与 pairs 顺序一致的结果列表，失败的收发器对返回错误信息
+    """
+    design = pickle.loads(design_payload)
+    with log_context(network_id=design.network_id):
+        return _run_pairs(design, element_names, channel_format, pairs)
+
+
+def _run_pairs(design, element_names, channel_format, pairs):
+    results = []
+    for source_uid, destination_uid in pairs:
+        try:
+            spans, infos, res_path, mypath, channel_data = propagate_pair(
+                design.for_pair(), source_uid, destination_uid, channel_format=channel_format)
+        except SimulationError as e:
+            results.append({'Source': source_uid, 'Destination': destination_uid, 'message': '仿真失败: ' + str(e)})
+            continue
+        with stage('results'):
+            results.append(build_single_link_result(element_names, source_uid, destination_uid,
+                                                    spans, infos, res_path, mypath, channel_data))
+    return results
+
+
+def run_power_sweep(design_payload, source_uid, destination_uid, powers_dbm, indices=None):
+    """
+    在同一份设计上进行功率扫描。
+
+    :param design_payload: prepare_design 返回的序列化设计
+    :param powers_dbm: 整个扫描的等间隔递增的功率列表 (dBm)
+    :param indices: 本次计算的功率点序号，分块并行扫描时使用，为空时计算全部功率点，见 core.sweep_pair
+    :return: 每个功率点的 sweep_point 结果列表
+    """
+    design = pickle.loads(design_payload)
+    with log_context(network_id=design.network_id):
+        return [sweep_point(power_dbm, transceiver)
+                for power_dbm, transceiver in sweep_pair(design, source_uid, destination_uid, powers_dbm, indices)]
+
+
+def run_source_rows(design_payload, transceivers, sources):
+    """
+    全网收发器对分析中的一组源收发器：在同一份设计上计算每个源到其余所有收发器的传播。
+
+    :param design_payload: prepare_design 返回的序列化设计
+    :param transceivers: 全部收发器 uid，每行的结果按此顺序排列
+    :param sources: 本组的源收发器 uid 列表
+    :return: 每个源一行，见 results.build_all_pairs_result
+    """
+    design = pickle.loads(design_payload)
+    rows = []
+    with log_context(network_id=design.network_id):
+        for source_uid in sources:
+            row = {'source': source_uid, 'metrics': [], 'errors': {}}
+            for destination_uid in transceivers:
+                if destination_uid == source_uid:
+                    row['metrics'].append(None)
+                    continue
+                try:
+                    _, _, _, mypath, _ = propagate_pair(design.for_pair(), source_uid, destination_uid)
+                except SimulationError as e:
+                    row['metrics'].append(None)
+                    row['errors'][destination_uid] = str(e)
+                    continue
+                row['metrics'].append(pair_metrics(mypath[-1]))
+            rows.append(row)
+    return rows
+
+
+def run_planning(user_id, network_id, request_ids=None, synchronization=None, power=0, no_insert_edfas=False,
+                 context=None):
+    """
+    规划网络文档中保存的业务，网络只设计一次（与其他仿真共用设计缓存）。
+
+    :param request_ids: 只规划这些业务，为空时规划全部业务
+    :param synchronization: GNPY 格式的分离约束列表
+    :return: planning.plan_services 的结果
+    """
+    with log_context(network_id=network_id):
+        if context is None:
+            context = SimulationContext.load(user_id, network_id)
+        if context is None:
+            raise SimulationError('未找到网络')
+        services = select_services(context.network.get('services', []), request_ids)
+        if not services:
+            raise SimulationError('网络中没有需要规划的业务')
+        with gnpy_errors():
+            design = get_designed_network(context, power=power, no_insert_edfas=no_insert_edfas)
+        return plan_services(design, context.network['SI'], services, synchronization)
+
+
+def spectrum_topology(context):
+    """设计网络并返回其 OMS 分解和路径，见 spectrum.SpectrumTopology"""
+    with log_context(network_id=context.network_id), gnpy_errors():
+        design = get_designed_network(context)
+    return SpectrumTopology(design.index)
+
+
+def stream_single_link(events, context, source_uid, destination_uid, spectrum=None, power=0,
+                       no_insert_edfas=False, channel_format='rows'):
+    """
+    逐元素执行单链路仿真，每产生一个事件就放入 events 队列，结束时放入 None。
+
+    :param events: 跨进程队列（multiprocessing.Manager().Queue()）
+    :param context: 调用方已加载的仿真上下文
+    """
+    try:
+        with log_context(network_id=context.network_id), gnpy_errors():
+            design = get_designed_network(context, spectrum=spectrum, power=power, no_insert_edfas=no_insert_edfas)
+        for event in propagate_stepwise(design, source_uid, destination_uid, context.element_names,
+                                        channel_format=channel_format):
+            events.put(to_builtin(event))
+    except Exception as e:
+        events.put({'event': 'error', 'message': '仿真失败: ' + str(e)})
+    finally:
+        events.put(None)
+
+
+def run_simulation_job(job_id):
+    """执行一个异步仿真任务，并将状态和结果写回 simulation_jobs 集合"""
+    job = SimulationJobDB.mark_running(job_id)
+    if job is None:
+        # 任务不存在或已被其他进程领取
+        return
+    task = run_planning if job['kind'] == 'planning' else run_single_link
+    try:
+        result = task(str(job['user_id']), str(job['network_id']), **job['params'])
+    except Exception as e:
+        SimulationJobDB.mark_failed(job_id, str(e))
+        return
+    SimulationJobDB.mark_finished(job_id, to_builtin(result))
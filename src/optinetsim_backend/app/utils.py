@@ -0,0 +1,8 @@
+import hashlib
+import json
+
+
+def stable_hash(obj):
+    """计算可 JSON 序列化对象的稳定哈希值，与字典键的顺序无关"""
+    payload = json.dumps(obj, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
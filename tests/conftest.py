@@ -0,0 +1,94 @@
+# coding: utf-8
+"""
+测试共用的夹具。
+
+数据库替换为 mongomock 内存数据库，仿真在调用线程中直接执行（SIMULATION_WORKERS=0），
+网络使用 benchmarks 中的合成拓扑和器件库，NLI 使用 gn_model_analytic 且通道数较少，以缩短仿真时间。
+"""
+import os
+
+os.environ.setdefault('SIMULATION_WORKERS', '0')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('JWT_SECRET_KEY', 'optinetsim-tests-jwt-secret-key-0000')
+
+import pytest
+from bson import ObjectId
+from flask_jwt_extended import create_access_token
+
+# Project imports
+from benchmarks.equipment import library_document, spectrum_information
+from benchmarks.topologies import TOPOLOGIES
+from src.optinetsim_backend.app import cache
+from src.optinetsim_backend.app.database import models
+
+CHANNELS = 8
+
+SIMULATION_CONFIG = {
+    "raman_params": {
+        "flag": False,
+        "result_spatial_resolution": 10e3,
+        "solver_spatial_resolution": 50
+    },
+    "nli_params": {
+        "method": "gn_model_analytic",
+        "dispersion_tolerance": 1,
+        "phase_shift_tolerance": 0.1
+    }
+}
+
+_CACHES = ('equipment_cache', 'design_cache', 'propagation_cache', 'segment_cache')
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """空的内存数据库，进程内缓存同时清空"""
+    mongomock = pytest.importorskip('mongomock')
+    database = mongomock.MongoClient().optinetsim
+    monkeypatch.setattr(models, 'db', database)
+    for name in _CACHES:
+        getattr(cache, name).invalidate()
+    return database
+
+
+@pytest.fixture
+def make_network(db):
+    """
+    在内存数据库中写入一个合成网络。
+
+    :return: 工厂函数 make(topology='linear', size=2, channels=CHANNELS, **kwargs)，
+             返回 (user_id, network_id, builder)
+    """
+    def make(topology='linear', size=2, channels=CHANNELS, **kwargs):
+        user_id = ObjectId()
+        library_id = db.equipment_libraries.insert_one(library_document(user_id)).inserted_id
+        builder = TOPOLOGIES[topology](user_id, library_id, size, **kwargs)
+        builder.document['SI'] = spectrum_information(channels)
+        builder.document['simulation_config'] = dict(SIMULATION_CONFIG)
+        network_id = str(db.networks.insert_one(builder.document).inserted_id)
+        return str(user_id), network_id, builder
+    return make
+
+
+@pytest.fixture
+def app(db):
+    from src.optinetsim_backend.app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture
+def api(app):
+    """
+    以指定用户身份调用接口的测试客户端。
+
+    :return: 函数 call(method, path, user_id, json=None)，返回 (状态码, JSON 响应)
+    """
+    client = app.test_client()
+
+    def call(method, path, user_id, json=None):
+        with app.app_context():
+            token = create_access_token(identity=user_id)
+        response = client.open(path, method=method, json=json, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code, response.get_json()
+    return call
@@ -0,0 +1,40 @@
+# coding: utf-8
+"""测试共用的比较和基准函数"""
+import pytest
+from gnpy.core.elements import Fiber
+from gnpy.tools.worker_utils import transmission_simulation
+
+# Project imports
+from src.optinetsim_backend.app.simulation.core import _design_network, apply_sim_params
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.results import build_single_link_result, channel_rows, to_builtin
+
+
+def assert_close(actual, expected):
+    """逐层比较结果字典，数值按相对误差比较"""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            assert_close(actual[key], expected[key])
+    elif isinstance(expected, (list, tuple)):
+        assert len(actual) == len(expected)
+        for a, e in zip(actual, expected):
+            assert_close(a, e)
+    elif isinstance(expected, str) or expected is None:
+        assert actual == expected
+    else:
+        assert actual == pytest.approx(expected)
+
+
+def gnpy_single_link(user_id, network_id, source_uid, destination_uid):
+    """不经过任何缓存、直接调用 GNPY 的 transmission_simulation 得到的单链路仿真结果"""
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    design = _design_network(context)
+    req = design.request_for(source_uid, destination_uid)
+    path, propagations, powers, infos = transmission_simulation(design.equipment, design.network, req,
+                                                                design.ref_req)
+    spans = [el.params.length for el in path if isinstance(el, Fiber)]
+    res_path = [el.uid for el in propagations[0]] if len(powers) == 1 else []
+    return to_builtin(build_single_link_result(context.element_names, source_uid, destination_uid, spans, infos,
+                                               res_path, propagations[-1], channel_rows(infos, path[-1])))
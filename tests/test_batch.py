@@ -0,0 +1,22 @@
+# coding: utf-8
+import pytest
+
+# Project imports
+from tests.helpers import assert_close, gnpy_single_link
+
+
+@pytest.mark.parametrize('power_range_db', [[0, 0, 1], [-1, 1, 1]])
+def test_batch_pairs_match_single_link(db, make_network, api, power_range_db):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    db.networks.update_one({}, {'$set': {'SI.power_range_db': power_range_db}})
+    first, second = (builder.transceivers[0], builder.transceivers[2]), (builder.transceivers[1], builder.transceivers[3])
+    # 同一对收发器重复出现，前一对的传播（及功率扫描的重新设计）不能影响后一对
+    pairs = [first, first, second, first]
+    body = {'network_id': network_id,
+            'pairs': [{'source_uid': source, 'destination_uid': destination} for source, destination in pairs]}
+    status, response = api('POST', '/api/simulation/batch', user_id, body)
+    assert status == 200
+    expected = {pair: gnpy_single_link(user_id, network_id, *pair) for pair in (first, second)}
+    assert len(response['results']) == len(pairs)
+    for pair, result in zip(pairs, response['results']):
+        assert_close(result, expected[pair])
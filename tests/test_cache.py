@@ -0,0 +1,94 @@
+# coding: utf-8
+from bson import ObjectId
+
+# Project imports
+from src.optinetsim_backend.app.cache import design_cache, equipment_cache
+from src.optinetsim_backend.app.database.models import EquipmentLibraryDB, NetworkDB
+from src.optinetsim_backend.app.simulation.core import get_designed_network
+from src.optinetsim_backend.app.simulation.executor import simulation_executor
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from tests.helpers import assert_close, gnpy_single_link
+
+
+def _design(user_id, network_id):
+    return get_designed_network(SimulationContext.load(user_id, network_id))
+
+
+def _edfa(builder):
+    return next(element for element in builder.document['elements'] if element['type'] == 'Edfa')
+
+
+def test_equipment_cache_shared_until_si_changes(make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    SimulationContext.load(user_id, network_id).build_equipment()
+    hits, misses = equipment_cache.hits, equipment_cache.misses
+    SimulationContext.load(user_id, network_id).build_equipment()
+    assert (equipment_cache.hits, equipment_cache.misses) == (hits + 1, misses)
+
+    # SI 参与缓存键，修改后重新编译
+    NetworkDB.update_spectrum_information(network_id, dict(builder.document['SI'], power_dbm=1))
+    equipment = SimulationContext.load(user_id, network_id).build_equipment()
+    assert equipment_cache.misses == misses + 1
+    assert equipment['SI']['default'].power_dbm == 1
+
+
+def test_library_update_invalidates_equipment_and_design(db, make_network):
+    user_id, network_id, _ = make_network('linear', 2)
+    _design(user_id, network_id)
+    library_id = str(db.equipment_libraries.find_one()['_id'])
+    equipment_misses, design_misses = equipment_cache.misses, design_cache.misses
+
+    edfa = db.equipment_libraries.find_one()['equipments']['Edfa'][0]
+    EquipmentLibraryDB.update_equipment(library_id, 'Edfa', edfa['type_variety'], dict(edfa, p_max=edfa['p_max'] - 1))
+    _design(user_id, network_id)
+    assert equipment_cache.misses == equipment_misses + 1
+    assert design_cache.misses == design_misses + 1
+
+
+def test_design_cache_hit_and_revision_invalidation(make_network):
+    user_id, network_id, builder = make_network('linear', 3)
+    _design(user_id, network_id)
+    hits, misses = design_cache.hits, design_cache.misses
+    _design(user_id, network_id)
+    assert (design_cache.hits, design_cache.misses) == (hits + 1, misses)
+
+    # 修改元素使 revision 递增，设计缓存不再命中
+    edfa = _edfa(builder)
+    edfa = dict(edfa, operational=dict(edfa['operational'], gain_target=edfa['operational']['gain_target'] + 1))
+    assert NetworkDB.update_element(network_id, edfa['element_id'], edfa).modified_count == 1
+    _design(user_id, network_id)
+    assert design_cache.misses == misses + 1
+
+    # 内容不变的修改不递增 revision，仍然命中
+    assert NetworkDB.update_element(network_id, edfa['element_id'], edfa).modified_count == 0
+    _design(user_id, network_id)
+    assert design_cache.misses == misses + 1
+
+
+def test_cached_single_link_matches_gnpy(db, make_network, api, monkeypatch):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    body = {'network_id': network_id, 'source_uid': builder.transceivers[0],
+            'destination_uid': builder.transceivers[2]}
+    expected = gnpy_single_link(user_id, network_id, body['source_uid'], body['destination_uid'])
+
+    status, first = api('POST', '/api/simulation/single-link', user_id, body)
+    assert status == 200
+    assert_close(first, expected)
+    assert db.simulation_results.count_documents({}) == 1
+    # 结果按创建时间过期
+    ttl = [index for index in db.simulation_results.index_information().values() if 'expireAfterSeconds' in index]
+    assert [index['key'] for index in ttl] == [[('created_at', 1)]]
+
+    # 第二次请求由结果缓存返回，不再执行仿真
+    run = simulation_executor.run
+    monkeypatch.setattr(simulation_executor, 'run', None)
+    status, second = api('POST', '/api/simulation/single-link', user_id, body)
+    assert status == 200
+    assert_close(second, expected)
+    monkeypatch.setattr(simulation_executor, 'run', run)
+
+    # 网络修改后结果缓存的键改变，重新仿真
+    NetworkDB.update_spectrum_information(network_id, dict(builder.document['SI'], power_dbm=1))
+    status, _ = api('POST', '/api/simulation/single-link', user_id, body)
+    assert status == 200
+    assert db.simulation_results.count_documents({'network_id': ObjectId(network_id)}) == 2
@@ -0,0 +1,62 @@
+# coding: utf-8
+import io
+import json
+
+import msgpack
+import numpy as np
+from flask_jwt_extended import create_access_token
+
+# Project imports
+from src.optinetsim_backend.app.encoders import MSGPACK_MIMETYPE, NPZ_MIMETYPE
+from src.optinetsim_backend.app.simulation.results import CHANNEL_FORMAT_COLUMNAR
+from tests.helpers import assert_close
+
+
+def _decode_msgpack(obj):
+    if isinstance(obj, dict):
+        if obj.get('__ndarray__') is True:
+            return np.frombuffer(obj['data'], dtype=obj['dtype']).reshape(obj['shape']).tolist()
+        return {key: _decode_msgpack(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_decode_msgpack(value) for value in obj]
+    return obj
+
+
+def _decode_npz(meta, arrays):
+    if isinstance(meta, dict):
+        if set(meta) == {'__ndarray__'}:
+            return arrays[meta['__ndarray__']].tolist()
+        return {key: _decode_npz(value, arrays) for key, value in meta.items()}
+    if isinstance(meta, list):
+        return [_decode_npz(value, arrays) for value in meta]
+    return meta
+
+
+def test_binary_encodings_match_json(db, app, make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+    client = app.test_client()
+    body = {'network_id': network_id, 'source_uid': builder.transceivers[0],
+            'destination_uid': builder.transceivers[1], 'format': CHANNEL_FORMAT_COLUMNAR}
+
+    def post(accept):
+        # 清空结果缓存，使响应编码仿真直接返回的 NumPy 数组
+        db.simulation_results.delete_many({})
+        response = client.post('/api/simulation/single-link', json=body,
+                               headers={'Authorization': f'Bearer {token}', 'Accept': accept})
+        assert response.status_code == 200
+        assert response.mimetype == accept
+        return response.data
+
+    expected = json.loads(post('application/json'))
+
+    packed = msgpack.unpackb(post(MSGPACK_MIMETYPE))
+    assert packed['full_channel_info']['GSNR']['__ndarray__'] is True
+    assert_close(_decode_msgpack(packed), expected)
+
+    with np.load(io.BytesIO(post(NPZ_MIMETYPE))) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    meta = json.loads(str(arrays.pop('__meta__')))
+    assert meta['full_channel_info']['GSNR'] == {'__ndarray__': 'full_channel_info/GSNR'}
+    assert_close(_decode_npz(meta, arrays), expected)
@@ -0,0 +1,53 @@
+# coding: utf-8
+from itertools import permutations
+
+import numpy as np
+
+# Project imports
+from src.optinetsim_backend.app.simulation.core import apply_sim_params, get_designed_network, propagate_pair
+from src.optinetsim_backend.app.simulation.estimate import ESTIMATE_TOLERANCE_DB, estimate_pair
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.tasks import run_estimate, run_single_link
+
+
+def test_estimate_close_to_full_simulation(make_network):
+    # 四站点环网中 site0 到 site2 经过 site1 的 ROADM
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+
+    estimate = run_estimate(user_id, network_id, source, destination)
+    assert 'max observed error (dB)' not in estimate
+
+    # 估算只包含完整仿真中传播的通道
+    exact = run_single_link(user_id, network_id, source, destination)
+    assert len(estimate['per_channel']['GSNR_01nm']) == exact['number of channels']
+    assert estimate['path'] == exact['path']
+    exact_gsnr = float(exact['Mean GSNR (0.1nm, dB)'][0]['mean_GSNR_0_1nm'])
+    assert abs(estimate['Mean GSNR (0.1nm, dB)'] - exact_gsnr) <= ESTIMATE_TOLERANCE_DB
+
+
+def test_estimate_within_tolerance_of_propagation(make_network):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    design = get_designed_network(context)
+
+    for source, destination in permutations(builder.transceivers, 2):
+        estimate = estimate_pair(design, source, destination)
+        _, _, _, path, _ = propagate_pair(design.for_pair(), source, destination)
+        exact = np.asarray(path[-1].snr_01nm, dtype=float)
+        error = np.abs(np.asarray(estimate['per_channel']['GSNR_01nm']) - exact)
+        assert error.max() <= ESTIMATE_TOLERANCE_DB, (source, destination)
+        assert abs(estimate['Mean GSNR (0.1nm, dB)'] - float(np.mean(exact))) <= ESTIMATE_TOLERANCE_DB
+
+
+def test_calibration_reports_observed_error(make_network):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+
+    calibrated = run_estimate(user_id, network_id, source, destination, calibrate_error=True)
+    error = calibrated['calibration_error (dB)']
+    assert 0 <= error <= ESTIMATE_TOLERANCE_DB
+    assert calibrated['max observed error (dB)'] == error
+    # 之后同一设计上的估算带有观测到的误差
+    assert run_estimate(user_id, network_id, source, destination)['max observed error (dB)'] == error
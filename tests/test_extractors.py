@@ -0,0 +1,55 @@
+# coding: utf-8
+import pytest
+from gnpy.core.elements import Fiber, Transceiver
+
+# Project imports
+from src.optinetsim_backend.app.simulation import extractors
+from src.optinetsim_backend.app.simulation.core import apply_sim_params, get_designed_network, propagate_pair
+from src.optinetsim_backend.app.simulation.extractors import extract_element_info, parse_element_info
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+
+
+def _propagated_path(make_network):
+    user_id, network_id, builder = make_network('ring', 3, spans_per_link=2)
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    design = get_designed_network(context)
+    _, _, _, path, _ = propagate_pair(design, builder.transceivers[0], builder.transceivers[1])
+    return path
+
+
+def test_extracted_info_matches_element_description(make_network):
+    path = _propagated_path(make_network)
+    assert {type(elem).__name__ for elem in path} == {'Transceiver', 'Roadm', 'Edfa', 'Fiber'}
+    for elem in path:
+        extracted = extract_element_info(elem, 'name')
+        parsed = parse_element_info(elem, 'name')
+        assert extracted.pop('element').split() == parsed.pop('element').split()
+        if isinstance(elem, Fiber):
+            # 字符串描述中连接损耗写在同一行，提取结果拆分为两个字段
+            conn_in, conn_out = parsed.pop('(includes conn loss (dB) in').rstrip(')').split(' out: ')
+            parsed['conn loss in (dB)'], parsed['conn loss out (dB)'] = float(conn_in), float(conn_out)
+        assert extracted.keys() == parsed.keys()
+        for key, value in parsed.items():
+            if isinstance(value, str):
+                assert extracted[key] == value
+            else:
+                # 字符串描述保留两位小数
+                assert extracted[key] == pytest.approx(value, abs=0.006)
+
+
+def test_extractor_lookup_follows_mro(make_network, monkeypatch):
+    path = _propagated_path(make_network)
+    transceiver = path[-1]
+
+    class CustomTransceiver(Transceiver):
+        pass
+
+    transceiver.__class__ = CustomTransceiver
+    info = extract_element_info(transceiver, None)
+    assert info['element'] == f'CustomTransceiver {transceiver.uid}'
+    assert info['GSNR (0.1nm, dB)'] == pytest.approx(float(transceiver.snr_01nm.mean()))
+
+    # 没有可用的提取函数时解析字符串描述
+    monkeypatch.setattr(extractors, '_EXTRACTORS', {})
+    assert extract_element_info(transceiver, None) == parse_element_info(transceiver, None)
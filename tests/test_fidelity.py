@@ -0,0 +1,85 @@
+# coding: utf-8
+# Project imports
+from src.optinetsim_backend.app.simulation.fidelity import (
+    FIDELITY_BALANCED,
+    FIDELITY_EXACT,
+    FIDELITY_FAST,
+    apply_fidelity,
+    channel_count,
+    computed_channels,
+    supports_fidelity
+)
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+
+SI = {"f_min": 191.3e12, "f_max": 191.3e12 + 96 * 50e9, "spacing": 50e9}
+GGN = {"nli_params": {"method": "ggn_spectrally_separated", "computed_number_of_channels": 3}}
+
+
+def test_computed_channels_include_band_edges():
+    channels = computed_channels(96, FIDELITY_BALANCED)
+    assert channels[0] == 1 and channels[-1] == 96
+    assert len(channels) == 12
+    assert len(computed_channels(96, FIDELITY_FAST)) == 5
+    assert computed_channels(96, FIDELITY_EXACT) is None
+    # 通道数不超过最少通道数时计算全部通道
+    assert computed_channels(8, FIDELITY_BALANCED) is None
+
+
+def test_apply_fidelity_replaces_network_subset():
+    sim_params = apply_fidelity(GGN, FIDELITY_FAST, 96)
+    assert sim_params['nli_params'] == {"method": "ggn_spectrally_separated",
+                                        "computed_channels": computed_channels(96, FIDELITY_FAST)}
+    # 网络的仿真参数不被修改
+    assert GGN['nli_params']['computed_number_of_channels'] == 3
+
+
+def test_exact_removes_network_subset():
+    network_params = {"nli_params": {"method": "ggn_spectrally_separated", "computed_channels": [1, 5]}}
+    assert apply_fidelity(network_params, FIDELITY_EXACT, 96)['nli_params'] == {"method": "ggn_spectrally_separated"}
+    assert apply_fidelity(GGN, FIDELITY_EXACT, 96)['nli_params'] == {"method": "ggn_spectrally_separated"}
+
+
+def test_subsampling_requires_ggn_method():
+    analytic = {"nli_params": {"method": "gn_model_analytic"}}
+    assert not supports_fidelity(analytic, FIDELITY_FAST)
+    assert not supports_fidelity({}, FIDELITY_BALANCED)
+    assert supports_fidelity(analytic, FIDELITY_EXACT)
+    assert supports_fidelity(GGN, FIDELITY_FAST)
+    assert supports_fidelity({"nli_params": {"method": "ggn_approx"}}, FIDELITY_FAST)
+
+
+def test_channel_count_follows_request_spectrum():
+    assert channel_count(SI) == 96
+    spectrum = [{"f_min": 191.4e12, "f_max": 191.4e12 + 39 * 50e9, "baud_rate": 32e9, "slot_width": 50e9,
+                 "roll_off": 0.15}]
+    assert channel_count(SI, spectrum) == 40
+
+    network = {"SI": SI, "simulation_config": GGN}
+    context = SimulationContext(network, [], FIDELITY_FAST, spectrum)
+    assert context.build_sim_params()['nli_params']['computed_channels'] == computed_channels(40, FIDELITY_FAST)
+
+
+def test_api_rejects_subsampling_for_analytic_method(make_network, api):
+    user_id, network_id, builder = make_network('linear', 1)
+    source, destination = builder.transceivers
+    body = {'network_id': network_id, 'source_uid': source, 'destination_uid': destination, 'fidelity': 'fast'}
+    status, response = api('POST', '/api/simulation/single-link', user_id, body)
+    assert status == 400 and 'ggn_spectrally_separated' in response['message']
+    assert api('POST', '/api/simulation/single-link', user_id, dict(body, fidelity='exact'))[0] == 200
+    assert api('POST', '/api/simulation/single-link', user_id, dict(body, fidelity='medium'))[0] == 400
+
+
+def test_api_reports_interpolation_error(db, make_network, api):
+    user_id, network_id, builder = make_network('linear', 1, channels=16)
+    db.networks.update_one({}, {'$set': {'simulation_config.nli_params.method': 'ggn_spectrally_separated'}})
+    source, destination = builder.transceivers
+    body = {'network_id': network_id, 'source_uid': source, 'destination_uid': destination,
+            'fidelity': FIDELITY_BALANCED}
+    status, result = api('POST', '/api/simulation/single-link', user_id, body)
+    assert status == 200
+    report = result['fidelity']
+    assert report['level'] == FIDELITY_BALANCED
+    assert report['computed_channels'] == computed_channels(channel_count(builder.document['SI']), FIDELITY_BALANCED)
+    assert result['number of channels'] == channel_count(builder.document['SI'])
+    calibration = report['calibration']
+    assert 0 <= calibration['mean GSNR error (dB)'] <= calibration['max GSNR error (dB)'] < 0.5
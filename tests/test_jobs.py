@@ -0,0 +1,113 @@
+# coding: utf-8
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from bson import ObjectId
+
+# Project imports
+from src.optinetsim_backend.app.database.models import SimulationJobDB
+from src.optinetsim_backend.app.simulation.executor import _on_job_done, fail_interrupted_jobs
+from tests.helpers import assert_close, gnpy_single_link
+
+
+def _wait(api, user_id, job_id, timeout=60):
+    # all-pairs 任务在后台线程中执行
+    deadline = time.monotonic() + timeout
+    while True:
+        status, job = api('GET', f'/api/simulation/jobs/{job_id}', user_id)
+        assert status == 200
+        if job['status'] in ('finished', 'failed') or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_single_link_job_lifecycle(make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    status, body = api('POST', '/api/simulation/jobs', user_id,
+                       {'network_id': network_id, 'source_uid': source, 'destination_uid': destination})
+    assert status == 202 and body['status'] == 'pending'
+
+    job = _wait(api, user_id, body['job_id'])
+    assert job['status'] == 'finished'
+    assert job['started_at'] and job['finished_at'] and job['error'] is None
+    status, result = api('GET', f"/api/simulation/jobs/{body['job_id']}/result", user_id)
+    assert status == 200
+    assert_close(result, gnpy_single_link(user_id, network_id, source, destination))
+
+
+def test_failed_job(db, make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    db.networks.update_one({}, {'$set': {'simulation_config.nli_params.method': 'unknown'}})
+    source, destination = builder.transceivers
+    status, body = api('POST', '/api/simulation/jobs', user_id,
+                       {'network_id': network_id, 'source_uid': source, 'destination_uid': destination})
+    assert status == 202
+    job = _wait(api, user_id, body['job_id'])
+    assert job['status'] == 'failed' and job['error']
+    status, _ = api('GET', f"/api/simulation/jobs/{body['job_id']}/result", user_id)
+    assert status == 500
+
+
+def test_all_pairs_job(make_network, api):
+    user_id, network_id, builder = make_network('ring', 3, spans_per_link=1)
+    status, body = api('POST', '/api/simulation/jobs', user_id, {'kind': 'all-pairs', 'network_id': network_id})
+    assert status == 202
+    assert _wait(api, user_id, body['job_id'])['status'] == 'finished'
+    status, result = api('GET', f"/api/simulation/jobs/{body['job_id']}/result", user_id)
+    assert status == 200
+    assert [transceiver['uid'] for transceiver in result['transceivers']] == builder.transceivers
+    assert result['summary']['simulated'] == result['summary']['pairs'] == 6
+
+
+@pytest.mark.parametrize('power_range_db', [[0, 0, 1], [-1, 1, 1]])
+def test_all_pairs_matches_single_link(db, make_network, api, power_range_db):
+    # 每行在同一份设计上依次传播多对收发器，功率扫描的重新设计不能影响之后的收发器对
+    user_id, network_id, builder = make_network('ring', 3, spans_per_link=2)
+    db.networks.update_one({}, {'$set': {'SI.power_range_db': power_range_db}})
+    status, body = api('POST', '/api/simulation/jobs', user_id, {'kind': 'all-pairs', 'network_id': network_id})
+    assert status == 202
+    assert _wait(api, user_id, body['job_id'])['status'] == 'finished'
+    _, result = api('GET', f"/api/simulation/jobs/{body['job_id']}/result", user_id)
+    for i, source in enumerate(builder.transceivers):
+        for j, destination in enumerate(builder.transceivers):
+            if i == j:
+                assert result['GSNR (0.1nm, dB)'][i][j] is None
+                continue
+            expected = gnpy_single_link(user_id, network_id, source, destination)
+            assert result['GSNR (0.1nm, dB)'][i][j] == pytest.approx(
+                float(expected['Mean GSNR (0.1nm, dB)'][0]['mean_GSNR_0_1nm']), abs=0.006)
+            assert result['Latency (ms)'][i][j] == pytest.approx(expected['Total Latency (ms)'])
+
+
+def test_other_users_job_not_found(make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    job_id = str(SimulationJobDB.create(user_id, network_id, 'single-link', {}).inserted_id)
+    status, _ = api('GET', f'/api/simulation/jobs/{job_id}', str(ObjectId()))
+    assert status == 404
+
+
+def test_interrupted_jobs_fail_on_startup(db):
+    user_id, network_id = str(ObjectId()), str(ObjectId())
+    live = SimulationJobDB.create(user_id, network_id, 'single-link', {}).inserted_id
+    dead = SimulationJobDB.create(user_id, network_id, 'single-link', {}).inserted_id
+    db.simulation_jobs.update_one({'_id': dead}, {'$set': {'owner.pid': 2 ** 22 + 1, 'status': 'running'}})
+    # 没有记录创建进程的旧任务
+    legacy = db.simulation_jobs.insert_one({'user_id': ObjectId(user_id), 'status': 'pending'}).inserted_id
+
+    assert fail_interrupted_jobs() == 2
+    assert SimulationJobDB.find_by_id(user_id, live)['status'] == 'pending'
+    assert SimulationJobDB.find_by_id(user_id, dead)['status'] == 'failed'
+    assert SimulationJobDB.find_by_id(user_id, legacy)['status'] == 'failed'
+
+
+def test_worker_crash_fails_job(db):
+    user_id = str(ObjectId())
+    job_id = SimulationJobDB.create(user_id, str(ObjectId()), 'single-link', {}).inserted_id
+    future = Future()
+    future.set_exception(BrokenProcessPool('worker died'))
+    _on_job_done(job_id, future)
+    job = SimulationJobDB.find_by_id(user_id, job_id)
+    assert job['status'] == 'failed' and '工作进程' in job['error']
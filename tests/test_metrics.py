@@ -0,0 +1,59 @@
+# coding: utf-8
+import re
+
+from flask_jwt_extended import create_access_token
+
+# Project imports
+from src.optinetsim_backend.app.metrics import Histogram, _registry
+
+
+def _samples(text):
+    """解析 Prometheus 文本格式，返回 {(指标名, 标签字符串): 数值}"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            match = re.fullmatch(r'([a-z_]+)(\{.*\})? (\S+)', line)
+            samples[(match.group(1), match.group(2) or '')] = float(match.group(3))
+    return samples
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', 'test', ('stage',), buckets=(0.1, 1))
+    _registry.remove(histogram)
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, stage='design')
+    samples = {(name, labels.get('le')): value for name, labels, value in histogram.samples()}
+    assert samples[('test_seconds_bucket', '0.1')] == 2
+    assert samples[('test_seconds_bucket', '1.0')] == 3
+    assert samples[('test_seconds_bucket', '+Inf')] == 4
+    assert samples[('test_seconds_count', None)] == 4
+    assert samples[('test_seconds_sum', None)] == 3.65
+
+
+def test_simulation_request_metrics_and_server_timing(app, make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity=user_id)
+    before = _samples(client.get('/api/metrics').get_data(as_text=True))
+
+    body = {'network_id': network_id, 'source_uid': builder.transceivers[0],
+            'destination_uid': builder.transceivers[1]}
+    response = client.post('/api/simulation/single-link', json=body, headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    timings = dict(item.split(';dur=') for item in response.headers['Server-Timing'].split(', '))
+    assert {'result_cache', 'design', 'propagate', 'total'} <= set(timings)
+    assert all(float(duration) >= 0 for duration in timings.values())
+
+    response = client.get('/api/metrics')
+    assert response.mimetype == 'text/plain'
+    after = _samples(response.get_data(as_text=True))
+
+    def delta(name, labels):
+        return after.get((name, labels), 0) - before.get((name, labels), 0)
+
+    requests = '{endpoint="singlelinksimulationresource",method="POST",status="200",le="+Inf"}'
+    assert delta('optinetsim_request_duration_seconds_bucket', requests) == 1
+    assert delta('optinetsim_simulation_stage_duration_seconds_count', '{stage="design"}') == 1
+    assert delta('optinetsim_result_cache_lookups_total', '{outcome="miss"}') == 1
+    assert delta('optinetsim_cache_misses_total', '{cache="design"}') == 1
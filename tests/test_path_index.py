@@ -0,0 +1,51 @@
+# coding: utf-8
+import pytest
+from gnpy.core.elements import Roadm
+from gnpy.topology.request import compute_constrained_path
+
+# Project imports
+from src.optinetsim_backend.app.simulation.core import apply_sim_params, get_designed_network
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+
+
+def _design(make_network, topology='mesh', size=5):
+    user_id, network_id, builder = make_network(topology, size, spans_per_link=1)
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    return get_designed_network(context), builder
+
+
+# 四站点环网中相对的站点之间有两条等长路径
+@pytest.mark.parametrize('topology, size', [('mesh', 5), ('ring', 4)])
+def test_paths_match_gnpy(make_network, topology, size):
+    design, builder = _design(make_network, topology, size)
+    index = design.index
+    assert sorted(index.transceivers) == sorted(builder.transceivers)
+    for source in builder.transceivers:
+        for destination in builder.transceivers:
+            if source == destination:
+                continue
+            req = design.request_for(source, destination)
+            expected = [elem.uid for elem in compute_constrained_path(design.network, req)]
+            assert index.path(source, destination) == expected
+            k_paths = index.k_shortest_paths(source, destination, 3)
+            assert k_paths[0] == expected
+            assert len({tuple(path) for path in k_paths}) == len(k_paths)
+            assert all(index.has_path(path) for path in k_paths)
+    assert index.path(builder.transceivers[0], 'missing') is None
+    assert index.k_shortest_paths(builder.transceivers[0], 'missing', 2) == []
+    # 副本共用同一个索引
+    assert design.clone().index is index
+
+
+def test_oms_cover_roadm_hops(make_network):
+    design, builder = _design(make_network)
+    index = design.index
+    for segment in index.oms:
+        assert isinstance(design.nodes[segment[0]], Roadm) and isinstance(design.nodes[segment[-1]], Roadm)
+        assert not any(isinstance(design.nodes[uid], Roadm) for uid in segment[1:-1])
+        assert index.has_path(segment)
+    path = index.path(builder.transceivers[0], builder.transceivers[2])
+    oms = [index.oms[i] for i in index.path_oms(path)]
+    # 路径去掉两端的收发器后，由依次经过的 OMS 首尾相接而成
+    assert [uid for segment in oms for uid in segment[:-1]] + [oms[-1][-1]] == path[1:-1]
@@ -0,0 +1,60 @@
+# coding: utf-8
+from bson import ObjectId
+
+# Project imports
+from benchmarks.equipment import TRANSCEIVER_TYPE
+from src.optinetsim_backend.app.simulation.core import get_designed_network, propagate_pair
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+
+
+def _store_services(db, network_id, services, elements=None):
+    update = {'services': services}
+    if elements is not None:
+        update['elements'] = elements
+    db.networks.update_one({'_id': ObjectId(network_id)}, {'$set': update})
+
+
+def test_planning_assigns_path_and_spectrum(db, make_network, api):
+    user_id, network_id, builder = make_network('ring', 4)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+    # 未指定 trx_type 时使用源收发器的型号，未指定 trx_mode 时自动选择模式
+    services = [
+        {'request_id': 'auto', 'source': source, 'destination': destination, 'path_bandwidth': 100e9},
+        {'request_id': 'fixed', 'source': source, 'destination': destination, 'path_bandwidth': 100e9,
+         'trx_type': TRANSCEIVER_TYPE, 'trx_mode': 'mode 1'},
+    ]
+    _store_services(db, network_id, services)
+
+    status, result = api('POST', '/api/simulation/planning', user_id, {'network_id': network_id})
+    assert status == 200
+    assert result['summary'] == {'services': 2, 'feasible': 2, 'blocked': 0, 'blocking_reasons': {}}
+
+    context = SimulationContext.load(user_id, network_id)
+    _, _, _, path, _ = propagate_pair(get_designed_network(context).for_pair(), source, destination)
+    slots = []
+    for service in result['services']:
+        assert service['trx_type'] == TRANSCEIVER_TYPE
+        assert service['mode'] == 'mode 1'
+        assert service['path'] == [el.uid for el in path]
+        assert service['GSNR margin (dB)'] > 0
+        spectrum = service['spectrum']
+        assert len(spectrum['N']) == len(spectrum['M']) == 1
+        n, m = spectrum['N'][0], spectrum['M'][0]
+        slots.append(set(range(n - m, n + m)))
+    # 两条业务经过相同的 OMS，分配的频隙互不重叠
+    assert slots[0] and slots[1] and not slots[0] & slots[1]
+
+
+def test_planning_rejects_service_without_transceiver_type(db, make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    elements = [{key: value for key, value in element.items() if key != 'type_variety'}
+                if element['element_id'] == source else element
+                for element in builder.document['elements']]
+    _store_services(db, network_id, [{'request_id': 'svc', 'source': source, 'destination': destination}], elements)
+
+    status, result = api('POST', '/api/simulation/planning', user_id, {'network_id': network_id})
+    assert status == 400
+    assert 'trx_type' in result['message']
+    status, _ = api('POST', '/api/simulation/jobs', user_id, {'kind': 'planning', 'network_id': network_id})
+    assert status == 400
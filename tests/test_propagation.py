@@ -0,0 +1,49 @@
+# coding: utf-8
+import pytest
+
+# Project imports
+from src.optinetsim_backend.app.simulation.core import SimulationError, apply_sim_params, get_designed_network
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.propagation import propagate_stepwise, simulate_incremental
+from src.optinetsim_backend.app.simulation.results import build_single_link_result
+from src.optinetsim_backend.app.simulation.tasks import run_single_link
+from tests.helpers import assert_close
+
+
+def _stepwise_summary(user_id, network_id, source, destination):
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    design = get_designed_network(context)
+    events = list(propagate_stepwise(design, source, destination, context.element_names))
+    assert [event['event'] for event in events[:-1]] == ['element'] * (len(events) - 1)
+    assert events[-1]['event'] == 'summary'
+    return events[-1]['result']
+
+
+@pytest.mark.parametrize('power_range_db', [[0, 0, 1], [-1, 1, 1]])
+def test_stepwise_summary_matches_single_link(db, make_network, power_range_db):
+    user_id, network_id, builder = make_network('ring', 3, spans_per_link=2)
+    db.networks.update_one({}, {'$set': {'SI.power_range_db': power_range_db}})
+    source, destination = builder.transceivers[0], builder.transceivers[1]
+
+    expected = run_single_link(user_id, network_id, source, destination)
+    summary = _stepwise_summary(user_id, network_id, source, destination)
+    assert_close(summary, expected)
+
+
+def test_incremental_matches_single_link(make_network):
+    user_id, network_id, builder = make_network('ring', 3, spans_per_link=2)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+    expected = run_single_link(user_id, network_id, source, destination)
+    for _ in range(2):
+        # 第二次从快照中恢复整条路径
+        context = SimulationContext.load(user_id, network_id)
+        result = build_single_link_result(context.element_names, source, destination,
+                                          *simulate_incremental(context, source, destination))
+        assert_close(result, expected)
+
+
+def test_stepwise_rejects_unknown_transceiver(make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    with pytest.raises(SimulationError):
+        _stepwise_summary(user_id, network_id, builder.transceivers[0], 'missing')
@@ -0,0 +1,37 @@
+# coding: utf-8
+import pytest
+
+# Project imports
+from src.optinetsim_backend.app.simulation.results import CHANNEL_FORMAT_COLUMNAR, CHANNEL_FORMAT_ROWS
+from tests.helpers import assert_close
+
+
+def _single_link(api, user_id, network_id, builder, channel_format):
+    body = {'network_id': network_id, 'source_uid': builder.transceivers[0],
+            'destination_uid': builder.transceivers[1], 'format': channel_format}
+    return api('POST', '/api/simulation/single-link', user_id, body)
+
+
+def test_columnar_channels_match_rows(make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    status, rows = _single_link(api, user_id, network_id, builder, CHANNEL_FORMAT_ROWS)
+    assert status == 200
+    status, columnar = _single_link(api, user_id, network_id, builder, CHANNEL_FORMAT_COLUMNAR)
+    assert status == 200
+
+    columns = columnar.pop('full_channel_info')
+    channels = rows.pop('full_channel_info')
+    assert len(channels) == rows['number of channels']
+    assert list(columns) == list(channels[0])
+    for key, values in columns.items():
+        assert len(values) == len(channels)
+        # 按行输出时数值已按位数取整
+        assert [row[key] for row in channels] == pytest.approx(values, abs=0.006)
+    # 其余结果与通道格式无关
+    assert_close(columnar, rows)
+
+
+def test_unknown_channel_format_is_rejected(make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    status, response = _single_link(api, user_id, network_id, builder, 'csv')
+    assert status == 400 and 'format' in response['message']
@@ -0,0 +1,107 @@
+# coding: utf-8
+from datetime import datetime, timedelta
+
+import numpy as np
+from gnpy.tools.worker_utils import transmission_simulation
+
+# Project imports
+from src.optinetsim_backend.app.cache import design_cache, segment_cache
+from src.optinetsim_backend.app.database.models import NetworkDB
+from src.optinetsim_backend.app.simulation.core import apply_sim_params, get_designed_network, propagate_pair
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+
+
+def _design(user_id, network_id):
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    return get_designed_network(context)
+
+
+def _baseline(design, source_uid, destination_uid):
+    # GNPY 原生的路径计算和传播
+    design = design.clone()
+    req = design.request_for(source_uid, destination_uid)
+    path, _, _, infos = transmission_simulation(design.equipment, design.network, req, design.ref_req)
+    return path, infos
+
+
+def test_segmented_propagation_matches_transmission_simulation(make_network):
+    # 四站点环网中 site0 到 site2 经过 site1 的 ROADM
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+    design = _design(user_id, network_id)
+    path, infos = _baseline(design, source, destination)
+
+    for _ in range(2):
+        # 第二次传播的各段都命中段缓存
+        _, si, res_path, mypath, _ = propagate_pair(design.clone(), source, destination)
+        assert res_path == [el.uid for el in path]
+        np.testing.assert_allclose(si.signal, infos.signal)
+        np.testing.assert_allclose(si.ase, infos.ase)
+        np.testing.assert_allclose(si.nli, infos.nli)
+        np.testing.assert_allclose(mypath[-1].snr, path[-1].snr)
+        np.testing.assert_allclose(mypath[-1].snr_01nm, path[-1].snr_01nm)
+        np.testing.assert_allclose(mypath[0].snr, path[0].snr)
+    assert segment_cache.hits > 0
+
+
+def test_segment_cache_distinguishes_equipment(db, make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    propagate_pair(_design(user_id, network_id), source, destination)
+    hits = segment_cache.hits
+
+    # 器件库修改后设备配置的键改变，段缓存不再命中
+    db.equipment_libraries.update_many({}, {'$set': {'updated_at': datetime.utcnow() + timedelta(seconds=1)}})
+    propagate_pair(_design(user_id, network_id), source, destination)
+    assert segment_cache.hits == hits
+
+
+def _propagate(design, source_uid, destination_uid):
+    _, si, res_path, mypath, _ = propagate_pair(design.for_pair(), source_uid, destination_uid)
+    return si, res_path, mypath[-1]
+
+
+def _assert_same_result(result, expected):
+    si, res_path, transceiver = result
+    expected_si, expected_path, expected_transceiver = expected
+    assert res_path == expected_path
+    np.testing.assert_array_equal(si.signal, expected_si.signal)
+    np.testing.assert_array_equal(si.ase, expected_si.ase)
+    np.testing.assert_array_equal(si.nli, expected_si.nli)
+    np.testing.assert_array_equal(transceiver.snr_01nm, expected_transceiver.snr_01nm)
+
+
+def test_shared_prefix_hit_matches_cold_run(make_network):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    source, via, destination = builder.transceivers[:3]
+    cold = _propagate(_design(user_id, network_id), source, via)
+
+    # site0 到 site2 的传播写入 site0 到 site1 的全部前缀段
+    segment_cache.invalidate()
+    design = _design(user_id, network_id)
+    _propagate(design, source, destination)
+    hits = segment_cache.hits
+    _assert_same_result(_propagate(design, source, via), cold)
+    assert segment_cache.hits > hits
+
+
+def test_multi_point_power_range_matches_cold_run(make_network):
+    user_id, network_id, builder = make_network('ring', 4, spans_per_link=2)
+    source, destination = builder.transceivers[0], builder.transceivers[2]
+    # 单功率点的传播写入段缓存
+    _propagate(_design(user_id, network_id), source, destination)
+    assert segment_cache.misses > 0
+
+    NetworkDB.update_spectrum_information(network_id, dict(builder.document['SI'], power_range_db=[-1, 1, 1]))
+    design = _design(user_id, network_id)
+    hits = segment_cache.hits
+    warm = [_propagate(design, source, destination) for _ in range(2)]
+    # 每个功率点都重新设计网络，多个功率点的传播不复用段缓存中的结果
+    assert segment_cache.hits == hits
+
+    design_cache.invalidate()
+    segment_cache.invalidate()
+    cold = _propagate(_design(user_id, network_id), source, destination)
+    for result in warm:
+        _assert_same_result(result, cold)
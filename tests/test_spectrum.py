@@ -0,0 +1,137 @@
+# coding: utf-8
+import numpy as np
+import pytest
+from bson import ObjectId
+
+# Project imports
+from benchmarks.equipment import TRANSCEIVER_TYPE
+from src.optinetsim_backend.app.database.models import NetworkDB, SpectrumOccupancyDB
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.spectrum import (
+    BEST_FIT,
+    FIRST_FIT,
+    SpectrumError,
+    SpectrumIndex,
+    allocate,
+    release,
+    width_to_m
+)
+from src.optinetsim_backend.app.simulation.tasks import spectrum_topology
+
+
+def build_topology(network):
+    context = SimulationContext.from_network(network)
+    return spectrum_topology(context)
+
+
+def loader(user_id, network_id):
+    return lambda: NetworkDB.find_by_network_id(user_id, network_id)
+
+
+def test_oms_follow_designed_network(make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    result = allocate(loader(user_id, network_id), build_topology, 'svc', source, destination, width_to_m(50))
+    # ROADM 两侧的放大器由网络设计自动补全，路径与 GNPY 传播的路径相同
+    assert any(uid.startswith('Edfa_booster_') for uid in result['path'])
+    assert any(uid.startswith('Edfa_preamp_') for uid in result['path'])
+    assert result['oms'] == 1
+    assert release(loader(user_id, network_id), build_topology, 'svc')['N'] == result['N']
+
+
+def test_path_without_oms_is_rejected(db, make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, roadm = builder.sites[0][:2]
+    # 同一站点的第二个收发器，与第一个收发器之间只经过一个 ROADM
+    local = builder.add_element('Transceiver', 'trx local', 0.0, 45.0, type_variety=TRANSCEIVER_TYPE)
+    builder.connect(local, roadm)
+    builder.connect(roadm, local)
+    db.networks.update_one({'_id': ObjectId(network_id)}, {'$set': {
+        'elements': builder.document['elements'], 'connections': builder.document['connections']}})
+
+    with pytest.raises(SpectrumError):
+        allocate(loader(user_id, network_id), build_topology, 'svc', source, local, 4)
+
+
+def _index(slots=32):
+    oms = [('roadm a', 'fiber 1', 'roadm b'), ('roadm b', 'fiber 2', 'roadm c')]
+    return SpectrumIndex(0, oms, -16, np.zeros((len(oms), slots), dtype=bool)), oms
+
+
+def test_first_fit_and_best_fit():
+    index, oms = _index()
+    # 占用后第一个 OMS 空闲 [0, 4) 和 [6, 32)，第二个 OMS 空闲 [0, 32)
+    index.occupied[0, 4:6] = True
+    assert index.find_slot(oms, 1, FIRST_FIT) == index.n_min + 1
+    # 4 个频隙：first-fit 取最低的位置，best-fit 取能容纳的最短空闲区间
+    assert index.find_slot(oms[:1], 2, FIRST_FIT) == index.n_min + 2
+    index.occupied[0, 10:32] = True
+    assert index.find_slot(oms[:1], 2, BEST_FIT) == index.n_min + 2
+    index.occupied[0, 0:2] = True
+    # 剩余 [2, 4) 和 [6, 10)，宽度 4 的业务只能放入后者，宽度 2 的业务 best-fit 选择前者
+    assert index.find_slot(oms[:1], 2, BEST_FIT) == index.n_min + 8
+    assert index.find_slot(oms[:1], 1, BEST_FIT) == index.n_min + 3
+    assert index.find_slot(oms[:1], 1, FIRST_FIT) == index.n_min + 3
+    assert index.find_slot(oms[:1], 3, FIRST_FIT) is None
+
+
+def test_assign_rejects_occupied_slots():
+    index, oms = _index()
+    index.assign('a', ['path'], oms, 0, 2)
+    with pytest.raises(SpectrumError):
+        index.assign('b', ['path'], oms[1:], 1, 2)
+    # 其他 OMS 上的同一频谱不受影响
+    index.assign('c', ['path'], oms[:1], 4, 2)
+    assert index.occupied[:, 14:18].all()
+    assert index.occupied[0, 18:22].all() and not index.occupied[1, 18:22].any()
+
+
+def test_allocation_policies_end_to_end(make_network):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    load = loader(user_id, network_id)
+    first = allocate(load, build_topology, 'a', source, destination, 2)
+    second = allocate(load, build_topology, 'b', source, destination, 1)
+    assert second['N'] == first['N'] + first['M'] + second['M']
+    release(load, build_topology, 'a')
+    # 释放后 best-fit 选择刚释放的区间，first-fit 同样从最低频率开始
+    assert allocate(load, build_topology, 'c', source, destination, 2, BEST_FIT)['N'] == first['N']
+    with pytest.raises(SpectrumError):
+        allocate(load, build_topology, 'c', source, destination, 2)
+
+
+def test_version_mismatch_is_a_conflict(db, make_network, monkeypatch):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    load = loader(user_id, network_id)
+    allocate(load, build_topology, 'a', source, destination, 1)
+    document = SpectrumOccupancyDB.find(network_id)
+    occupancy = {key: document[key] for key in ('revision', 'oms', 'n_min', 'slots', 'bitmap', 'allocations')}
+
+    # 其他请求已写入新版本，按旧版本写入失败
+    assert SpectrumOccupancyDB.save(network_id, occupancy, document['version'])
+    assert not SpectrumOccupancyDB.save(network_id, occupancy, document['version'])
+
+    # 每次写入都冲突时分配在重试后失败，索引保持不变
+    monkeypatch.setattr(SpectrumOccupancyDB, 'save', staticmethod(lambda *args: False))
+    with pytest.raises(SpectrumError):
+        allocate(load, build_topology, 'b', source, destination, 1)
+    assert list(SpectrumOccupancyDB.find(network_id)['allocations']) == ['a']
+
+
+def test_allocation_api_conflict_and_exhaustion(make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    source, destination = builder.transceivers
+    path = f'/api/networks/{network_id}/spectrum/allocations'
+    body = {'service_id': 'a', 'source_uid': source, 'destination_uid': destination}
+    status, result = api('POST', path, user_id, body)
+    assert status == 201
+    assert api('POST', path, user_id, body)[0] == 400
+    status, summary = api('GET', f'/api/networks/{network_id}/spectrum', user_id)
+    assert status == 200
+    assert [allocation['service_id'] for allocation in summary['allocations']] == ['a']
+    # 超出网络频率范围的业务没有可用频谱
+    status, _ = api('POST', path, user_id, dict(body, service_id='wide', width=10000))
+    assert status == 409
+    assert api('DELETE', f'{path}/a', user_id)[0] == 200
+    assert api('DELETE', f'{path}/a', user_id)[0] == 404
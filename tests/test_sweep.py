@@ -0,0 +1,66 @@
+# coding: utf-8
+import pytest
+from gnpy.tools.worker_utils import transmission_simulation
+
+# Project imports
+from src.optinetsim_backend.app.simulation.core import apply_sim_params, get_designed_network
+from src.optinetsim_backend.app.simulation.loader import SimulationContext
+from src.optinetsim_backend.app.simulation.results import sweep_point
+from src.optinetsim_backend.app.simulation.tasks import prepare_design, run_power_sweep
+
+POWERS_DBM = [-2.0, -1.0, 0.0, 1.0]
+# sweep_point 的指标在接口结果中的名称
+COLUMNS = {
+    'gsnr': 'Mean GSNR (signal bw, dB)',
+    'gsnr_01nm': 'Mean GSNR (0.1nm, dB)',
+    'osnr_ase': 'Mean OSNR ASE (signal bw, dB)',
+    'snr_nli': 'Mean SNR NLI (signal bw, dB)',
+}
+
+
+def _sweep_request(make_network):
+    user_id, network_id, builder = make_network('linear', 3)
+    body = {'network_id': network_id, 'source_uid': builder.transceivers[0],
+            'destination_uid': builder.transceivers[1],
+            'sweep': {'start': POWERS_DBM[0], 'stop': POWERS_DBM[-1], 'step': 1}}
+    return user_id, network_id, body
+
+
+def test_sweep_matches_gnpy_power_sweep(make_network, api):
+    user_id, network_id, body = _sweep_request(make_network)
+    status, result = api('POST', '/api/simulation/single-link/sweep', user_id, body)
+    assert status == 200
+
+    # GNPY 按 SI 的 power_range_db 扫描，每个功率点重新设计路径
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    design = get_designed_network(context)
+    design.equipment['SI']['default'].power_range_db = [POWERS_DBM[0], POWERS_DBM[-1], 1]
+    req = design.request_for(body['source_uid'], body['destination_uid'])
+    _, propagations, powers_dbm, _ = transmission_simulation(design.equipment, design.network, req, design.ref_req)
+    expected = [sweep_point(power_dbm, path[-1]) for path, power_dbm in zip(propagations, powers_dbm)]
+    assert result['power (dBm)'] == pytest.approx([point['power'] for point in expected])
+    for key, column in COLUMNS.items():
+        assert result[column] == pytest.approx([point[key] for point in expected])
+    # 不同功率下的结果不同，每个功率点都重新设计
+    assert len(set(result['Mean GSNR (signal bw, dB)'])) == len(POWERS_DBM)
+
+
+def test_parallel_sweep_matches_sequential(make_network, api):
+    user_id, network_id, body = _sweep_request(make_network)
+    status, sequential = api('POST', '/api/simulation/single-link/sweep', user_id, body)
+    assert status == 200
+    status, parallel = api('POST', '/api/simulation/single-link/sweep', user_id, dict(body, parallel=True))
+    assert status == 200
+    assert parallel == pytest.approx(sequential)
+
+    # 每个工作进程只计算一个功率点时的结果
+    context = SimulationContext.load(user_id, network_id)
+    apply_sim_params(context.build_sim_params())
+    payload = prepare_design(context)
+    points = [point for index in range(len(POWERS_DBM))
+              for point in run_power_sweep(payload, body['source_uid'], body['destination_uid'], POWERS_DBM, [index])]
+    assert [point['gsnr'] for point in points] == pytest.approx(sequential['Mean GSNR (signal bw, dB)'])
+    points = (run_power_sweep(payload, body['source_uid'], body['destination_uid'], POWERS_DBM, [0, 1])
+              + run_power_sweep(payload, body['source_uid'], body['destination_uid'], POWERS_DBM, [2, 3]))
+    assert [point['gsnr'] for point in points] == pytest.approx(sequential['Mean GSNR (signal bw, dB)'])
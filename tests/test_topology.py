@@ -0,0 +1,29 @@
+# coding: utf-8
+# Project imports
+from src.optinetsim_backend.app.database.models import NetworkDB
+
+
+def _connected(network, element_id):
+    return [connection for connection in network['connections']
+            if element_id in (connection['from_node'], connection['to_node'])]
+
+
+def test_delete_element_removes_its_connections(db, make_network, api):
+    user_id, network_id, builder = make_network('linear', 2)
+    roadm = builder.sites[0][1]
+    network = NetworkDB.find_by_network_id(user_id, network_id)
+    connections = _connected(network, roadm)
+    assert {connection['from_node'] for connection in connections} > {roadm}
+    assert {connection['to_node'] for connection in connections} > {roadm}
+
+    status, _ = api('DELETE', f'/api/networks/{network_id}/elements/{roadm}', user_id)
+    assert status == 200
+    updated = NetworkDB.find_by_network_id(user_id, network_id)
+    assert roadm not in [element['element_id'] for element in updated['elements']]
+    assert _connected(updated, roadm) == []
+    # 其他连接保持不变，revision 递增
+    assert len(updated['connections']) == len(network['connections']) - len(connections)
+    assert updated['revision'] > network['revision']
+
+    assert api('DELETE', f'/api/networks/{network_id}/elements/{roadm}', user_id)[0] == 404
+    assert NetworkDB.find_by_network_id(user_id, network_id)['revision'] == updated['revision']